@@ -1,10 +1,24 @@
 from typing import Any, Protocol, Tuple, Dict, List
 
+from litedis.core.command.base import Command
+from litedis.core.command.basiccmds import (
+    DecrbyCommand,
+    GetCommand,
+    IncrbyCommand,
+    IncrbyfloatCommand,
+    SetCommand
+)
+from litedis.core.command.hashcmds import HGetCommand, HIncrByCommand, HIncrByFloatCommand, HSetCommand
+from litedis.core.command.listcmds import LIndexCommand, LRangeCommand
+from litedis.core.command.zsetcmds import ZAddCommand, ZCountCommand, ZIncrByCommand
+
 
 class ClientCommands(Protocol):
 
     def execute(self, *args) -> Any: ...
 
+    def execute_command(self, command: Command) -> Any: ...
+
 
 class BasicCommands(ClientCommands):
 
@@ -18,7 +32,7 @@ class BasicCommands(ClientCommands):
         return self.execute("copy", *pieces)
 
     def decrby(self, key: str, decrement: int) -> Any:
-        result = self.execute("decrby", key, str(decrement))
+        result = self.execute_command(DecrbyCommand.from_args(key, decrement))
         return int(result)
 
     def delete(self, *keys: str) -> Any:
@@ -71,7 +85,7 @@ class BasicCommands(ClientCommands):
         return self.execute("expiretime", key)
 
     def get(self, key: str) -> Any:
-        return self.execute("get", key)
+        return self.execute_command(GetCommand.from_args(key))
 
     def set(
             self,
@@ -86,39 +100,15 @@ class BasicCommands(ClientCommands):
             exat: int = None,
             pxat: int = None,
     ) -> Any:
-        pieces: list = [key, value]
-        if ex is not None:
-            pieces.append("ex")
-            pieces.append(ex)
-        if px is not None:
-            pieces.append("px")
-            pieces.append(px)
-        if exat is not None:
-            pieces.append("exat")
-            pieces.append(exat)
-        if pxat is not None:
-            pieces.append("pxat")
-            pieces.append(pxat)
-
-        if keepttl:
-            pieces.append("keepttl")
-
-        if nx:
-            pieces.append("nx")
-        if xx:
-            pieces.append("xx")
-
-        if get:
-            pieces.append("get")
-
-        return self.execute("set", *pieces)
+        return self.execute_command(SetCommand.from_args(key, value, ex=ex, px=px, nx=nx, xx=xx,
+                                                         keepttl=keepttl, get=get, exat=exat, pxat=pxat))
 
     def incrby(self, key: str, increment: int = 1) -> Any:
-        result = self.execute("incrby", key, str(increment))
+        result = self.execute_command(IncrbyCommand.from_args(key, increment))
         return int(result)
 
     def incrbyfloat(self, key: str, increment: float = 1.) -> Any:
-        result = self.execute("incrbyfloat", key, str(increment))
+        result = self.execute_command(IncrbyfloatCommand.from_args(key, increment))
         return float(result)
 
     def keys(self, pattern: str = "*") -> Any:
@@ -151,6 +141,16 @@ class BasicCommands(ClientCommands):
     def renamenx(self, source: str, destination: str) -> Any:
         return self.execute("renamenx", source, destination)
 
+    def scan(self, cursor: int = 0, match: str = None, count: int = None, _type: str = None) -> Any:
+        pieces = [str(cursor)]
+        if match is not None:
+            pieces.extend(["MATCH", match])
+        if count is not None:
+            pieces.extend(["COUNT", str(count)])
+        if _type is not None:
+            pieces.extend(["TYPE", _type])
+        return self.execute("scan", *pieces)
+
     def strlen(self, key: str) -> Any:
         return self.execute("strlen", key)
 
@@ -172,16 +172,16 @@ class HashCommands(ClientCommands):
         return self.execute("hexists", key, field)
 
     def hget(self, key: str, field: str) -> Any:
-        return self.execute("hget", key, field)
+        return self.execute_command(HGetCommand.from_args(key, field))
 
     def hgetall(self, key: str) -> Any:
         return self.execute("hgetall", key)
 
     def hincrby(self, key: str, field: str, increment: int = 1) -> Any:
-        return self.execute("hincrby", key, field, str(increment))
+        return self.execute_command(HIncrByCommand.from_args(key, field, increment))
 
     def hincrbyfloat(self, key: str, field: str, increment: float = 1.) -> Any:
-        return self.execute("hincrbyfloat", key, field, str(increment))
+        return self.execute_command(HIncrByFloatCommand.from_args(key, field, increment))
 
     def hkeys(self, key: str) -> Any:
         return self.execute("hkeys", key)
@@ -193,10 +193,7 @@ class HashCommands(ClientCommands):
         return self.execute("hmget", key, *fields)
 
     def hset(self, key: str, mapping: Dict[str, str]) -> Any:
-        pieces: List[str] = []
-        for field, value in mapping.items():
-            pieces.extend([field, value])
-        return self.execute("hset", key, *pieces)
+        return self.execute_command(HSetCommand.from_args(key, mapping))
 
     def hsetnx(self, key: str, field: str, value: str) -> Any:
         return self.execute("hsetnx", key, field, value)
@@ -223,8 +220,17 @@ class HashCommands(ClientCommands):
 
 
 class ListCommands(ClientCommands):
+    def blmove(self, source: str, destination: str, wherefrom: str, whereto: str, timeout: float = 0) -> Any:
+        return self.execute("blmove", source, destination, wherefrom, whereto, str(timeout))
+
+    def blpop(self, *keys: str, timeout: float = 0) -> Any:
+        return self.execute("blpop", *keys, str(timeout))
+
+    def brpop(self, *keys: str, timeout: float = 0) -> Any:
+        return self.execute("brpop", *keys, str(timeout))
+
     def lindex(self, key: str, index: int) -> Any:
-        return self.execute("lindex", key, str(index))
+        return self.execute_command(LIndexCommand.from_args(key, index))
 
     def linsert(self, key: str, before: bool, pivot: str, element: str) -> Any:
         position = "BEFORE" if before else "AFTER"
@@ -233,6 +239,9 @@ class ListCommands(ClientCommands):
     def llen(self, key: str) -> Any:
         return self.execute("llen", key)
 
+    def lmove(self, source: str, destination: str, wherefrom: str, whereto: str) -> Any:
+        return self.execute("lmove", source, destination, wherefrom, whereto)
+
     def lpop(self, key: str, count: int = None) -> Any:
         pieces = [key]
         if count is not None:
@@ -246,7 +255,7 @@ class ListCommands(ClientCommands):
         return self.execute("lpushx", key, *elements)
 
     def lrange(self, key: str, start: int, stop: int) -> Any:
-        return self.execute("lrange", key, str(start), str(stop))
+        return self.execute_command(LRangeCommand.from_args(key, start, stop))
 
     def lrem(self, key: str, count: int, element: str) -> Any:
         return self.execute("lrem", key, str(count), element)
@@ -344,22 +353,39 @@ class SetCommands(ClientCommands):
     def srem(self, key: str, *members: str) -> Any:
         return self.execute("srem", key, *members)
 
+    def sscan(
+            self,
+            key: str,
+            cursor: int = 0,
+            match: str = None,
+            count: int = None
+    ) -> Any:
+        pieces = [key, str(cursor)]
+        if match is not None:
+            pieces.extend(["MATCH", match])
+        if count is not None:
+            pieces.extend(["COUNT", str(count)])
+        return self.execute("sscan", *pieces)
+
     def sunion(self, *keys: str) -> Any:
         return self.execute("sunion", *keys)
 
 
 class ZSetCommands(ClientCommands):
+    def bzpopmax(self, *keys: str, timeout: float = 0) -> Any:
+        return self.execute("bzpopmax", *keys, str(timeout))
+
+    def bzpopmin(self, *keys: str, timeout: float = 0) -> Any:
+        return self.execute("bzpopmin", *keys, str(timeout))
+
     def zadd(self, key: str, mapping: Dict[str, float]) -> Any:
-        pieces: List[str] = []
-        for member, score in mapping.items():
-            pieces.extend([str(score), member])
-        return self.execute("zadd", key, *pieces)
+        return self.execute_command(ZAddCommand.from_args(key, mapping))
 
     def zcard(self, key: str) -> Any:
         return self.execute("zcard", key)
 
     def zcount(self, key: str, min_score: float, max_score: float) -> Any:
-        return self.execute("zcount", key, str(min_score), str(max_score))
+        return self.execute_command(ZCountCommand.from_args(key, min_score, max_score))
 
     def zdiff(self, *keys: str, withscores: bool = False) -> Any:
         pieces = [str(len(keys))]
@@ -369,7 +395,7 @@ class ZSetCommands(ClientCommands):
         return self.execute("zdiff", *pieces)
 
     def zincrby(self, key: str, increment: float, member: str) -> Any:
-        return self.execute("zincrby", key, str(increment), member)
+        return self.execute_command(ZIncrByCommand.from_args(key, increment, member))
 
     def zinter(self, *keys: str, withscores: bool = False) -> Any:
         pieces = [str(len(keys))]
@@ -521,3 +547,20 @@ class ZSetCommands(ClientCommands):
 
     def zmscore(self, key: str, *members: str) -> Any:
         return self.execute("zmscore", key, *members)
+
+
+class ServerCommands(ClientCommands):
+
+    def bgrewriteaof(self) -> Any:
+        return self.execute("bgrewriteaof")
+
+    def info(self, section: str = None) -> Any:
+        if section is None:
+            return self.execute("info")
+        return self.execute("info", section)
+
+    def memory_usage(self, key: str, samples: int = None) -> Any:
+        pieces = [key]
+        if samples is not None:
+            pieces.extend(["SAMPLES", str(samples)])
+        return self.execute("memory", "usage", *pieces)
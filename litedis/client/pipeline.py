@@ -0,0 +1,101 @@
+from typing import Any, Callable, List, Optional, Union
+
+from litedis.client.commands import (
+    BasicCommands,
+    HashCommands,
+    ListCommands,
+    ServerCommands,
+    SetCommands,
+    ZSetCommands
+)
+from litedis.core.command.base import Command
+from litedis.core.command.basiccmds import DecrbyCommand, IncrbyCommand, IncrbyfloatCommand
+from litedis.typing import CommandProcessor
+
+
+class Pipeline(
+    BasicCommands,
+    HashCommands,
+    ListCommands,
+    ServerCommands,
+    SetCommands,
+    ZSetCommands
+):
+    """
+    Queue commands and run them together, under one acquisition of the
+    db locks and with one AOF write for all of their records.
+
+        with litedis.pipeline() as pipe:
+            pipe.set("a", "1").incrby("a", 2)
+            results = pipe.execute()  # ["OK", 3]
+
+    A command method queues the command and returns the pipeline,
+    `execute()` without arguments runs the queue and returns the results.
+    Commands still queued when the `with` block exits are run then.
+    If raise_on_error is False, a command that fails has its exception
+    as its result instead of raising the first error.
+    """
+
+    def __init__(self, executor: CommandProcessor, dbname: str, raise_on_error: bool = True):
+        self.executor = executor
+        self.dbname = dbname
+        self.raise_on_error = raise_on_error
+        self._commands: List[Union[List[str], Command]] = []
+        self._callbacks: List[Optional[Callable]] = []
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None and self._commands:
+            self.execute()
+        else:
+            self.reset()
+
+    def __len__(self):
+        return len(self._commands)
+
+    def reset(self):
+        self._commands = []
+        self._callbacks = []
+
+    def execute(self, *args) -> Any:
+        if args:
+            return self._queue(list(args))
+        return self._run()
+
+    def execute_command(self, command: Command) -> Any:
+        return self._queue(command)
+
+    def _queue(self, command: Union[List[str], Command], callback: Optional[Callable] = None) -> "Pipeline":
+        self._commands.append(command)
+        self._callbacks.append(callback)
+        return self
+
+    def _run(self) -> list:
+        commands, callbacks = self._commands, self._callbacks
+        self.reset()
+        if not commands:
+            return []
+
+        results = self.executor.process_commands(self.dbname, commands)
+        for i, callback in enumerate(callbacks):
+            result = results[i]
+            if isinstance(result, Exception):
+                if self.raise_on_error:
+                    raise result
+            elif callback is not None:
+                results[i] = callback(result)
+        return results
+
+    # the results of these commands are converted by the client methods,
+    # which cannot be done before the pipeline runs
+
+    def decrby(self, key: str, decrement: int) -> Any:
+        return self._queue(DecrbyCommand.from_args(key, decrement), int)
+
+    def incrby(self, key: str, increment: int = 1) -> Any:
+        return self._queue(IncrbyCommand.from_args(key, increment), int)
+
+    def incrbyfloat(self, key: str, increment: float = 1.) -> Any:
+        return self._queue(IncrbyfloatCommand.from_args(key, increment), float)
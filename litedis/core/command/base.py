@@ -1,35 +1,162 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional, Tuple, TYPE_CHECKING
 
 from litedis.core.persistence import LitedisDB
 from litedis.typing import ReadWriteType
 
+if TYPE_CHECKING:
+    from litedis.core.dbmanager import DBManager
+
 
 class CommandContext:
+    __slots__ = ('db', 'cmdtokens', 'dbmanager')
 
-    def __init__(self, db: LitedisDB, cmdtokens: List[str]):
+    def __init__(self, db: LitedisDB, cmdtokens: Optional[List[str]], dbmanager: Optional["DBManager"] = None):
         self.db = db
         self.cmdtokens = cmdtokens
+        # set for commands that work on the server rather than on the db
+        self.dbmanager = dbmanager
 
 
 class Command(ABC):
     name = None
+    # number of tokens including the name, -N for at least N tokens
+    arity = -1
+    # properties of the command, as in the Redis command table:
+    # write, readonly, denyoom (may take more memory), admin, movablekeys
+    flags: Tuple[str, ...] = ()
+    # positions of the keys in the tokens as in the Redis command table:
+    # (first key, last key, step between keys), a negative last key counts
+    # from the end, None for commands that work on the whole keyspace
+    key_spec: Optional[Tuple[int, int, int]] = (1, 1, 1)
+    # whether the command waits for its keys, see BlockingCommand
+    blocking = False
+
+    @classmethod
+    def get_keys(cls, tokens: List[str]) -> List[str]:
+        """
+        Return the keys the tokens refer to, without validating them
+        """
+        if cls.key_spec is None:
+            return []
+        first, last, step = cls.key_spec
+        if last < 0:
+            last += len(tokens)
+        return tokens[first:last + 1:step]
 
     @property
     @abstractmethod
     def rwtype(self) -> ReadWriteType: ...
 
+    def execute(self, ctx: CommandContext):
+        # no tokens for a command created by a typed constructor
+        if ctx.cmdtokens is not None:
+            self._parse(ctx.cmdtokens)
+        return self._execute(ctx)
+
     @abstractmethod
-    def execute(self, ctx: CommandContext): ...
+    def _parse(self, tokens: List[str]): ...
+
+    @abstractmethod
+    def _execute(self, ctx: CommandContext):
+        """
+        Run the command with its arguments already set,
+        by `_parse` or by a typed constructor
+        """
+
+    def to_tokens(self) -> List[str]:
+        """
+        Return the command in canonical token form, for commands created
+        by a typed constructor (`from_args`), which have no tokens of their
+        own. Used for the AOF record of writes and to find the keys.
+        """
+        raise NotImplementedError(f"{self.name} command has no canonical token form")
 
 
 class ReadCommand(Command, ABC):
-    @property
-    def rwtype(self) -> ReadWriteType:
-        return ReadWriteType.Read
+    rwtype = ReadWriteType.Read
+    flags = ('readonly',)
 
 
 class WriteCommand(Command, ABC):
-    @property
-    def rwtype(self) -> ReadWriteType:
-        return ReadWriteType.Write
+    rwtype = ReadWriteType.Write
+    flags = ('write', 'denyoom')
+
+
+class BlockingCommand(WriteCommand, ABC):
+    """
+    A command that waits until one of its keys holds data. `_execute`
+    returns None when none of them does, and the db manager parks the
+    caller until a write to one of the keys or until `timeout` seconds
+    have passed, 0 waits forever. Inside a pipeline it does not wait.
+    `to_tokens` returns the non-blocking command it ended up running,
+    which is what the AOF records.
+    """
+    flags = ('write', 'blocking')
+    blocking = True
+    __slots__ = ('timeout', 'effect')
+
+    def __init__(self):
+        self.timeout: float
+        # set by _execute to the tokens of what it did
+        self.effect: Optional[List[str]] = None
+
+    @classmethod
+    def get_wait_keys(cls, tokens: List[str]) -> List[str]:
+        """
+        Return the keys whose data the command waits for, all of its keys
+        unless the command also writes to keys it does not wait for
+        """
+        return cls.get_keys(tokens)
+
+    def to_tokens(self) -> List[str]:
+        if self.effect is None:
+            raise ValueError(f"{self.name} command has not served any data")
+        return self.effect
+
+
+def get_numkeys_keys(tokens: List[str], index: int = 1) -> List[str]:
+    """
+    Return the keys of a command giving their number at tokens[index]
+    and the keys right after it
+    """
+    try:
+        numkeys = int(tokens[index])
+    except (IndexError, ValueError):
+        return []
+    return tokens[index + 1:index + 1 + max(numkeys, 0)]
+
+
+def parse_timeout(token: str) -> float:
+    """
+    Parse the timeout of a blocking command, in seconds
+    """
+    try:
+        timeout = float(token)
+    except ValueError:
+        raise ValueError('timeout is not a float or out of range')
+    if timeout < 0:
+        raise ValueError('timeout is negative')
+    return timeout
+
+
+def to_int(value, message: str) -> int:
+    """
+    Convert an argument of a typed constructor the way `_parse` would
+    convert its token, raising ValueError with message if it is invalid
+    """
+    if type(value) is int:
+        return value
+    try:
+        return int(str(value))
+    except ValueError:
+        raise ValueError(message)
+
+
+def to_float(value, message: str) -> float:
+    if type(value) is float:
+        return value
+    try:
+        return float(str(value))
+    except ValueError:
+        raise ValueError(message)
@@ -1,13 +1,14 @@
 import random
-import re
 import time
 from typing import Optional, List, Tuple
 
-from litedis.core.command.base import CommandContext, ReadCommand, WriteCommand
+from litedis.core.command.base import CommandContext, ReadCommand, WriteCommand, to_float, to_int
+from litedis.core.command.pattern import compile_pattern, pattern_prefix
 
 
 class SetCommand(WriteCommand):
     name = 'set'
+    arity = -3
     __slots__ = ('key', 'value', 'ex', 'px', 'exat', 'pxat', 'nx', 'xx', 'keepttl', 'get')
 
     def __init__(self):
@@ -80,9 +81,39 @@ class SetCommand(WriteCommand):
 
             i += 2
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    @classmethod
+    def from_args(cls, key: str, value: str, ex: int = None, px: int = None,
+                  nx: bool = False, xx: bool = False, keepttl: bool = False,
+                  get: bool = False, exat: int = None, pxat: int = None) -> "SetCommand":
+        if nx and xx:
+            raise ValueError('NX and XX options are mutually exclusive')
+        command = cls()
+        command.key = key
+        command.value = value
+        command.nx = nx
+        command.xx = xx
+        command.keepttl = keepttl
+        command.get = get
+        for option, val in (('ex', ex), ('px', px), ('exat', exat), ('pxat', pxat)):
+            if val is not None:
+                val = to_int(val, 'invalid expiration time')
+                if val <= 0:
+                    raise ValueError('expiration time must be positive')
+                setattr(command, option, val)
+        return command
+
+    def to_tokens(self) -> List[str]:
+        tokens = ['set', self.key, self.value]
+        for option in ('ex', 'px', 'exat', 'pxat'):
+            val = getattr(self, option)
+            if val is not None:
+                tokens.extend([option.upper(), str(val)])
+        for option in ('nx', 'xx', 'keepttl', 'get'):
+            if getattr(self, option):
+                tokens.append(option.upper())
+        return tokens
+
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
 
         # Check existence conditions
@@ -121,6 +152,7 @@ class SetCommand(WriteCommand):
 
 class GetCommand(ReadCommand):
     name = 'get'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -132,9 +164,16 @@ class GetCommand(ReadCommand):
             raise ValueError('get command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str) -> "GetCommand":
+        command = cls()
+        command.key = key
+        return command
+
+    def to_tokens(self) -> List[str]:
+        return ['get', self.key]
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
 
         value = db.get(self.key)
@@ -146,6 +185,7 @@ class GetCommand(ReadCommand):
 
 class AppendCommand(WriteCommand):
     name = 'append'
+    arity = 3
     __slots__ = ('key', 'value')
 
     def __init__(self):
@@ -158,9 +198,7 @@ class AppendCommand(WriteCommand):
         self.key = tokens[1]
         self.value = tokens[2]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             db.set(self.key, self.value)
@@ -175,6 +213,7 @@ class AppendCommand(WriteCommand):
 
 class DecrbyCommand(WriteCommand):
     name = 'decrby'
+    arity = 3
     __slots__ = ('key', 'decrement')
 
     def __init__(self):
@@ -190,9 +229,17 @@ class DecrbyCommand(WriteCommand):
         except ValueError:
             raise ValueError('decrement must be an integer')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, decrement: int) -> "DecrbyCommand":
+        command = cls()
+        command.key = key
+        command.decrement = to_int(decrement, 'decrement must be an integer')
+        return command
+
+    def to_tokens(self) -> List[str]:
+        return ['decrby', self.key, str(self.decrement)]
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             value = 0
@@ -210,6 +257,9 @@ class DecrbyCommand(WriteCommand):
 
 class DeleteCommand(WriteCommand):
     name = 'del'
+    arity = -2
+    flags = ('write',)
+    key_spec = (1, -1, 1)
     __slots__ = ('keys',)
 
     def __init__(self):
@@ -220,9 +270,7 @@ class DeleteCommand(WriteCommand):
             raise ValueError('del command requires at least one key')
         self.keys = tokens[1:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         deleted = 0
         for key in self.keys:
             deleted += ctx.db.delete(key)
@@ -231,6 +279,8 @@ class DeleteCommand(WriteCommand):
 
 class ExistsCommand(ReadCommand):
     name = 'exists'
+    arity = -2
+    key_spec = (1, -1, 1)
     __slots__ = ('keys',)
 
     def __init__(self):
@@ -241,9 +291,7 @@ class ExistsCommand(ReadCommand):
             raise ValueError('exists command requires at least one key')
         self.keys = tokens[1:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         count = 0
         for key in self.keys:
             if ctx.db.exists(key):
@@ -253,6 +301,8 @@ class ExistsCommand(ReadCommand):
 
 class CopyCommand(WriteCommand):
     name = 'copy'
+    arity = -3
+    key_spec = (1, 2, 1)
     __slots__ = ('source', 'destination', 'replace')
 
     def __init__(self):
@@ -271,9 +321,7 @@ class CopyCommand(WriteCommand):
             if tokens[3].lower() == 'replace':
                 self.replace = True
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.source):
             return 0
@@ -282,7 +330,8 @@ class CopyCommand(WriteCommand):
             return 0
 
         value = db.get(self.source)
-        db.set(self.destination, value)
+        # the copy must not share a container with the source
+        db.set(self.destination, value if isinstance(value, str) else value.copy())
 
         # Copy expiration if exists
         if db.exists_expiration(self.source):
@@ -294,6 +343,8 @@ class CopyCommand(WriteCommand):
 
 class ExpireCommand(WriteCommand):
     name = 'expire'
+    arity = -3
+    flags = ('write',)
     __slots__ = ('key', 'seconds', 'nx', 'xx', 'gt', 'lt')
 
     def __init__(self):
@@ -339,9 +390,7 @@ class ExpireCommand(WriteCommand):
                 raise ValueError(f'invalid option: {opt}')
             i += 1
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -368,6 +417,8 @@ class ExpireCommand(WriteCommand):
 
 class ExpireatCommand(WriteCommand):
     name = 'expireat'
+    arity = -3
+    flags = ('write',)
     __slots__ = ('key', 'timestamp', 'nx', 'xx', 'gt', 'lt')
 
     def __init__(self):
@@ -411,9 +462,7 @@ class ExpireatCommand(WriteCommand):
                 raise ValueError(f'invalid option: {opt}')
             i += 1
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -440,6 +489,7 @@ class ExpireatCommand(WriteCommand):
 
 class ExpireTimeCommand(ReadCommand):
     name = 'expiretime'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -450,9 +500,7 @@ class ExpireTimeCommand(ReadCommand):
             raise ValueError('expiretime command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
 
         if not db.exists(self.key):  # Key does not exist
@@ -466,6 +514,7 @@ class ExpireTimeCommand(ReadCommand):
 
 class IncrbyCommand(WriteCommand):
     name = 'incrby'
+    arity = 3
     __slots__ = ('key', 'increment')
 
     def __init__(self):
@@ -481,9 +530,17 @@ class IncrbyCommand(WriteCommand):
         except ValueError:
             raise ValueError('increment must be an integer')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, increment: int) -> "IncrbyCommand":
+        command = cls()
+        command.key = key
+        command.increment = to_int(increment, 'increment must be an integer')
+        return command
+
+    def to_tokens(self) -> List[str]:
+        return ['incrby', self.key, str(self.increment)]
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             value = 0
@@ -501,6 +558,7 @@ class IncrbyCommand(WriteCommand):
 
 class IncrbyfloatCommand(WriteCommand):
     name = 'incrbyfloat'
+    arity = 3
     __slots__ = ('key', 'increment')
 
     def __init__(self):
@@ -516,9 +574,17 @@ class IncrbyfloatCommand(WriteCommand):
         except ValueError:
             raise ValueError('increment must be a float')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, increment: float) -> "IncrbyfloatCommand":
+        command = cls()
+        command.key = key
+        command.increment = to_float(increment, 'increment must be a float')
+        return command
 
+    def to_tokens(self) -> List[str]:
+        return ['incrbyfloat', self.key, str(self.increment)]
+
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             value = 0.0
@@ -540,6 +606,8 @@ class IncrbyfloatCommand(WriteCommand):
 
 class KeysCommand(ReadCommand):
     name = 'keys'
+    arity = 2
+    key_spec = None
     __slots__ = ('pattern',)
 
     def __init__(self):
@@ -550,81 +618,15 @@ class KeysCommand(ReadCommand):
             raise ValueError('keys command requires pattern')
         self.pattern = tokens[1]
 
-    def _convert_pattern_to_regex(self, pattern: str) -> str:
-        """Convert Redis glob pattern to Python regex pattern
-
-        Handles the following Redis wildcards:
-        * - matches any sequence of characters
-        ? - matches any single character
-        [] - matches any character within the brackets
-        \\x - escape character x
-        """
-        i = 0
-        result = []
-        while i < len(pattern):
-            if pattern[i] == '\\' and i + 1 < len(pattern):
-                # Handle escaped characters - make them match literally
-                next_char = pattern[i + 1]
-                if next_char in '*?[]\\':
-                    result.append(re.escape(next_char))
-                else:
-                    # If not escaping a special char, keep the escape sequence
-                    result.extend(['\\', next_char])
-                i += 2
-            elif pattern[i] == '*':
-                result.append('.*')
-                i += 1
-            elif pattern[i] == '?':
-                result.append('.')
-                i += 1
-            elif pattern[i] == '[':
-                # Handle character classes [...]
-                bracket_content = []
-                i += 1
-                while i < len(pattern) and pattern[i] != ']':
-                    if pattern[i] == '\\' and i + 1 < len(pattern):
-                        bracket_content.append(re.escape(pattern[i + 1]))
-                        i += 2
-                    else:
-                        bracket_content.append(pattern[i])
-                        i += 1
-                if i < len(pattern) and pattern[i] == ']':
-                    result.append('[' + ''.join(bracket_content) + ']')
-                    i += 1
-                else:
-                    # If no matching ], treat [ as literal
-                    result.append('\\[')
-                    i = pattern.find('[') + 1
-            else:
-                # Escape other regex special chars
-                result.append(re.escape(pattern[i]))
-                i += 1
-
-        # Add anchors to match entire string
-        return f'^{"".join(result)}$'
-
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
-        try:
-            # Convert Redis pattern to regex pattern
-            regex_pattern = self._convert_pattern_to_regex(self.pattern)
-            pattern = re.compile(regex_pattern)
-
-            # Filter keys using the pattern
-            matched_keys = []
-            for key in ctx.db.keys():
-                if pattern.match(key):
-                    matched_keys.append(key)
-
-            return matched_keys
-
-        except re.error as e:
-            raise ValueError(f"Invalid pattern: {str(e)}")
+    def _execute(self, ctx: CommandContext):
+        matches = compile_pattern(self.pattern)
+        return [key for key in ctx.db.keys(pattern_prefix(self.pattern)) if matches(key)]
 
 
 class MGetCommand(ReadCommand):
     name = 'mget'
+    arity = -2
+    key_spec = (1, -1, 1)
     __slots__ = ('keys',)
 
     def __init__(self):
@@ -635,15 +637,15 @@ class MGetCommand(ReadCommand):
             raise ValueError('mget command requires at least one key')
         self.keys = tokens[1:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         return [db.get(key) for key in self.keys]
 
 
 class MSetCommand(WriteCommand):
     name = 'mset'
+    arity = -3
+    key_spec = (1, -1, 2)
     __slots__ = ('pairs',)
 
     def __init__(self):
@@ -658,9 +660,7 @@ class MSetCommand(WriteCommand):
         for i in range(1, len(tokens), 2):
             self.pairs.append((tokens[i], tokens[i + 1]))
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         for key, value in self.pairs:
             db.set(key, value)
@@ -669,6 +669,8 @@ class MSetCommand(WriteCommand):
 
 class MSetnxCommand(WriteCommand):
     name = 'msetnx'
+    arity = -3
+    key_spec = (1, -1, 2)
     __slots__ = ('pairs',)
 
     def __init__(self):
@@ -683,9 +685,7 @@ class MSetnxCommand(WriteCommand):
         for i in range(1, len(tokens), 2):
             self.pairs.append((tokens[i], tokens[i + 1]))
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
 
         # First check if any key exists
@@ -701,6 +701,8 @@ class MSetnxCommand(WriteCommand):
 
 class PersistCommand(WriteCommand):
     name = 'persist'
+    arity = 2
+    flags = ('write',)
     __slots__ = ('key',)
 
     def __init__(self):
@@ -711,9 +713,7 @@ class PersistCommand(WriteCommand):
             raise ValueError('persist command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -729,15 +729,15 @@ class PersistCommand(WriteCommand):
 
 class RandomKeyCommand(ReadCommand):
     name = 'randomkey'
+    arity = 1
+    key_spec = None
     __slots__ = ()
 
     def _parse(self, tokens: List[str]):
         if len(tokens) > 1:
             raise ValueError('randomkey command takes no arguments')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         keys = list(ctx.db.keys())
         if not keys:
             return None
@@ -746,6 +746,9 @@ class RandomKeyCommand(ReadCommand):
 
 class RenameCommand(WriteCommand):
     name = 'rename'
+    arity = 3
+    flags = ('write',)
+    key_spec = (1, 2, 1)
     __slots__ = ('source', 'destination')
 
     def __init__(self):
@@ -758,8 +761,7 @@ class RenameCommand(WriteCommand):
         self.source = tokens[1]
         self.destination = tokens[2]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if self.source == self.destination:
             raise ValueError("source and destination keys are the same")
@@ -767,7 +769,7 @@ class RenameCommand(WriteCommand):
             raise ValueError("source key does not exist")
 
         # Get the value and any expiration from source
-        value = db.get(self.source)
+        value = db.get(self.source, for_write=True)
         expiration = None
         if db.exists_expiration(self.source):
             expiration = db.get_expiration(self.source)
@@ -787,19 +789,82 @@ class RenamenxCommand(RenameCommand):
     name = 'renamenx'
     __slots__ = ()
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         if ctx.db.exists(self.destination):
             return 0
 
-        super().execute(ctx)
+        super()._execute(ctx)
 
         return 1
 
 
+class ScanCommand(ReadCommand):
+    """Incrementally iterate the keys of the db"""
+    name = 'scan'
+    arity = -2
+    key_spec = None
+    __slots__ = ('cursor', 'pattern', 'count', 'type')
+
+    def __init__(self):
+        self.cursor: int
+        self.pattern: Optional[str]
+        self.count: int
+        self.type: Optional[str]
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) < 2:
+            raise ValueError('scan command requires cursor')
+        self.cursor = to_int(tokens[1], 'cursor must be a non-negative integer')
+        if self.cursor < 0:
+            raise ValueError('cursor must be non-negative')
+
+        self.pattern = None
+        self.count = 10
+        self.type = None
+
+        i = 2
+        while i < len(tokens):
+            arg = tokens[i].upper()
+            if arg == 'MATCH' and i + 1 < len(tokens):
+                self.pattern = tokens[i + 1]
+                i += 2
+            elif arg == 'COUNT' and i + 1 < len(tokens):
+                self.count = to_int(tokens[i + 1], 'count must be a positive integer')
+                if self.count < 1:
+                    raise ValueError('count must be a positive integer')
+                i += 2
+            elif arg == 'TYPE' and i + 1 < len(tokens):
+                self.type = tokens[i + 1].lower()
+                i += 2
+            else:
+                raise ValueError('invalid argument')
+
+    def _execute(self, ctx: CommandContext):
+        db = ctx.db
+        matches = None
+        prefix = ""
+        if self.pattern is not None:
+            matches = compile_pattern(self.pattern)
+            prefix = pattern_prefix(self.pattern)
+
+        next_cursor, keys = db.scan(None, None, self.cursor, self.count, prefix)
+        matched_keys = []
+        for key in keys:
+            # keys deleted since the scan started are skipped
+            if not db.exists(key):
+                continue
+            if matches is not None and not matches(key):
+                continue
+            if self.type is not None and db.get_type(key) != self.type:
+                continue
+            matched_keys.append(key)
+
+        return [next_cursor, matched_keys]
+
+
 class StrlenCommand(ReadCommand):
     name = 'strlen'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -810,9 +875,7 @@ class StrlenCommand(ReadCommand):
             raise ValueError('strlen command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -824,6 +887,7 @@ class StrlenCommand(ReadCommand):
 
 class SubstrCommand(ReadCommand):
     name = 'substr'
+    arity = 4
     __slots__ = ('key', 'start', 'end')
 
     def __init__(self):
@@ -841,9 +905,7 @@ class SubstrCommand(ReadCommand):
         except ValueError:
             raise ValueError('start and end must be integers')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None
@@ -867,6 +929,7 @@ class SubstrCommand(ReadCommand):
 
 class TTLCommand(ReadCommand):
     name = 'ttl'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -877,9 +940,7 @@ class TTLCommand(ReadCommand):
             raise ValueError('ttl command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
 
         if not db.exists(self.key):
@@ -897,6 +958,7 @@ class TTLCommand(ReadCommand):
 
 class PTTLCommand(ReadCommand):
     name = 'pttl'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -907,9 +969,7 @@ class PTTLCommand(ReadCommand):
             raise ValueError('pttl command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
 
         if not db.exists(self.key):
@@ -926,6 +986,7 @@ class PTTLCommand(ReadCommand):
 
 class TypeCommand(ReadCommand):
     name = 'type'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -936,9 +997,7 @@ class TypeCommand(ReadCommand):
             raise ValueError('type command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return "none"
@@ -1,10 +1,12 @@
 import inspect
 import sys
+from typing import List, Type
 
 from litedis.core.command import (
     basiccmds,
     hashcmds,
     listcmds,
+    servercmds,
     setcmds,
     zsetcmds,
 )
@@ -12,25 +14,51 @@ from litedis.core.command.base import Command
 
 
 def _import_class(module_name):
-    return {cls.__dict__["name"]: cls
+    # names starting with an underscore belong to shared base classes
+    return {cls.__dict__["name"].lower(): cls
             for name, cls in inspect.getmembers(sys.modules[module_name], inspect.isclass)
-            if issubclass(cls, Command) and cls.__dict__.get("name") is not None}
+            if issubclass(cls, Command) and cls.__dict__.get("name") is not None
+            and not cls.__dict__["name"].startswith("_")}
 
 
 _parsers = {}
 _parsers.update(_import_class(basiccmds.__name__))
 _parsers.update(_import_class(hashcmds.__name__))
 _parsers.update(_import_class(listcmds.__name__))
+_parsers.update(_import_class(servercmds.__name__))
 _parsers.update(_import_class(setcmds.__name__))
 _parsers.update(_import_class(zsetcmds.__name__))
 
 
 class CommandFactory:
 
+    @staticmethod
+    def get_class(command_name: str) -> Type[Command]:
+        """
+        Look up a command by name, case-insensitively
+        """
+        cls = _parsers.get(command_name)
+        if cls is None:
+            cls = _parsers.get(command_name.lower())
+            if cls is None:
+                raise ValueError(f"unknown command name: {command_name}")
+        return cls
+
     @staticmethod
     def create(command_name: str) -> Command:
-        name = command_name
-        if name not in _parsers:
-            raise ValueError(f"unknown command name: {command_name}")
+        return CommandFactory.get_class(command_name)()
+
+    @staticmethod
+    def create_from_tokens(cmdtokens: List[str]) -> Command:
+        """
+        Create the command of the tokens after checking their number
+        against the arity of the command
+        """
+        if not cmdtokens:
+            raise ValueError("empty command")
 
-        return _parsers[name]()
+        cls = _parsers.get(cmdtokens[0]) or CommandFactory.get_class(cmdtokens[0])
+        arity = cls.arity
+        if (len(cmdtokens) != arity) if arity >= 0 else (len(cmdtokens) < -arity):
+            raise ValueError(f"wrong number of arguments for '{cls.name}' command")
+        return cls()
@@ -1,10 +1,30 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from litedis.core.command.base import CommandContext, ReadCommand, WriteCommand
+from litedis.core.command.base import CommandContext, ReadCommand, WriteCommand, to_float, to_int
+from litedis.core.command.pattern import compile_pattern
+
+
+def _set_fields(db, key: str, value: dict, pairs: List[Tuple[str, str]]) -> int:
+    """
+    Set fields of the hash at key in place and account their size,
+    return the number of fields that were not in the hash
+    """
+    added = []
+    removed = []
+    for field, val in pairs:
+        old = value.get(field)
+        if old is not None:
+            removed.append((field, old))
+        value[field] = val
+        added.append((field, val))
+    db.account_elements(key, added, removed)
+    return len(pairs) - len(removed)
 
 
 class HDelCommand(WriteCommand):
     name = 'hdel'
+    arity = -3
+    flags = ('write',)
     __slots__ = ('key', 'fields')
 
     def __init__(self):
@@ -17,31 +37,30 @@ class HDelCommand(WriteCommand):
         self.key = tokens[1]
         self.fields = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
 
-        value = db.get_dict(self.key)
+        value = db.get_dict(self.key, for_write=True)
 
-        deleted_count = 0
+        removed = []
         for field in self.fields:
             if field in value:
-                del value[field]
-                deleted_count += 1
+                removed.append((field, value.pop(field)))
 
         if not value:  # If hash is empty after deletion
             db.delete(self.key)
         else:
+            db.account_elements(self.key, removed=removed)
             db.set(self.key, value)
 
-        return deleted_count
+        return len(removed)
 
 
 class HExistsCommand(ReadCommand):
     name = 'hexists'
+    arity = 3
     __slots__ = ('key', 'field')
 
     def __init__(self):
@@ -54,9 +73,7 @@ class HExistsCommand(ReadCommand):
         self.key = tokens[1]
         self.field = tokens[2]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -68,6 +85,7 @@ class HExistsCommand(ReadCommand):
 
 class HGetCommand(ReadCommand):
     name = 'hget'
+    arity = 3
     __slots__ = ('key', 'field')
 
     def __init__(self):
@@ -80,9 +98,17 @@ class HGetCommand(ReadCommand):
         self.key = tokens[1]
         self.field = tokens[2]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, field: str) -> "HGetCommand":
+        command = cls()
+        command.key = key
+        command.field = field
+        return command
+
+    def to_tokens(self) -> List[str]:
+        return ['hget', self.key, self.field]
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None
@@ -94,6 +120,7 @@ class HGetCommand(ReadCommand):
 
 class HGetAllCommand(ReadCommand):
     name = 'hgetall'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -104,9 +131,7 @@ class HGetAllCommand(ReadCommand):
             raise ValueError('hgetall command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
@@ -122,6 +147,7 @@ class HGetAllCommand(ReadCommand):
 
 class HIncrByCommand(WriteCommand):
     name = 'hincrby'
+    arity = 4
     __slots__ = ('key', 'field', 'increment')
 
     def __init__(self):
@@ -139,14 +165,23 @@ class HIncrByCommand(WriteCommand):
         except ValueError:
             raise ValueError('increment must be an integer')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, field: str, increment: int) -> "HIncrByCommand":
+        command = cls()
+        command.key = key
+        command.field = field
+        command.increment = to_int(increment, 'increment must be an integer')
+        return command
 
+    def to_tokens(self) -> List[str]:
+        return ['hincrby', self.key, self.field, str(self.increment)]
+
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             value = {}
         else:
-            value = db.get_dict(self.key)
+            value = db.get_dict(self.key, for_write=True)
 
         # Get current field value or initialize to 0
         try:
@@ -156,7 +191,7 @@ class HIncrByCommand(WriteCommand):
 
         # Perform increment
         new_value = current + self.increment
-        value[self.field] = str(new_value)
+        _set_fields(db, self.key, value, [(self.field, str(new_value))])
         db.set(self.key, value)
 
         return new_value
@@ -164,6 +199,7 @@ class HIncrByCommand(WriteCommand):
 
 class HIncrByFloatCommand(WriteCommand):
     name = 'hincrbyfloat'
+    arity = 4
     __slots__ = ('key', 'field', 'increment')
 
     def __init__(self):
@@ -181,14 +217,23 @@ class HIncrByFloatCommand(WriteCommand):
         except ValueError:
             raise ValueError('increment must be a float')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, field: str, increment: float) -> "HIncrByFloatCommand":
+        command = cls()
+        command.key = key
+        command.field = field
+        command.increment = to_float(increment, 'increment must be a float')
+        return command
+
+    def to_tokens(self) -> List[str]:
+        return ['hincrbyfloat', self.key, self.field, str(self.increment)]
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             value = {}
         else:
-            value = db.get_dict(self.key)
+            value = db.get_dict(self.key, for_write=True)
 
         # Get current field value or initialize to 0
         try:
@@ -203,7 +248,7 @@ class HIncrByFloatCommand(WriteCommand):
         if '.' in str_value:
             str_value = str_value.rstrip('0').rstrip('.')
 
-        value[self.field] = str_value
+        _set_fields(db, self.key, value, [(self.field, str_value)])
         db.set(self.key, value)
 
         return str_value
@@ -211,6 +256,7 @@ class HIncrByFloatCommand(WriteCommand):
 
 class HKeysCommand(ReadCommand):
     name = 'hkeys'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -221,9 +267,7 @@ class HKeysCommand(ReadCommand):
             raise ValueError('hkeys command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
@@ -235,6 +279,7 @@ class HKeysCommand(ReadCommand):
 
 class HLenCommand(ReadCommand):
     name = 'hlen'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -245,9 +290,7 @@ class HLenCommand(ReadCommand):
             raise ValueError('hlen command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -259,6 +302,7 @@ class HLenCommand(ReadCommand):
 
 class HSetCommand(WriteCommand):
     name = 'hset'
+    arity = -4
     __slots__ = ('key', 'pairs')
 
     def __init__(self):
@@ -274,27 +318,37 @@ class HSetCommand(WriteCommand):
         for i in range(2, len(tokens), 2):
             self.pairs.append((tokens[i], tokens[i + 1]))
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    @classmethod
+    def from_args(cls, key: str, mapping: Dict[str, str]) -> "HSetCommand":
+        if not mapping:
+            raise ValueError('hset command requires key and field value pairs')
+        command = cls()
+        command.key = key
+        command.pairs = list(mapping.items())
+        return command
+
+    def to_tokens(self) -> List[str]:
+        tokens = ['hset', self.key]
+        for field, value in self.pairs:
+            tokens.append(field)
+            tokens.append(value)
+        return tokens
+
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             value = {}
         else:
-            value = db.get_dict(self.key)
-
-        new_fields = 0
-        for field, val in self.pairs:
-            if field not in value:
-                new_fields += 1
-            value[field] = val
+            value = db.get_dict(self.key, for_write=True)
 
+        new_fields = _set_fields(db, self.key, value, self.pairs)
         db.set(self.key, value)
         return new_fields
 
 
 class HSetNXCommand(WriteCommand):
     name = 'hsetnx'
+    arity = 4
     __slots__ = ('key', 'field', 'value')
 
     def __init__(self):
@@ -309,20 +363,18 @@ class HSetNXCommand(WriteCommand):
         self.field = tokens[2]
         self.value = tokens[3]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             value = {}
         else:
-            value = db.get_dict(self.key)
+            value = db.get_dict(self.key, for_write=True)
 
             # If field already exists, return 0
             if self.field in value:
                 return 0
 
-        value[self.field] = self.value
+        _set_fields(db, self.key, value, [(self.field, self.value)])
         db.set(self.key, value)
         return 1
 
@@ -330,6 +382,7 @@ class HSetNXCommand(WriteCommand):
 class HMGetCommand(ReadCommand):
     """Get the values of all the given hash fields"""
     name = 'hmget'
+    arity = -3
     __slots__ = ('key', 'fields')
 
     def __init__(self):
@@ -342,9 +395,7 @@ class HMGetCommand(ReadCommand):
         self.key = tokens[1]
         self.fields = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return [None] * len(self.fields)
@@ -357,6 +408,7 @@ class HMGetCommand(ReadCommand):
 
 class HValsCommand(ReadCommand):
     name = 'hvals'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -367,9 +419,7 @@ class HValsCommand(ReadCommand):
             raise ValueError('hvals command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
@@ -381,6 +431,7 @@ class HValsCommand(ReadCommand):
 
 class HStrLenCommand(ReadCommand):
     name = 'hstrlen'
+    arity = 3
     __slots__ = ('key', 'field')
 
     def __init__(self):
@@ -393,9 +444,7 @@ class HStrLenCommand(ReadCommand):
         self.key = tokens[1]
         self.field = tokens[2]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -411,6 +460,7 @@ class HStrLenCommand(ReadCommand):
 
 class HScanCommand(ReadCommand):
     name = 'hscan'
+    arity = -3
     __slots__ = ('key', 'cursor', 'pattern', 'count')
 
     def __init__(self):
@@ -442,43 +492,25 @@ class HScanCommand(ReadCommand):
                     self.count = int(tokens[i + 1])
                 except ValueError:
                     raise ValueError('count must be an integer')
+                if self.count < 1:
+                    raise ValueError('count must be positive')
                 i += 2
             else:
                 raise ValueError('invalid argument')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return [0, []]
 
         value = db.get_dict(self.key)
 
-        # Convert items to list and filter by pattern
+        next_cursor, fields = db.scan(self.key, value, self.cursor, self.count)
+        matches = compile_pattern(self.pattern) if self.pattern is not None else None
         items = []
-        for field, val in value.items():
-            if self.pattern is None or self._matches_pattern(field, self.pattern):
-                items.extend([field, val])
-
-        # If cursor is 0 or beyond list length, start from beginning
-        if self.cursor >= len(items) or self.cursor == 0:
-            start_index = 0
-        else:
-            start_index = self.cursor
-
-        # Calculate end index based on count
-        end_index = min(start_index + (self.count * 2), len(items))
-
-        # Get the subset of items for this iteration
-        result_items = items[start_index:end_index]
-
-        # Calculate next cursor
-        next_cursor = end_index if end_index < len(items) else 0
-
-        return [next_cursor, result_items]
+        for field in fields:
+            # fields deleted since the scan started are skipped
+            if field in value and (matches is None or matches(field)):
+                items.extend([field, value[field]])
 
-    def _matches_pattern(self, s: str, pattern: str) -> bool:
-        """Simple pattern matching supporting only * wildcard"""
-        import fnmatch
-        return fnmatch.fnmatch(s, pattern)
+        return [next_cursor, items]
@@ -1,10 +1,132 @@
+from collections import deque
+from itertools import islice
 from typing import Optional, List
 
-from litedis.core.command.base import CommandContext, ReadCommand, WriteCommand
+from litedis.core.command.base import (
+    BlockingCommand,
+    CommandContext,
+    ReadCommand,
+    WriteCommand,
+    parse_timeout,
+    to_int
+)
+
+
+def _parse_direction(token: str) -> str:
+    direction = token.upper()
+    if direction not in ('LEFT', 'RIGHT'):
+        raise ValueError('direction must be LEFT or RIGHT')
+    return direction
+
+
+def _move(db, source: str, destination: str, wherefrom: str, whereto: str) -> Optional[str]:
+    value = db.get_list(source, for_write=True)
+    if not value:
+        return None
+    # check the type of the destination before changing anything
+    target = db.get_list(destination, for_write=True)
+
+    element = value.popleft() if wherefrom == 'LEFT' else value.pop()
+    db.account_elements(source, removed=[element])
+    if target is None:
+        target = deque()
+    if whereto == 'LEFT':
+        target.appendleft(element)
+    else:
+        target.append(element)
+    db.account_elements(destination, added=[element])
+
+    if not value:
+        db.delete(source)
+    db.set(destination, target)
+    return element
+
+
+class BLMoveCommand(BlockingCommand):
+    name = 'blmove'
+    arity = 6
+    key_spec = (1, 2, 1)
+    __slots__ = ('source', 'destination', 'wherefrom', 'whereto')
+
+    def __init__(self):
+        super().__init__()
+        self.source: str
+        self.destination: str
+        self.wherefrom: str
+        self.whereto: str
+
+    @classmethod
+    def get_wait_keys(cls, tokens: List[str]) -> List[str]:
+        # only the source is waited for, the destination is written to
+        return tokens[1:2]
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) < 6:
+            raise ValueError('blmove command requires source, destination, wherefrom, whereto and timeout')
+        self.source = tokens[1]
+        self.destination = tokens[2]
+        self.wherefrom = _parse_direction(tokens[3])
+        self.whereto = _parse_direction(tokens[4])
+        self.timeout = parse_timeout(tokens[5])
+
+    def _execute(self, ctx: CommandContext):
+        element = _move(ctx.db, self.source, self.destination, self.wherefrom, self.whereto)
+        if element is not None:
+            self.effect = ['lmove', self.source, self.destination, self.wherefrom, self.whereto]
+        return element
+
+
+class BLPopCommand(BlockingCommand):
+    name = 'blpop'
+    # the command served data is logged as
+    pop_name = 'lpop'
+    arity = -3
+    key_spec = (1, -2, 1)
+    __slots__ = ('keys',)
+
+    def __init__(self):
+        super().__init__()
+        self.keys: List[str]
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) < 3:
+            raise ValueError(f'{self.name} command requires at least one key and timeout')
+        self.keys = tokens[1:-1]
+        self.timeout = parse_timeout(tokens[-1])
+
+    def _pop(self, value: deque) -> str:
+        return value.popleft()
+
+    def _execute(self, ctx: CommandContext):
+        db = ctx.db
+        # the first key holding data is served
+        for key in self.keys:
+            value = db.get_list(key, for_write=True)
+            if not value:
+                continue
+            element = self._pop(value)
+            if value:
+                db.account_elements(key, removed=[element])
+                db.set(key, value)
+            else:
+                db.delete(key)
+            self.effect = [self.pop_name, key]
+            return [key, element]
+        return None
+
+
+class BRPopCommand(BLPopCommand):
+    name = 'brpop'
+    pop_name = 'rpop'
+    __slots__ = ()
+
+    def _pop(self, value: deque) -> str:
+        return value.pop()
 
 
 class LIndexCommand(ReadCommand):
     name = 'lindex'
+    arity = 3
     __slots__ = ('key', 'index')
 
     def __init__(self):
@@ -20,9 +142,17 @@ class LIndexCommand(ReadCommand):
         except ValueError:
             raise ValueError('index must be an integer')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, index: int) -> "LIndexCommand":
+        command = cls()
+        command.key = key
+        command.index = to_int(index, 'index must be an integer')
+        return command
+
+    def to_tokens(self) -> List[str]:
+        return ['lindex', self.key, str(self.index)]
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None
@@ -43,6 +173,7 @@ class LIndexCommand(ReadCommand):
 
 class LInsertCommand(WriteCommand):
     name = 'linsert'
+    arity = 5
     __slots__ = ('key', 'before', 'pivot', 'element')
 
     def __init__(self):
@@ -64,14 +195,12 @@ class LInsertCommand(WriteCommand):
         self.pivot = tokens[3]
         self.element = tokens[4]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
 
-        value = db.get_list(self.key)
+        value = db.get_list(self.key, for_write=True)
 
         # Find pivot
         try:
@@ -82,6 +211,7 @@ class LInsertCommand(WriteCommand):
         # Insert element
         insert_index = pivot_index if self.before else pivot_index + 1
         value.insert(insert_index, self.element)
+        db.account_elements(self.key, added=[self.element])
         db.set(self.key, value)
 
         return len(value)
@@ -89,6 +219,7 @@ class LInsertCommand(WriteCommand):
 
 class LLenCommand(ReadCommand):
     name = 'llen'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -99,9 +230,7 @@ class LLenCommand(ReadCommand):
             raise ValueError('llen command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -111,8 +240,34 @@ class LLenCommand(ReadCommand):
         return len(value)
 
 
+class LMoveCommand(WriteCommand):
+    name = 'lmove'
+    arity = 5
+    key_spec = (1, 2, 1)
+    __slots__ = ('source', 'destination', 'wherefrom', 'whereto')
+
+    def __init__(self):
+        self.source: str
+        self.destination: str
+        self.wherefrom: str
+        self.whereto: str
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) < 5:
+            raise ValueError('lmove command requires source, destination, wherefrom and whereto')
+        self.source = tokens[1]
+        self.destination = tokens[2]
+        self.wherefrom = _parse_direction(tokens[3])
+        self.whereto = _parse_direction(tokens[4])
+
+    def _execute(self, ctx: CommandContext):
+        return _move(ctx.db, self.source, self.destination, self.wherefrom, self.whereto)
+
+
 class LPopCommand(WriteCommand):
     name = 'lpop'
+    arity = -2
+    flags = ('write',)
     __slots__ = ('key', 'count')
 
     def __init__(self):
@@ -133,26 +288,25 @@ class LPopCommand(WriteCommand):
             except ValueError:
                 raise ValueError('count must be a positive integer')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None
 
-        value = db.get_list(self.key)
+        value = db.get_list(self.key, for_write=True)
 
         if not value:
             return None
 
         if self.count is None:
             # Pop single element
-            result = value.pop(0)
+            result = value.popleft()
+            db.account_elements(self.key, removed=[result])
         else:
             # Pop multiple elements
             count = min(self.count, len(value))
-            result = value[:count]
-            value = value[count:]
+            result = [value.popleft() for _ in range(count)]
+            db.account_elements(self.key, removed=result)
 
         if value:
             db.set(self.key, value)
@@ -164,6 +318,7 @@ class LPopCommand(WriteCommand):
 
 class LPushCommand(WriteCommand):
     name = 'lpush'
+    arity = -3
     __slots__ = ('key', 'elements')
 
     def __init__(self):
@@ -176,18 +331,16 @@ class LPushCommand(WriteCommand):
         self.key = tokens[1]
         self.elements = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
-            value = []
+            value = deque()
         else:
-            value = db.get_list(self.key)
+            value = db.get_list(self.key, for_write=True)
 
-        # Prepend elements
-        for element in self.elements:
-            value.insert(0, element)
+        # Prepend elements, each one ends up in front of the previous one
+        value.extendleft(self.elements)
+        db.account_elements(self.key, added=self.elements)
 
         db.set(self.key, value)
         return len(value)
@@ -197,17 +350,16 @@ class LPushXCommand(LPushCommand):
     name = 'lpushx'
     __slots__ = ()
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         if not ctx.db.exists(self.key):
             return 0
 
-        return super().execute(ctx)
+        return super()._execute(ctx)
 
 
 class LRangeCommand(ReadCommand):
     name = 'lrange'
+    arity = 4
     __slots__ = ('key', 'start', 'stop')
 
     def __init__(self):
@@ -225,9 +377,18 @@ class LRangeCommand(ReadCommand):
         except ValueError:
             raise ValueError('start and stop must be integers')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, start: int, stop: int) -> "LRangeCommand":
+        command = cls()
+        command.key = key
+        command.start = to_int(start, 'start and stop must be integers')
+        command.stop = to_int(stop, 'start and stop must be integers')
+        return command
+
+    def to_tokens(self) -> List[str]:
+        return ['lrange', self.key, str(self.start), str(self.stop)]
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
@@ -245,12 +406,21 @@ class LRangeCommand(ReadCommand):
         # Ensure indices are within bounds
         start = max(0, min(start, length))
         stop = max(0, min(stop + 1, length))  # +1 because Redis includes stop index
+        if start >= stop:
+            return []
 
-        return value[start:stop]
+        # walk from the nearer end, a deque cannot be sliced
+        if start <= length - stop:
+            return list(islice(value, start, stop))
+        result = list(islice(reversed(value), length - stop, length - start))
+        result.reverse()
+        return result
 
 
 class LRemCommand(WriteCommand):
     name = 'lrem'
+    arity = 4
+    flags = ('write',)
     __slots__ = ('key', 'count', 'element')
 
     def __init__(self):
@@ -268,38 +438,39 @@ class LRemCommand(WriteCommand):
             raise ValueError('count must be an integer')
         self.element = tokens[3]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
 
-        value = db.get_list(self.key)
+        value = db.get_list(self.key, for_write=True)
 
-        removed = 0
+        # rebuild the list in one pass, removing from the middle of a deque is O(n)
+        original_length = len(value)
         if self.count > 0:
             # Remove count elements from head to tail
-            i = 0
-            while i < len(value) and removed < self.count:
-                if value[i] == self.element:
-                    value.pop(i)
+            kept = deque()
+            removed = 0
+            for x in value:
+                if removed < self.count and x == self.element:
                     removed += 1
                 else:
-                    i += 1
+                    kept.append(x)
+            value = kept
         elif self.count < 0:
             # Remove count elements from tail to head
-            i = len(value) - 1
-            while i >= 0 and removed < -self.count:
-                if value[i] == self.element:
-                    value.pop(i)
+            kept = deque()
+            removed = 0
+            for x in reversed(value):
+                if removed < -self.count and x == self.element:
                     removed += 1
-                i -= 1
+                else:
+                    kept.appendleft(x)
+            value = kept
         else:
             # Remove all elements equal to element
-            original_length = len(value)
-            value = [x for x in value if x != self.element]
-            removed = original_length - len(value)
+            value = deque(x for x in value if x != self.element)
+        removed = original_length - len(value)
 
         if value:
             db.set(self.key, value)
@@ -311,6 +482,7 @@ class LRemCommand(WriteCommand):
 
 class LSetCommand(WriteCommand):
     name = 'lset'
+    arity = 4
     __slots__ = ('key', 'index', 'element')
 
     def __init__(self):
@@ -328,14 +500,12 @@ class LSetCommand(WriteCommand):
             raise ValueError('index must be an integer')
         self.element = tokens[3]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             raise ValueError("no such key")
 
-        value = db.get_list(self.key)
+        value = db.get_list(self.key, for_write=True)
 
         # Handle negative indices
         index = self.index
@@ -346,6 +516,7 @@ class LSetCommand(WriteCommand):
         if index < 0 or index >= len(value):
             raise ValueError("index out of range")
 
+        db.account_elements(self.key, added=[self.element], removed=[value[index]])
         value[index] = self.element
         db.set(self.key, value)
         return "OK"
@@ -353,6 +524,8 @@ class LSetCommand(WriteCommand):
 
 class LTrimCommand(WriteCommand):
     name = 'ltrim'
+    arity = 4
+    flags = ('write',)
     __slots__ = ('key', 'start', 'stop')
 
     def __init__(self):
@@ -370,14 +543,12 @@ class LTrimCommand(WriteCommand):
         except ValueError:
             raise ValueError('start and stop must be integers')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return "OK"
 
-        value = db.get_list(self.key)
+        value = db.get_list(self.key, for_write=True)
 
         # Handle negative indices
         start, stop = self.start, self.stop
@@ -391,8 +562,13 @@ class LTrimCommand(WriteCommand):
         start = max(0, min(start, length))
         stop = max(0, min(stop + 1, length))  # +1 because Redis includes stop index
 
-        # Trim the list
-        value = value[start:stop]
+        # Trim the list at both ends
+        if start >= stop:
+            value.clear()
+        else:
+            removed = [value.pop() for _ in range(length - stop)]
+            removed.extend(value.popleft() for _ in range(start))
+            db.account_elements(self.key, removed=removed)
 
         if value:
             db.set(self.key, value)
@@ -404,6 +580,8 @@ class LTrimCommand(WriteCommand):
 
 class RPopCommand(WriteCommand):
     name = 'rpop'
+    arity = -2
+    flags = ('write',)
     __slots__ = ('key', 'count')
 
     def __init__(self):
@@ -424,14 +602,12 @@ class RPopCommand(WriteCommand):
             except ValueError:
                 raise ValueError('count must be a positive integer')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None
 
-        value = db.get_list(self.key)
+        value = db.get_list(self.key, for_write=True)
 
         if not value:
             return None
@@ -439,12 +615,12 @@ class RPopCommand(WriteCommand):
         if self.count is None:
             # Pop single element
             result = value.pop()
+            db.account_elements(self.key, removed=[result])
         else:
             # Pop multiple elements
             count = min(self.count, len(value))
-            result = value[-count:]
-            result.reverse()
-            value = value[:-count]
+            result = [value.pop() for _ in range(count)]
+            db.account_elements(self.key, removed=result)
 
         if value:
             db.set(self.key, value)
@@ -456,6 +632,7 @@ class RPopCommand(WriteCommand):
 
 class RPushCommand(WriteCommand):
     name = 'rpush'
+    arity = -3
     __slots__ = ('key', 'elements')
 
     def __init__(self):
@@ -468,17 +645,16 @@ class RPushCommand(WriteCommand):
         self.key = tokens[1]
         self.elements = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
-            value = []
+            value = deque()
         else:
-            value = db.get_list(self.key)
+            value = db.get_list(self.key, for_write=True)
 
         # Append elements
         value.extend(self.elements)
+        db.account_elements(self.key, added=self.elements)
 
         db.set(self.key, value)
         return len(value)
@@ -488,19 +664,27 @@ class RPushXCommand(RPushCommand):
     name = 'rpushx'
     __slots__ = ()
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         if not ctx.db.exists(self.key):
             return 0
 
-        return super().execute(ctx)
+        return super()._execute(ctx)
 
 
 class SortCommand(WriteCommand):
     name = 'sort'
+    arity = -2
+    flags = ('write', 'denyoom', 'movablekeys')
     __slots__ = ('key', 'desc', 'alpha', 'store_key')
 
+    @classmethod
+    def get_keys(cls, tokens: List[str]) -> List[str]:
+        keys = tokens[1:2]
+        for i in range(2, len(tokens) - 1):
+            if tokens[i].upper() == 'STORE':
+                keys.append(tokens[i + 1])
+        return keys
+
     def __init__(self):
         self.key: str
         self.desc: bool
@@ -530,9 +714,7 @@ class SortCommand(WriteCommand):
             else:
                 raise ValueError(f'Invalid argument: {tokens[i]}')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
@@ -540,7 +722,7 @@ class SortCommand(WriteCommand):
         value = db.get_list(self.key)
 
         # Make a copy of the list
-        sorted_list = value.copy()
+        sorted_list = list(value)
 
         # Sort the list
         try:
@@ -555,7 +737,7 @@ class SortCommand(WriteCommand):
 
         # Store the result if requested
         if self.store_key:
-            db.set(self.store_key, sorted_list)
+            db.set(self.store_key, deque(sorted_list))
             return len(sorted_list)
 
         return sorted_list
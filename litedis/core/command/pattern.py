@@ -0,0 +1,136 @@
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+PATTERN_CACHE_SIZE = 1024
+
+_SPECIAL = '*?[\\'
+
+
+def _literal_prefix(pattern: str) -> Tuple[str, int]:
+    """
+    Return the literal text the pattern starts with, escapes resolved,
+    and the index of the first wildcard (len(pattern) if there is none)
+    """
+    chars = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern):
+            chars.append(pattern[i + 1])
+            i += 2
+        elif c in '*?[':
+            break
+        else:
+            chars.append(c)
+            i += 1
+    return ''.join(chars), i
+
+
+def _translate_class(pattern: str, i: int) -> Tuple[Optional[str], int]:
+    """
+    Translate the character class starting after the `[` at i - 1,
+    return the regex and the index after the closing `]`,
+    or None if the class is not closed
+    """
+    negate = i < len(pattern) and pattern[i] == '^'
+    if negate:
+        i += 1
+    items: List[str] = []
+    while i < len(pattern):
+        c = pattern[i]
+        if c == ']':
+            if not items:
+                # an empty class matches nothing, a negated one any character
+                return ('.' if negate else '(?!)'), i + 1
+            return f"[{'^' if negate else ''}{''.join(items)}]", i + 1
+        if c == '\\' and i + 1 < len(pattern):
+            items.append(re.escape(pattern[i + 1]))
+            i += 2
+        elif i + 2 < len(pattern) and pattern[i + 1] == '-' and pattern[i + 2] != ']':
+            start, end = c, pattern[i + 2]
+            if start > end:
+                # like redis, a reversed range is swapped
+                start, end = end, start
+            items.append(f'{re.escape(start)}-{re.escape(end)}')
+            i += 3
+        else:
+            items.append(re.escape(c))
+            i += 1
+    return None, i
+
+
+def _translate(pattern: str) -> str:
+    result = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern):
+            result.append(re.escape(pattern[i + 1]))
+            i += 2
+        elif c == '*':
+            # consecutive stars match the same as one
+            while i < len(pattern) and pattern[i] == '*':
+                i += 1
+            result.append('.*')
+        elif c == '?':
+            result.append('.')
+            i += 1
+        elif c == '[':
+            regex, end = _translate_class(pattern, i + 1)
+            if regex is None:
+                # an unclosed [ matches itself
+                result.append(re.escape(c))
+                i += 1
+            else:
+                result.append(regex)
+                i = end
+        else:
+            result.append(re.escape(c))
+            i += 1
+    return ''.join(result)
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern: str) -> Callable[[str], bool]:
+    """
+    Compile a redis glob pattern into a function telling whether a string
+    matches it. Supported wildcards:
+
+        *      matches any sequence of characters
+        ?      matches any single character
+        [abc]  matches one of the characters, [^abc] any other, [a-z] a range
+        \\x     matches x literally
+
+    Compiled patterns are cached, patterns that are a literal, a literal
+    prefix or suffix followed or preceded by * are matched without a regex.
+    """
+    prefix, end = _literal_prefix(pattern)
+    rest = pattern[end:]
+    if not rest:
+        return prefix.__eq__
+    if rest.strip('*') == '':
+        return lambda s: s.startswith(prefix)
+    if not prefix and rest[0] == '*':
+        suffix = rest.lstrip('*')
+        if not any(c in _SPECIAL for c in suffix):
+            return lambda s: s.endswith(suffix)
+        inner = suffix.rstrip('*')
+        if not any(c in _SPECIAL for c in inner):
+            return lambda s: inner in s
+
+    fullmatch = re.compile(_translate(pattern), re.DOTALL).fullmatch
+    if prefix:
+        # most strings are rejected by the prefix before the regex runs
+        return lambda s: s.startswith(prefix) and fullmatch(s) is not None
+    return lambda s: fullmatch(s) is not None
+
+
+def pattern_prefix(pattern: str) -> str:
+    """Return the literal text every string matching the pattern starts with"""
+    return _literal_prefix(pattern)[0]
+
+
+def match_pattern(pattern: str, string: str) -> bool:
+    """Return whether string matches the redis glob pattern"""
+    return compile_pattern(pattern)(string)
@@ -0,0 +1,96 @@
+from typing import List, Optional
+
+from litedis.core.command.base import CommandContext, ReadCommand, to_int
+from litedis.core.persistence.ldb import MEMORY_SAMPLES
+
+
+class BgRewriteAofCommand(ReadCommand):
+    name = 'bgrewriteaof'
+    arity = 1
+    flags = ('readonly', 'admin')
+    key_spec = None
+    __slots__ = ()
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) > 1:
+            raise ValueError('bgrewriteaof command takes no arguments')
+
+    def _execute(self, ctx: CommandContext):
+        if ctx.dbmanager is None:
+            raise ValueError('bgrewriteaof command requires a db manager')
+
+        ctx.dbmanager.rewrite_aof_in_background()
+        return "Background append only file rewriting started"
+
+
+class InfoCommand(ReadCommand):
+    name = 'info'
+    arity = -1
+    flags = ('readonly', 'admin')
+    key_spec = None
+    __slots__ = ('section',)
+
+    def __init__(self):
+        self.section: Optional[str] = None
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) > 2:
+            raise ValueError('info command takes at most one section')
+        if len(tokens) == 2:
+            self.section = tokens[1].lower()
+
+    def _execute(self, ctx: CommandContext):
+        if ctx.dbmanager is None:
+            raise ValueError('info command requires a db manager')
+
+        sections = {
+            "memory": ctx.dbmanager.get_memory_stats,
+            "persistence": ctx.dbmanager.get_aof_rewrite_stats,
+        }
+
+        if self.section is None or self.section in ("all", "default"):
+            # without memory accounting the memory section walks every key
+            names = [name for name in sections if name != "memory" or ctx.dbmanager.memory_accounting]
+        elif self.section == "everything":
+            names = list(sections)
+        elif self.section in sections:
+            names = [self.section]
+        else:
+            return {}
+
+        info = {}
+        for name in names:
+            info.update(sections[name]())
+        return info
+
+
+class MemoryCommand(ReadCommand):
+    name = 'memory'
+    arity = -3
+    key_spec = (2, 2, 1)
+    __slots__ = ('key', 'samples')
+
+    def __init__(self):
+        self.key: str
+        self.samples: int
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) < 3:
+            raise ValueError('memory command requires a subcommand and key')
+        if tokens[1].upper() != 'USAGE':
+            raise ValueError(f"unknown memory subcommand '{tokens[1]}'")
+        self.key = tokens[2]
+        self.samples = MEMORY_SAMPLES
+
+        i = 3
+        while i < len(tokens):
+            if tokens[i].upper() == 'SAMPLES' and i + 1 < len(tokens):
+                self.samples = to_int(tokens[i + 1], 'samples must be an integer')
+                if self.samples < 0:
+                    raise ValueError('samples must be non-negative')
+                i += 2
+            else:
+                raise ValueError('invalid argument')
+
+    def _execute(self, ctx: CommandContext):
+        return ctx.db.memory_usage(self.key, self.samples)
@@ -1,11 +1,13 @@
 import random
 from typing import List, Optional
 
-from litedis.core.command.base import CommandContext, ReadCommand, WriteCommand
+from litedis.core.command.base import CommandContext, ReadCommand, WriteCommand, get_numkeys_keys, to_int
+from litedis.core.command.pattern import compile_pattern
 
 
 class SAddCommand(WriteCommand):
     name = 'sadd'
+    arity = -3
     __slots__ = ('key', 'members')
 
     def __init__(self):
@@ -18,28 +20,28 @@ class SAddCommand(WriteCommand):
         self.key = tokens[1]
         self.members = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             value = set()
         else:
-            value = db.get_set(self.key)
+            value = db.get_set(self.key, for_write=True)
 
         # Count new members added
-        added = 0
+        added = []
         for member in self.members:
             if member not in value:
                 value.add(member)
-                added += 1
+                added.append(member)
 
+        db.account_elements(self.key, added=added)
         db.set(self.key, value)
-        return added
+        return len(added)
 
 
 class SCardCommand(ReadCommand):
     name = 'scard'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -50,9 +52,7 @@ class SCardCommand(ReadCommand):
             raise ValueError('scard command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -64,6 +64,8 @@ class SCardCommand(ReadCommand):
 
 class SDiffCommand(ReadCommand):
     name = 'sdiff'
+    arity = -2
+    key_spec = (1, -1, 1)
     __slots__ = ('keys',)
 
     def __init__(self):
@@ -74,9 +76,7 @@ class SDiffCommand(ReadCommand):
             raise ValueError('sdiff command requires at least one key')
         self.keys = tokens[1:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         result = None
 
@@ -100,6 +100,8 @@ class SDiffCommand(ReadCommand):
 class SInterCommand(ReadCommand):
     """Intersect multiple sets"""
     name = 'sinter'
+    arity = -2
+    key_spec = (1, -1, 1)
     __slots__ = ('keys',)
 
     def __init__(self):
@@ -110,9 +112,7 @@ class SInterCommand(ReadCommand):
             raise ValueError('sinter command requires at least one key')
         self.keys = tokens[1:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         result = None
         # Process each key
@@ -135,8 +135,14 @@ class SInterCommand(ReadCommand):
 
 class SInterCardCommand(ReadCommand):
     name = 'sintercard'
+    arity = -3
+    flags = ('readonly', 'movablekeys')
     __slots__ = ('numkeys', 'keys', 'limit')
 
+    @classmethod
+    def get_keys(cls, tokens: List[str]) -> List[str]:
+        return get_numkeys_keys(tokens)
+
     def __init__(self):
         self.numkeys: int
         self.keys: List[str]
@@ -171,9 +177,7 @@ class SInterCardCommand(ReadCommand):
             if self.limit < 0:
                 raise ValueError('limit must be non-negative')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         result = None
 
@@ -202,6 +206,7 @@ class SInterCardCommand(ReadCommand):
 
 class SIsMemberCommand(ReadCommand):
     name = 'sismember'
+    arity = 3
     __slots__ = ('key', 'member')
 
     def __init__(self):
@@ -214,9 +219,7 @@ class SIsMemberCommand(ReadCommand):
         self.key = tokens[1]
         self.member = tokens[2]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -228,6 +231,7 @@ class SIsMemberCommand(ReadCommand):
 
 class SMembersCommand(ReadCommand):
     name = 'smembers'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -238,9 +242,7 @@ class SMembersCommand(ReadCommand):
             raise ValueError('smembers command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
@@ -252,6 +254,7 @@ class SMembersCommand(ReadCommand):
 
 class SMIsMemberCommand(ReadCommand):
     name = 'smismember'
+    arity = -3
     __slots__ = ('key', 'members')
 
     def __init__(self):
@@ -264,9 +267,7 @@ class SMIsMemberCommand(ReadCommand):
         self.key = tokens[1]
         self.members = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return [0] * len(self.members)
@@ -278,6 +279,9 @@ class SMIsMemberCommand(ReadCommand):
 
 class SMoveCommand(WriteCommand):
     name = 'smove'
+    arity = 4
+    flags = ('write',)
+    key_spec = (1, 2, 1)
     __slots__ = ('source', 'destination', 'member')
 
     def __init__(self):
@@ -292,9 +296,7 @@ class SMoveCommand(WriteCommand):
         self.destination = tokens[2]
         self.member = tokens[3]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
 
         # Check source set
@@ -302,7 +304,7 @@ class SMoveCommand(WriteCommand):
             return 0
 
         try:
-            source_set = db.get_set(self.source)
+            source_set = db.get_set(self.source, for_write=True)
         except TypeError:
             raise TypeError('source value is not a set')
 
@@ -315,13 +317,16 @@ class SMoveCommand(WriteCommand):
             dest_set = set()
         else:
             try:
-                dest_set = db.get_set(self.destination)
+                dest_set = db.get_set(self.destination, for_write=True)
             except TypeError:
                 raise TypeError('destination value is not a set')
 
         # Move member
         source_set.remove(self.member)
-        dest_set.add(self.member)
+        db.account_elements(self.source, removed=[self.member])
+        if self.member not in dest_set:
+            dest_set.add(self.member)
+            db.account_elements(self.destination, added=[self.member])
 
         # Update both sets
         if source_set:
@@ -335,6 +340,8 @@ class SMoveCommand(WriteCommand):
 
 class SPopCommand(WriteCommand):
     name = 'spop'
+    arity = -2
+    flags = ('write',)
     __slots__ = ('key', 'count')
 
     def __init__(self):
@@ -355,14 +362,12 @@ class SPopCommand(WriteCommand):
             if self.count < 0:
                 raise ValueError('count must be positive')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None if self.count is None else []
 
-        value = db.get_set(self.key)
+        value = db.get_set(self.key, for_write=True)
 
         if not value:
             return None if self.count is None else []
@@ -371,11 +376,13 @@ class SPopCommand(WriteCommand):
             # Pop single element
             result = random.choice(list(value))
             value.remove(result)
+            db.account_elements(self.key, removed=[result])
         else:
             # Pop multiple elements
             count = min(self.count, len(value))
             result = random.sample(list(value), count)
             value -= set(result)
+            db.account_elements(self.key, removed=result)
 
         if value:
             db.set(self.key, value)
@@ -387,6 +394,7 @@ class SPopCommand(WriteCommand):
 
 class SRandMemberCommand(ReadCommand):
     name = 'srandmember'
+    arity = -2
     __slots__ = ('key', 'count')
 
     def __init__(self):
@@ -405,9 +413,7 @@ class SRandMemberCommand(ReadCommand):
             except ValueError:
                 raise ValueError('count must be an integer')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None if self.count is None else []
@@ -433,6 +439,8 @@ class SRandMemberCommand(ReadCommand):
 
 class SRemCommand(WriteCommand):
     name = 'srem'
+    arity = -3
+    flags = ('write',)
     __slots__ = ('key', 'members')
 
     def __init__(self):
@@ -445,31 +453,87 @@ class SRemCommand(WriteCommand):
         self.key = tokens[1]
         self.members = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
 
-        value = db.get_set(self.key)
+        value = db.get_set(self.key, for_write=True)
 
-        removed = 0
+        removed = []
         for member in self.members:
             if member in value:
                 value.remove(member)
-                removed += 1
+                removed.append(member)
 
         if value:
+            db.account_elements(self.key, removed=removed)
             db.set(self.key, value)
         else:
             db.delete(self.key)
 
-        return removed
+        return len(removed)
+
+
+class SScanCommand(ReadCommand):
+    """Incrementally iterate set members"""
+    name = 'sscan'
+    arity = -3
+    __slots__ = ('key', 'cursor', 'pattern', 'count')
+
+    def __init__(self):
+        self.key: str
+        self.cursor: int
+        self.pattern: Optional[str]
+        self.count: int
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) < 3:
+            raise ValueError('sscan command requires key and cursor')
+        self.key = tokens[1]
+        self.cursor = to_int(tokens[2], 'cursor must be a non-negative integer')
+        if self.cursor < 0:
+            raise ValueError('cursor must be non-negative')
+
+        self.pattern = None
+        self.count = 10
+
+        i = 3
+        while i < len(tokens):
+            arg = tokens[i].upper()
+            if arg == 'MATCH' and i + 1 < len(tokens):
+                self.pattern = tokens[i + 1]
+                i += 2
+            elif arg == 'COUNT' and i + 1 < len(tokens):
+                self.count = to_int(tokens[i + 1], 'count must be a positive integer')
+                if self.count < 1:
+                    raise ValueError('count must be a positive integer')
+                i += 2
+            else:
+                raise ValueError('invalid argument')
+
+    def _execute(self, ctx: CommandContext):
+        db = ctx.db
+        if not db.exists(self.key):
+            return [0, []]
+
+        value = db.get_set(self.key)
+
+        next_cursor, members = db.scan(self.key, value, self.cursor, self.count)
+        matches = compile_pattern(self.pattern) if self.pattern is not None else None
+        result = []
+        for member in members:
+            # members removed since the scan started are skipped
+            if member in value and (matches is None or matches(member)):
+                result.append(member)
+
+        return [next_cursor, result]
 
 
 class SUnionCommand(ReadCommand):
     name = 'sunion'
+    arity = -2
+    key_spec = (1, -1, 1)
     __slots__ = ('keys',)
 
     def __init__(self):
@@ -480,9 +544,7 @@ class SUnionCommand(ReadCommand):
             raise ValueError('sunion command requires at least one key')
         self.keys = tokens[1:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         result = set()
 
@@ -1,23 +1,38 @@
 import random
 from collections.abc import Mapping
-from typing import Iterable, Optional
+from typing import Iterable, Iterator, Optional
 
 from sortedcontainers import SortedDict, SortedList
 
 
+class _MemberUpperBound:
+    """Sentinel that sorts after every member, used to bisect past equal scores"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_MEMBER_UPPER_BOUND = _MemberUpperBound()
+
+
 class _ValueSortedDict:
-    def __init__(self):
-        self._data = SortedDict()
-        self._sorted_by_value = SortedList(key=lambda item: item[1])
+    def __init__(self, mapping: Mapping = None):
+        # both containers are built in bulk, which is much faster than adding one by one
+        self._data = SortedDict() if mapping is None else SortedDict(mapping)
+        # (value, key) pairs, ordered by value then by key like redis does
+        self._sorted_by_value = SortedList((value, key) for key, value in self._data.items())
 
     def __setitem__(self, key, value):
         if key in self._data:
             # delete old value
             old_value = self._data[key]
-            self._sorted_by_value.discard((key, old_value))
+            self._sorted_by_value.discard((old_value, key))
         # insert new value
         self._data[key] = value
-        self._sorted_by_value.add((key, value))
+        self._sorted_by_value.add((value, key))
 
     def get(self, key, default=None):
         return self._data.get(key, default)
@@ -34,7 +49,7 @@ class _ValueSortedDict:
     def remove(self, key):
         if key in self._data:
             value = self._data.pop(key)
-            self._sorted_by_value.discard((key, value))
+            self._sorted_by_value.discard((value, key))
 
     def keys(self):
         return self._data.keys()
@@ -45,33 +60,45 @@ class _ValueSortedDict:
     def items(self):
         return self._data.items()
 
+    def irange_keys(self, minimum=None, inclusive=(True, True)):
+        return self._data.irange(minimum, None, inclusive)
+
     def pop(self, key, default=None):
         if key in self._data:
             value = self._data.pop(key)
-            self._sorted_by_value.discard((key, value))
+            self._sorted_by_value.discard((value, key))
         else:
             value = default
         return value
 
     def popitem(self, index=-1):
-        item = self._data.popitem(index)
-        self._sorted_by_value.discard(item)
-        return item
+        value, key = self._sorted_by_value.pop(index)
+        del self._data[key]
+        return key, value
+
+    def index_by_value(self, key) -> int:
+        return self._sorted_by_value.index((self._data[key], key))
+
+    def bisect_value_left(self, value) -> int:
+        return self._sorted_by_value.bisect_left((value,))
+
+    def bisect_value_right(self, value) -> int:
+        return self._sorted_by_value.bisect_right((value, _MEMBER_UPPER_BOUND))
+
+    def islice_by_value(self, start: int, stop: int, reverse=False):
+        for value, key in self._sorted_by_value.islice(start, stop, reverse=reverse):
+            yield key, value
 
 
 class SortedSet(Iterable):
     """
     Sorted Set class, used for database sorted set type.
-    Uses SortedDict of sortedcontainers as the underlying ordered structure.
+    Uses SortedDict of sortedcontainers as the underlying ordered structure,
+    plus a SortedList of (score, member) pairs for rank and score range queries.
     """
 
     def __init__(self, mapping: Mapping = None):
-        if mapping is None:
-            self._data = _ValueSortedDict()
-        else:
-            self._data = _ValueSortedDict()
-            for key, value in mapping.items():
-                self._data[key] = value
+        self._data = _ValueSortedDict(mapping)
 
     def members(self):
         return self._data.keys()
@@ -79,6 +106,15 @@ class SortedSet(Iterable):
     def scores(self):
         return self._data.values()
 
+    def members_after(self, member: Optional[str] = None) -> Iterator[str]:
+        """
+        Iterate the members in order, after member if given, whether or not
+        it is still in the set
+        """
+        if member is None:
+            return iter(self._data.keys())
+        return self._data.irange_keys(member, inclusive=(False, True))
+
     def items(self):
         return self._data.items()
 
@@ -108,6 +144,12 @@ class SortedSet(Iterable):
         m, s = item
         self[m] = s
 
+    def copy(self) -> "SortedSet":
+        """
+        Shallow copy, built in bulk from the already sorted members
+        """
+        return SortedSet(self._data)
+
     def count(self, min_: float, max_: float) -> int:
         """
         Count elements with scores between min_ and max_
@@ -115,15 +157,7 @@ class SortedSet(Iterable):
         if min_ > max_:
             raise ValueError("min_ cannot be greater than max_")
 
-        c = 0
-        for s in self.scores():
-            if s < min_:
-                continue
-            if s > max_:
-                break
-            c += 1
-
-        return c
+        return self._data.bisect_value_right(max_) - self._data.bisect_value_left(min_)
 
     def difference(self, other: "SortedSet"):
         """
@@ -182,8 +216,8 @@ class SortedSet(Iterable):
 
     def popitem(self, last=True):
         """
-        Pop an item from either end
-        :param last: If True, pop from the end; if False, pop from the beginning
+        Pop the item with the highest or lowest score
+        :param last: If True, pop the highest score; if False, pop the lowest
         :return: (member, score) tuple
         """
         return self._data.popitem(index=-1 if last else 0)
@@ -217,27 +251,29 @@ class SortedSet(Iterable):
         :return: List of (member, score) tuples
         """
 
-        if desc:
-            sorted_items = sorted(self, key=lambda x: (x[1], x[0]), reverse=True)
-        else:
-            sorted_items = list(self)
-
-        # Filter by score range
+        # Narrow down to the score range by bisecting the score index
         if min_ is not None and max_ is not None:
-            sorted_items = [(m, s)
-                            for m, s in sorted_items
-                            if min_ <= s <= max_]
+            lo = self._data.bisect_value_left(min_)
+            hi = max(self._data.bisect_value_right(max_), lo)
+        else:
+            lo, hi = 0, len(self)
+        length = hi - lo
 
         # Handle index range (Redis includes right boundary)
+        if start < 0:
+            start = max(length + start, 0)
         if end < 0:
-            end = len(sorted_items) + end + 1
+            end = length + end + 1
         else:
             end += 1
+        end = min(end, length)
 
-        if start > end:
+        if start >= end:
             return []
 
-        return sorted_items[start:end]
+        if desc:
+            return list(self._data.islice_by_value(hi - end, hi - start, reverse=True))
+        return list(self._data.islice_by_value(lo + start, lo + end))
 
     def rank(self, member: str, desc=False) -> Optional[int]:
         """
@@ -246,10 +282,10 @@ class SortedSet(Iterable):
         if member not in self:
             return None
 
+        index = self._data.index_by_value(member)
         if desc:
-            return list(reversed(self.members())).index(member)
-        else:
-            return list(self.members()).index(member)
+            return len(self) - 1 - index
+        return index
 
     score = get
 
@@ -1,12 +1,67 @@
-import re
-from typing import List, Optional, Tuple
-
-from litedis.core.command.base import CommandContext, ReadCommand, WriteCommand
+from typing import Dict, List, Optional, Tuple
+
+from litedis.core.command.base import (
+    BlockingCommand,
+    CommandContext,
+    ReadCommand,
+    WriteCommand,
+    get_numkeys_keys,
+    parse_timeout,
+    to_float
+)
+from litedis.core.command.pattern import compile_pattern
 from litedis.core.command.sortedset import SortedSet
 
 
+class BZPopMaxCommand(BlockingCommand):
+    """Remove and return the member with the highest score from the first non-empty sorted set"""
+    name = 'bzpopmax'
+    # the command served data is logged as
+    pop_name = 'zpopmax'
+    # pop the member with the highest score
+    pop_last = True
+    arity = -3
+    key_spec = (1, -2, 1)
+    __slots__ = ('keys',)
+
+    def __init__(self):
+        super().__init__()
+        self.keys: List[str]
+
+    def _parse(self, tokens: List[str]):
+        if len(tokens) < 3:
+            raise ValueError(f'{self.name} command requires at least one key and timeout')
+        self.keys = tokens[1:-1]
+        self.timeout = parse_timeout(tokens[-1])
+
+    def _execute(self, ctx: CommandContext):
+        db = ctx.db
+        for key in self.keys:
+            value = db.get_zset(key, for_write=True)
+            if not value:
+                continue
+            member, score = value.popitem(last=self.pop_last)
+            if value:
+                db.account_elements(key, removed=[member])
+                db.set(key, value)
+            else:
+                db.delete(key)
+            self.effect = [self.pop_name, key]
+            return [key, member, score]
+        return None
+
+
+class BZPopMinCommand(BZPopMaxCommand):
+    """Remove and return the member with the lowest score from the first non-empty sorted set"""
+    name = 'bzpopmin'
+    pop_name = 'zpopmin'
+    pop_last = False
+    __slots__ = ()
+
+
 class ZAddCommand(WriteCommand):
     name = 'zadd'
+    arity = -4
     __slots__ = ('key', 'score_members')
 
     def __init__(self):
@@ -33,28 +88,45 @@ class ZAddCommand(WriteCommand):
             self.score_members.append((score, member))
             i += 2
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, mapping: Dict[str, float]) -> "ZAddCommand":
+        if not mapping:
+            raise ValueError('zadd command requires key, score and member')
+        command = cls()
+        command.key = key
+        command.score_members = [(to_float(score, f'invalid score: {score}'), member)
+                                 for member, score in mapping.items()]
+        return command
+
+    def to_tokens(self) -> List[str]:
+        tokens = ['zadd', self.key]
+        for score, member in self.score_members:
+            tokens.append(str(score))
+            tokens.append(member)
+        return tokens
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             zset = SortedSet()
         else:
-            zset = db.get_zset(self.key)
+            zset = db.get_zset(self.key, for_write=True)
 
         # Add members
-        added = 0
+        added = []
         for score, member in self.score_members:
             if member not in zset:
-                added += 1
+                added.append(member)
             zset.add((member, score))
 
+        db.account_elements(self.key, added=added)
         db.set(self.key, zset)
-        return added
+        return len(added)
 
 
 class ZCardCommand(ReadCommand):
     name = 'zcard'
+    arity = 2
     __slots__ = ('key',)
 
     def __init__(self):
@@ -65,9 +137,7 @@ class ZCardCommand(ReadCommand):
             raise ValueError('zcard command requires key')
         self.key = tokens[1]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -79,6 +149,7 @@ class ZCardCommand(ReadCommand):
 
 class ZCountCommand(ReadCommand):
     name = 'zcount'
+    arity = 4
     __slots__ = ('key', 'min', 'max')
 
     def __init__(self):
@@ -96,9 +167,18 @@ class ZCountCommand(ReadCommand):
         except ValueError:
             raise ValueError('min and max must be valid float numbers')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, min_: float, max_: float) -> "ZCountCommand":
+        command = cls()
+        command.key = key
+        command.min = to_float(min_, 'min and max must be valid float numbers')
+        command.max = to_float(max_, 'min and max must be valid float numbers')
+        return command
+
+    def to_tokens(self) -> List[str]:
+        return ['zcount', self.key, str(self.min), str(self.max)]
 
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
@@ -110,8 +190,14 @@ class ZCountCommand(ReadCommand):
 
 class ZDiffCommand(ReadCommand):
     name = 'zdiff'
+    arity = -3
+    flags = ('readonly', 'movablekeys')
     __slots__ = ('numkeys', 'keys', 'withscores')
 
+    @classmethod
+    def get_keys(cls, tokens: List[str]) -> List[str]:
+        return get_numkeys_keys(tokens)
+
     def __init__(self):
         self.numkeys: int
         self.keys: List[str]
@@ -138,9 +224,7 @@ class ZDiffCommand(ReadCommand):
         if i < len(tokens) and tokens[i].upper() == 'WITHSCORES':
             self.withscores = True
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         result = None
 
@@ -169,6 +253,7 @@ class ZDiffCommand(ReadCommand):
 
 class ZIncrByCommand(WriteCommand):
     name = 'zincrby'
+    arity = 4
     __slots__ = ('key', 'increment', 'member')
 
     def __init__(self):
@@ -186,15 +271,26 @@ class ZIncrByCommand(WriteCommand):
             raise ValueError('increment must be a valid float number')
         self.member = tokens[3]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    @classmethod
+    def from_args(cls, key: str, increment: float, member: str) -> "ZIncrByCommand":
+        command = cls()
+        command.key = key
+        command.increment = to_float(increment, 'increment must be a valid float number')
+        command.member = member
+        return command
 
+    def to_tokens(self) -> List[str]:
+        return ['zincrby', self.key, str(self.increment), self.member]
+
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             zset = SortedSet()
         else:
-            zset = db.get_zset(self.key)
+            zset = db.get_zset(self.key, for_write=True)
 
+        if self.member not in zset:
+            db.account_elements(self.key, added=[self.member])
         new_score = zset.incr(self.member, self.increment)
 
         db.set(self.key, zset)
@@ -203,8 +299,14 @@ class ZIncrByCommand(WriteCommand):
 
 class ZInterCommand(ReadCommand):
     name = 'zinter'
+    arity = -3
+    flags = ('readonly', 'movablekeys')
     __slots__ = ('numkeys', 'keys', 'withscores')
 
+    @classmethod
+    def get_keys(cls, tokens: List[str]) -> List[str]:
+        return get_numkeys_keys(tokens)
+
     def __init__(self):
         self.numkeys: int
         self.keys: List[str]
@@ -230,9 +332,7 @@ class ZInterCommand(ReadCommand):
         if i < len(tokens) and tokens[i].upper() == 'WITHSCORES':
             self.withscores = True
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         result = None
 
@@ -262,8 +362,14 @@ class ZInterCommand(ReadCommand):
 class ZInterCardCommand(ReadCommand):
     """Return the number of elements in the intersection of multiple sorted sets"""
     name = 'zintercard'
+    arity = -3
+    flags = ('readonly', 'movablekeys')
     __slots__ = ('numkeys', 'keys', 'limit')
 
+    @classmethod
+    def get_keys(cls, tokens: List[str]) -> List[str]:
+        return get_numkeys_keys(tokens)
+
     def __init__(self):
         self.numkeys: int
         self.keys: List[str]
@@ -299,9 +405,7 @@ class ZInterCardCommand(ReadCommand):
             else:
                 raise ValueError('invalid argument')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         result = None
 
@@ -330,6 +434,8 @@ class ZInterCardCommand(ReadCommand):
 class ZPopMaxCommand(WriteCommand):
     """Remove and return members with the highest scores in a sorted set"""
     name = 'zpopmax'
+    arity = -2
+    flags = ('write',)
     __slots__ = ('key', 'count')
 
     def __init__(self):
@@ -350,14 +456,12 @@ class ZPopMaxCommand(WriteCommand):
             if self.count < 0:
                 raise ValueError('count must be positive')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
 
-        value = db.get_zset(self.key)
+        value = db.get_zset(self.key, for_write=True)
 
         if not value:
             return []
@@ -367,6 +471,7 @@ class ZPopMaxCommand(WriteCommand):
         for _ in range(min(self.count, len(value))):
             member, score = value.popitem(last=True)
             result.append((member, score))
+        db.account_elements(self.key, removed=[member for member, _ in result])
 
         if value:
             db.set(self.key, value)
@@ -379,6 +484,8 @@ class ZPopMaxCommand(WriteCommand):
 class ZPopMinCommand(WriteCommand):
     """Remove and return members with the lowest scores in a sorted set"""
     name = 'zpopmin'
+    arity = -2
+    flags = ('write',)
     __slots__ = ('key', 'count')
 
     def __init__(self):
@@ -399,14 +506,12 @@ class ZPopMinCommand(WriteCommand):
             if self.count < 0:
                 raise ValueError('count must be positive')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
 
-        value = db.get_zset(self.key)
+        value = db.get_zset(self.key, for_write=True)
 
         if not value:
             return []
@@ -416,6 +521,7 @@ class ZPopMinCommand(WriteCommand):
         for _ in range(min(self.count, len(value))):
             member, score = value.popitem(last=False)
             result.append((member, score))
+        db.account_elements(self.key, removed=[member for member, _ in result])
 
         if value:
             db.set(self.key, value)
@@ -427,6 +533,7 @@ class ZPopMinCommand(WriteCommand):
 
 class ZRandMemberCommand(ReadCommand):
     name = 'zrandmember'
+    arity = -2
     __slots__ = ('key', 'count', 'withscores')
 
     def __init__(self):
@@ -453,9 +560,7 @@ class ZRandMemberCommand(ReadCommand):
                 except ValueError:
                     raise ValueError('count must be an integer')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None if self.count is None else []
@@ -484,8 +589,14 @@ class ZRandMemberCommand(ReadCommand):
 class ZMPopCommand(WriteCommand):
     """Remove and return members from one or more sorted sets"""
     name = 'zmpop'
+    arity = -4
+    flags = ('write', 'movablekeys')
     __slots__ = ('numkeys', 'keys', 'where', 'count')
 
+    @classmethod
+    def get_keys(cls, tokens: List[str]) -> List[str]:
+        return get_numkeys_keys(tokens)
+
     def __init__(self):
         self.numkeys: int
         self.keys: List[str]
@@ -523,9 +634,7 @@ class ZMPopCommand(WriteCommand):
                 if self.count < 0:
                     raise ValueError('count must be positive')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
 
         # Find first non-empty sorted set
@@ -533,7 +642,7 @@ class ZMPopCommand(WriteCommand):
         target_set = None
         for key in self.keys:
             if db.exists(key):
-                value = db.get_zset(key)
+                value = db.get_zset(key, for_write=True)
                 if value:
                     target_key = key
                     target_set = value
@@ -547,6 +656,7 @@ class ZMPopCommand(WriteCommand):
         for _ in range(min(self.count, len(target_set))):
             member, score = target_set.popitem(last=self.where == 'MAX')
             result.append((member, score))
+        db.account_elements(target_key, removed=[member for member, _ in result])
 
         # Update or delete the set
         if target_set:
@@ -560,6 +670,7 @@ class ZMPopCommand(WriteCommand):
 class ZRangeCommand(ReadCommand):
     """Return a range of members in a sorted set"""
     name = 'zrange'
+    arity = -4
     __slots__ = ('key', 'start', 'stop', 'withscores', 'rev')
 
     def __init__(self):
@@ -593,9 +704,7 @@ class ZRangeCommand(ReadCommand):
                 raise ValueError(f'Invalid argument: {tokens[i]}')
             i += 1
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
@@ -613,6 +722,7 @@ class ZRangeCommand(ReadCommand):
 class _ZRangeByScoreCommand(ReadCommand):
     """Return a range of members in a sorted set by score"""
     name = '_zrangebyscore'
+    arity = -4
     __slots__ = ('desc', 'key', 'min', 'max', 'withscores', 'limit')
 
     def __init__(self, desc):
@@ -653,21 +763,22 @@ class _ZRangeByScoreCommand(ReadCommand):
                 self.limit = (offset, count)
                 i = i + 3
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return []
 
         value = db.get_zset(self.key)
 
-        # Use range with score limits
-        result = value.range(0, -1, min_=self.min, max_=self.max, desc=self.desc)
-
-        if self.limit is not None:
+        # Use range with score limits, LIMIT is applied as an index range
+        if self.limit is None:
+            start, end = 0, -1
+        else:
             offset, count = self.limit
-            result = result[offset:offset + count]
+            if count == 0:
+                return []
+            start, end = offset, offset + count - 1
+        result = value.range(start, end, min_=self.min, max_=self.max, desc=self.desc)
 
         if self.withscores:
             # Flatten the result into [member1, score1, member2, score2, ...]
@@ -693,6 +804,7 @@ class ZRevRangeByScoreCommand(_ZRangeByScoreCommand):
 
 class _ZRankCommand(ReadCommand):
     name = '_zrank'
+    arity = -3
     __slots__ = ('desc', 'key', 'member', 'withscores')
 
     def __init__(self, desc):
@@ -711,9 +823,7 @@ class _ZRankCommand(ReadCommand):
         if len(tokens) > 3 and tokens[3].upper() == 'WITHSCORES':
             self.withscores = True
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None
@@ -740,6 +850,8 @@ class ZRankCommand(_ZRankCommand):
 
 class ZRemCommand(WriteCommand):
     name = 'zrem'
+    arity = -3
+    flags = ('write',)
     __slots__ = ('key', 'members')
 
     def __init__(self):
@@ -752,32 +864,33 @@ class ZRemCommand(WriteCommand):
         self.key = tokens[1]
         self.members = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
 
-        value = db.get_zset(self.key)
+        value = db.get_zset(self.key, for_write=True)
 
-        removed = 0
+        removed = []
         for member in self.members:
             if member in value:
                 value.pop(member)
-                removed += 1
+                removed.append(member)
+        db.account_elements(self.key, removed=removed)
 
         if value:
             db.set(self.key, value)
         else:
             db.delete(self.key)
 
-        return removed
+        return len(removed)
 
 
 class ZRemRangeByScoreCommand(WriteCommand):
     """Remove all members in a sorted set within the given scores"""
     name = 'zremrangebyscore'
+    arity = 4
+    flags = ('write',)
     __slots__ = ('key', 'min', 'max')
 
     def __init__(self):
@@ -795,22 +908,20 @@ class ZRemRangeByScoreCommand(WriteCommand):
         except ValueError:
             raise ValueError('min and max must be valid float numbers')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return 0
 
-        value = db.get_zset(self.key)
+        value = db.get_zset(self.key, for_write=True)
 
         # Get members to remove
-        to_remove = [member for member, score in value.items()
-                     if self.min <= score <= self.max]
+        to_remove = [member for member, _ in value.range(0, -1, min_=self.min, max_=self.max)]
 
         # Remove members
         for member in to_remove:
             value.pop(member)
+        db.account_elements(self.key, removed=to_remove)
 
         if value:
             db.set(self.key, value)
@@ -831,6 +942,7 @@ class ZRevRankCommand(_ZRankCommand):
 class ZScanCommand(ReadCommand):
     """Incrementally iterate sorted set elements and associated scores"""
     name = 'zscan'
+    arity = -3
     __slots__ = ('key', 'cursor', 'pattern', 'count')
 
     def __init__(self):
@@ -870,86 +982,29 @@ class ZScanCommand(ReadCommand):
             else:
                 raise ValueError(f'Invalid argument: {tokens[i]}')
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return [0, []]
 
         value = db.get_zset(self.key)
 
-        # Convert to list of member-score pairs
-        items = list(value.items())
-        total_items = len(items)
-
-        if total_items == 0:
-            return [0, []]
-
-        # Calculate start position from cursor
-        start_pos = self.cursor % total_items
-
-        # Get items starting from cursor position
+        next_cursor, members = db.scan(self.key, value, self.cursor, self.count)
+        matches = compile_pattern(self.pattern) if self.pattern is not None else None
         result = []
-        count = 0
-        pos = start_pos
-
-        while count < self.count and len(result) / 2 < total_items:
-            member, score = items[pos]
-            if self.pattern is None or self._matches_pattern(member, self.pattern):
+        for member in members:
+            # members removed since the scan started are skipped
+            score = value.get(member)
+            if score is not None and (matches is None or matches(member)):
                 result.extend([member, str(score)])
-                count += 1
-            pos = (pos + 1) % total_items
-            if pos == start_pos:  # We've scanned all items
-                break
-
-        # Calculate next cursor
-        next_cursor = pos if pos != 0 and count == self.count else 0
 
         return [next_cursor, result]
 
-    def _matches_pattern(self, string: str, pattern: str) -> bool:
-        """
-        Match a string against a Redis-style pattern.
-        Supports * and ? wildcards:
-        * matches zero or more characters
-        ? matches exactly one character
-
-        Examples:
-            h?llo matches hello, hallo but not heello
-            h*llo matches hello, hallo, heello
-            h[ae]llo matches hello and hallo, but not hillo
-            h[^e]llo matches hallo, hbllo but not hello
-            h[a-b]llo matches hallo and hbllo
-
-        Args:
-            string: The string to match
-            pattern: The pattern to match against
-
-        Returns:
-            bool: True if the string matches the pattern
-        """
-        if not pattern:
-            return not string
-
-        pattern = re.escape(pattern)
-
-        pattern = pattern.replace(r'\*', '.*')  # *
-        pattern = pattern.replace(r'\?', '.')  # ?
-
-        # handle [...] and [^...]
-        pattern = re.sub(r'\\\[(.*?)\\\]', r'[\1]', pattern)  # noqa
-
-        try:
-            regex = re.compile(f'^{pattern}$')
-            return bool(regex.match(string))
-        except re.error:
-            return False
-
 
 class ZScoreCommand(ReadCommand):
     """Get the score associated with the given member"""
     name = 'zscore'
+    arity = 3
     __slots__ = ('key', 'member')
 
     def __init__(self):
@@ -962,9 +1017,7 @@ class ZScoreCommand(ReadCommand):
         self.key = tokens[1]
         self.member = tokens[2]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         if not db.exists(self.key):
             return None
@@ -977,8 +1030,14 @@ class ZScoreCommand(ReadCommand):
 class ZUnionCommand(ReadCommand):
     """Return the union of multiple sorted sets"""
     name = 'zunion'
+    arity = -3
+    flags = ('readonly', 'movablekeys')
     __slots__ = ('numkeys', 'keys', 'withscores')
 
+    @classmethod
+    def get_keys(cls, tokens: List[str]) -> List[str]:
+        return get_numkeys_keys(tokens)
+
     def __init__(self):
         self.numkeys: int
         self.keys: List[str]
@@ -1005,9 +1064,7 @@ class ZUnionCommand(ReadCommand):
             if tokens[2 + self.numkeys].upper() == 'WITHSCORES':
                 self.withscores = True
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
-
+    def _execute(self, ctx: CommandContext):
         db = ctx.db
         result = None
 
@@ -1034,6 +1091,7 @@ class ZUnionCommand(ReadCommand):
 class ZMScoreCommand(ReadCommand):
     """Get the score associated with multiple members"""
     name = 'zmscore'
+    arity = -3
     __slots__ = ('key', 'members')
 
     def __init__(self):
@@ -1046,8 +1104,7 @@ class ZMScoreCommand(ReadCommand):
         self.key = tokens[1]
         self.members = tokens[2:]
 
-    def execute(self, ctx: CommandContext):
-        self._parse(ctx.cmdtokens)
+    def _execute(self, ctx: CommandContext):
         
         db = ctx.db
         if not db.exists(self.key):
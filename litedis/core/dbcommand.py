@@ -1,5 +1,6 @@
 import time
-from typing import Iterable, Dict
+from collections import deque
+from typing import Iterable, Dict, Optional
 
 from litedis.core.command.base import CommandContext
 from litedis.core.command.factory import CommandFactory
@@ -13,7 +14,10 @@ class DBCommandConverter:
     @classmethod
     def dbs_to_commands(cls, dbs: Dict[str, LitedisDB]):
         for dbname, db in dbs.items():
-            for key in db.keys():
+            # expired keys are deleted while they are checked
+            for key in list(db.keys()):
+                if not db.exists(key):
+                    continue
                 cmdtokens = cls._convert_db_object_to_cmdtokens(key, db)
                 yield DBCommandPair(dbname, cmdtokens)
 
@@ -29,7 +33,7 @@ class DBCommandConverter:
             pieces = ['hset', key]
             for field, val in value.items():
                 pieces.extend([field, str(val)])
-        elif isinstance(value, list):
+        elif isinstance(value, deque):
             pieces = ['rpush', key, *value]
         elif isinstance(value, set):
             pieces = ['sadd', key, *value]
@@ -49,8 +53,11 @@ class DBCommandConverter:
         return pieces
 
     @classmethod
-    def commands_to_dbs(cls, dbcmds: Iterable[DBCommandPair]) -> Dict[str, LitedisDB]:
-        dbs = {}
+    def commands_to_dbs(cls,
+                        dbcmds: Iterable[DBCommandPair],
+                        dbs: Optional[Dict[str, LitedisDB]] = None) -> Dict[str, LitedisDB]:
+        if dbs is None:
+            dbs = {}
         for dbcmd in dbcmds:
             dbname, cmdtokens = dbcmd
 
@@ -60,7 +67,7 @@ class DBCommandConverter:
                 dbs[dbname] = db
 
             ctx = CommandContext(db, cmdtokens)
-            command = CommandFactory.create(cmdtokens[0])
+            command = CommandFactory.create_from_tokens(cmdtokens)
             command.execute(ctx)
 
         return dbs
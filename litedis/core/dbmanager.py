@@ -1,27 +1,79 @@
+import logging
 import time
-from collections import defaultdict
+import weakref
 from pathlib import Path
-from threading import Lock, Thread
-from typing import Union, Optional, Dict
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Deque, Union, Optional, Dict, List, Tuple
 
-from litedis.core.command.base import CommandContext
+from litedis.core.command.base import Command, CommandContext
 from litedis.core.command.factory import CommandFactory
 from litedis.core.dbcommand import DBCommandConverter, DBCommandPair
 from litedis.core.persistence import AOF
 from litedis.core.persistence import LitedisDB
+from litedis.core.persistence.ldb import EVICTION_POLICIES
+from litedis.core.persistence import Snapshot
+from litedis.core.shardedlock import ShardedLock
 from litedis.typing import CommandProcessor, ReadWriteType
 from litedis.utils import SingletonMeta
 
+logger = logging.getLogger(__name__)
+
+# seconds between two checks of the rewrite triggers
+_AOF_REWRITE_CHECK_INTERVAL = 1
+
+# keys checked per batch of the active expire cycle, another batch of the
+# same db follows while more than the threshold percentage of it expired
+_ACTIVE_EXPIRE_CYCLE_KEYS = 20
+_ACTIVE_EXPIRE_CYCLE_THRESHOLD = 10
+# share of each tick the active expire cycle may take
+_ACTIVE_EXPIRE_CYCLE_CPU = 0.25
+
+
+def _bytes_to_human(size: int) -> str:
+    """Format a number of bytes like redis does, e.g. 1.50M"""
+    for unit in ("B", "K", "M", "G", "T"):
+        if size < 1024 or unit == "T":
+            return f"{size}B" if unit == "B" else f"{size:.2f}{unit}"
+        size /= 1024
+
 
 class DBManager(CommandProcessor, metaclass=SingletonMeta):
     _dbs: Dict[str, LitedisDB] = {}
     _dbs_lock = Lock()
-    _db_locks = defaultdict(Lock)
+    _db_locks: Dict[str, ShardedLock] = {}
 
     def __init__(self,
                  data_path: Union[str, Path] = Path("ldbdata"),
                  persistence_on=True,
-                 aof_rewrite_cycle=666):
+                 aof_rewrite_cycle=666,
+                 aof_rewrite_percentage=100,
+                 aof_rewrite_min_size=64 * 1024 * 1024,
+                 appendfsync="everysec",
+                 snapshot_on=False,
+                 snapshot_compress=False,
+                 active_expire_hz=10,
+                 db_shards=1,
+                 key_index=False,
+                 maxmemory=0,
+                 maxmemory_policy="noeviction",
+                 maxmemory_samples=5,
+                 memory_accounting=True):
+        self._db_shards = db_shards
+        self._key_index = key_index
+        self.memory_accounting = memory_accounting or bool(maxmemory)
+        if maxmemory_policy not in EVICTION_POLICIES:
+            raise ValueError(f"maxmemory_policy must be one of {', '.join(EVICTION_POLICIES)}")
+        self._maxmemory = maxmemory
+        self._maxmemory_policy = maxmemory_policy
+        self._maxmemory_samples = maxmemory_samples
+        self._evict_lock = Lock()
+        self._evicted_keys = 0
+        # callers of blocking commands waiting on a (dbname, key), oldest first
+        self._waiters: Dict[Tuple[str, str], Deque[Event]] = {}
+        self._active_expire_hz = active_expire_hz
+        self._start_active_expire_loop()
+
         self.persistence_on = persistence_on
         if not self.persistence_on:
             return
@@ -30,75 +82,565 @@ class DBManager(CommandProcessor, metaclass=SingletonMeta):
         self._data_path.mkdir(parents=True, exist_ok=True)
 
         self._aof_rewrite_cycle = aof_rewrite_cycle
+        self._aof_rewrite_percentage = aof_rewrite_percentage
+        self._aof_rewrite_min_size = aof_rewrite_min_size
+        self._appendfsync = appendfsync
+        self._snapshot_on = snapshot_on
+        self._snapshot_compress = snapshot_compress
 
         self._aof: Optional[AOF] = None
-        self._aof_lock = Lock()
+        self._snapshot: Optional[Snapshot] = None
+        self._rewrite_lock = Lock()
+        self._aof_base_size = 0
+        self._last_rewrite_time = time.monotonic()
+        self._aof_rewrite_stats = {
+            "aof_rewrites": 0,
+            "aof_last_rewrite_status": "ok",
+            "aof_last_rewrite_time_ms": -1,
+            "aof_last_rewrite_bytes": -1,
+            "aof_last_rewrite_keys": -1,
+        }
 
         self._load_aof_data()
         self._start_aof_rewrite_loop()
 
     def _load_aof_data(self):
-        self._aof = AOF(self._data_path)
+        self._aof = AOF(self._data_path, appendfsync=self._appendfsync)
+        self._snapshot = Snapshot(self._data_path, compress=self._snapshot_compress)
 
         self._replay_aof_commands()
+        self._aof.get_or_create_file()
+        # growth is measured from the size the AOF was loaded with
+        self._aof_base_size = self._aof.size()
 
     def _start_aof_rewrite_loop(self):
         if not self._aof:
             return False
 
-        if self._aof_rewrite_cycle <= 0:
+        if self._aof_rewrite_cycle <= 0 and self._aof_rewrite_percentage <= 0:
             return False
 
-        self._rewrite_aof_commands()
         self._rewrite_aof_loop()
 
     def _rewrite_aof_loop(self):
         def loop():
             while True:
-                time.sleep(self._aof_rewrite_cycle)
-                self._rewrite_aof_commands()
+                time.sleep(_AOF_REWRITE_CHECK_INTERVAL)
+                try:
+                    if self._need_rewrite_aof():
+                        self._rewrite_aof_commands()
+                except Exception:
+                    # the failure is recorded in the rewrite stats,
+                    # the next check tries again
+                    logger.exception("background AOF rewrite failed")
 
         thread = Thread(target=loop, daemon=True)
         thread.start()
 
+    def _need_rewrite_aof(self) -> bool:
+        """
+        The AOF is rewritten when it has grown by aof_rewrite_percentage
+        since the last rewrite and is at least aof_rewrite_min_size, or
+        when it has grown at all and aof_rewrite_cycle seconds have passed
+        """
+        size = self._aof.size()
+        base_size = self._aof_base_size
+
+        if self._aof_rewrite_percentage > 0 and size >= self._aof_rewrite_min_size:
+            growth = (size - base_size) * 100 / (base_size or 1)
+            if growth >= self._aof_rewrite_percentage:
+                return True
+
+        if self._aof_rewrite_cycle > 0 and size > base_size:
+            if time.monotonic() - self._last_rewrite_time >= self._aof_rewrite_cycle:
+                return True
+
+        return False
+
+    def rewrite_aof_in_background(self):
+        """
+        Start a rewrite in a background thread,
+        raise ValueError if a rewrite is already in progress
+        """
+        if not self.persistence_on:
+            raise ValueError("persistence is off")
+        if not self._rewrite_lock.acquire(blocking=False):
+            raise ValueError("background append only file rewriting already in progress")
+
+        def rewrite():
+            try:
+                self._rewrite_aof()
+            finally:
+                self._rewrite_lock.release()
+
+        thread = Thread(target=rewrite, daemon=True)
+        thread.start()
+
+    def get_aof_rewrite_stats(self) -> Dict[str, Union[int, str]]:
+        if not self.persistence_on:
+            return {}
+
+        stats = dict(self._aof_rewrite_stats)
+        stats["aof_rewrite_in_progress"] = int(self._rewrite_lock.locked())
+        stats["aof_current_size"] = self._aof.size()
+        stats["aof_base_size"] = self._aof_base_size
+        return stats
+
+    def _start_active_expire_loop(self):
+        if self._active_expire_hz <= 0:
+            return False
+
+        # only a weak reference is kept so the manager can still be collected
+        thread = Thread(target=self._active_expire_loop, args=(weakref.ref(self),), daemon=True)
+        thread.start()
+        return True
+
+    @staticmethod
+    def _active_expire_loop(manager_ref):
+        while True:
+            manager = manager_ref()
+            if manager is None:
+                return
+            interval = 1 / manager._active_expire_hz
+            manager._active_expire_cycle(interval * _ACTIVE_EXPIRE_CYCLE_CPU)
+            del manager
+            time.sleep(interval)
+
+    def _active_expire_cycle(self, time_limit: float):
+        """
+        Delete expired keys that are never accessed again. Each db is
+        checked in batches, holding its lock for one batch at a time,
+        until few of the checked keys are expired or the time is up.
+        """
+        deadline = time.monotonic() + time_limit
+        for dbname in list(self._dbs):
+            db = self._dbs.get(dbname)
+            if db is None:
+                continue
+            while True:
+                with self._db_locks[dbname]:
+                    checked, deleted = db.delete_expired_keys(_ACTIVE_EXPIRE_CYCLE_KEYS)
+                if time.monotonic() >= deadline:
+                    return
+                if deleted * 100 <= checked * _ACTIVE_EXPIRE_CYCLE_THRESHOLD:
+                    break
+
     def get_or_create_db(self, dbname):
         if dbname not in self._dbs:
             with self._dbs_lock:
                 if dbname not in self._dbs:
-                    self._dbs[dbname] = LitedisDB(dbname)
+                    self._add_db(LitedisDB(dbname))
         return self._dbs[dbname]
 
+    def _add_db(self, db: LitedisDB):
+        # must be called with _dbs_lock held, the lock is there before the db
+        if db.name not in self._db_locks:
+            self._db_locks[db.name] = ShardedLock(self._db_shards)
+        if self._key_index:
+            db.enable_key_index()
+        if self.memory_accounting:
+            db.enable_memory_accounting()
+        if self._maxmemory:
+            db.track_access(self._maxmemory_policy)
+        self._dbs[db.name] = db
+
     def process_command(self, dbcmd: DBCommandPair):
-        db = self.get_or_create_db(dbcmd.dbname)
-        ctx = CommandContext(db, dbcmd.cmdtokens)
-        command = CommandFactory.create(dbcmd.cmdtokens[0])
+        dbname, cmdtokens = dbcmd
+        command = CommandFactory.create_from_tokens(cmdtokens)
+        return self._process(dbname, command, cmdtokens, dbcmd)
+
+    def process_parsed_command(self, dbname: str, command: Command):
+        """
+        Run a command created by a typed constructor, its tokens are only
+        built when they are needed, for the AOF record or to find the keys
+        """
+        return self._process(dbname, command, None, None)
 
-        with self._db_locks[dbcmd.dbname]:
+    def _process(self, dbname: str, command: Command,
+                 cmdtokens: Optional[List[str]], dbcmd: Optional[DBCommandPair]):
+        if command.blocking:
+            return self._process_blocking(dbname, command, cmdtokens)
+
+        db = self._dbs.get(dbname) or self.get_or_create_db(dbname)
+        ctx = CommandContext(db, cmdtokens, self)
+        if 'admin' in command.flags:
+            # works on the server, and takes the db locks it needs itself
+            return command.execute(ctx)
+        if self._maxmemory and 'denyoom' in command.flags:
+            self._free_memory()
+
+        db_lock = self._db_locks[dbname]
+        if db_lock.shards == 1:
+            # a single lock for the whole db, no need to look at the keys
+            locks = None
+            db_lock.first.acquire()
+        else:
+            if cmdtokens is None:
+                cmdtokens = command.to_tokens()
+            locks = db_lock.acquire_keys(command.get_keys(cmdtokens))
+
+        seq = None
+        try:
             result = command.execute(ctx)
 
-        if self.persistence_on and self._aof:
-            if command.rwtype == ReadWriteType.Write:
-                with self._aof_lock:
-                    self._aof.log_command(dbcmd)
+            # buffer the record while holding the locks, so the AOF keeps
+            # the execution order of the commands on the same keys,
+            # but wait for the disk outside of them
+            if self.persistence_on and self._aof and command.rwtype is ReadWriteType.Write:
+                if dbcmd is None:
+                    dbcmd = DBCommandPair(dbname, cmdtokens or command.to_tokens())
+                seq = self._aof.append_command(dbcmd)
+
+            if self._waiters and command.rwtype is ReadWriteType.Write:
+                self._signal_keys(dbname, db, command.get_keys(cmdtokens or command.to_tokens()))
+        finally:
+            if locks is None:
+                db_lock.first.release()
+            else:
+                db_lock.release(locks)
+
+        if seq is not None:
+            self._aof.commit(seq)
 
         return result
 
+    def process_commands(self, dbname: str, commands: List[Union[List[str], Command]]) -> list:
+        """
+        Run a batch of commands, given as tokens or created by a typed
+        constructor, under one acquisition of the db locks, and log their
+        writes to the AOF as one write.
+        Return the results in order, a command that fails has the exception
+        it raised as its result and does not stop the rest of the batch.
+        """
+        db = self._dbs.get(dbname) or self.get_or_create_db(dbname)
+        results: list = [None] * len(commands)
+        # (index, command, tokens) of the commands that can run, the admin
+        # ones take the db locks they need and run after the others
+        batch = []
+        admin = []
+        keys = []
+        whole_keyspace = False
+        for i, item in enumerate(commands):
+            if isinstance(item, Command):
+                command, cmdtokens = item, None
+            else:
+                try:
+                    command, cmdtokens = CommandFactory.create_from_tokens(item), item
+                except Exception as e:
+                    results[i] = e
+                    continue
+            if 'admin' in command.flags:
+                admin.append((i, command, cmdtokens))
+            else:
+                batch.append((i, command, cmdtokens))
+
+        if self._maxmemory and any('denyoom' in command.flags for _, command, _ in batch):
+            self._free_memory()
+
+        db_lock = self._db_locks[dbname]
+        if db_lock.shards == 1:
+            locks = None
+            db_lock.first.acquire()
+        else:
+            for i, command, cmdtokens in batch:
+                command_keys = command.get_keys(cmdtokens or command.to_tokens())
+                if not command_keys:
+                    whole_keyspace = True
+                    break
+                keys.extend(command_keys)
+            locks = db_lock.acquire_keys(None if whole_keyspace else keys)
+
+        seq = None
+        try:
+            logging = self.persistence_on and self._aof
+            # encoded at once, a large batch would otherwise keep all of its
+            # token lists alive and slow down the garbage collector
+            encode = AOF.encode_command
+            records = []
+            for i, command, cmdtokens in batch:
+                try:
+                    # a blocking command does not wait inside a batch
+                    results[i] = command.execute(CommandContext(db, cmdtokens, self))
+                except Exception as e:
+                    results[i] = e
+                    continue
+                if command.rwtype is not ReadWriteType.Write:
+                    continue
+                if command.blocking:
+                    if results[i] is None:
+                        continue
+                    cmdtokens = command.to_tokens()
+                if logging:
+                    records.append(encode(DBCommandPair(dbname, cmdtokens or command.to_tokens())))
+                if self._waiters:
+                    self._signal_keys(dbname, db, command.get_keys(cmdtokens or command.to_tokens()))
+
+            if records:
+                seq = self._aof.append_encoded(b"".join(records))
+        finally:
+            if locks is None:
+                db_lock.first.release()
+            else:
+                db_lock.release(locks)
+
+        if seq is not None:
+            self._aof.commit(seq)
+
+        for i, command, cmdtokens in admin:
+            try:
+                results[i] = command.execute(CommandContext(db, cmdtokens, self))
+            except Exception as e:
+                results[i] = e
+
+        return results
+
+    def get_memory_stats(self) -> Dict[str, Union[int, str, Dict[str, int]]]:
+        """
+        Estimated memory of the data in total and per db, without memory
+        accounting it is estimated now by walking every key
+        """
+        # admin commands like INFO run without holding any db lock
+        dbs = {}
+        for dbname, db in list(self._dbs.items()):
+            with self._db_locks[dbname]:
+                dbs[dbname] = db.estimate_memory()
+        used_memory = sum(dbs.values())
+        return {
+            "used_memory": used_memory,
+            "used_memory_human": _bytes_to_human(used_memory),
+            "used_memory_dbs": dbs,
+            "maxmemory": self._maxmemory,
+            "maxmemory_human": _bytes_to_human(self._maxmemory),
+            "maxmemory_policy": self._maxmemory_policy,
+            "evicted_keys": self._evicted_keys,
+        }
+
+    def used_memory(self) -> int:
+        """
+        Estimated bytes taken by the data of all dbs, kept by memory accounting
+        """
+        total = 0
+        for db in list(self._dbs.values()):
+            total += db.used_memory
+        return total
+
+    def _free_memory(self):
+        """
+        Evict keys by the maxmemory policy until the data fits in maxmemory,
+        each evicted key is logged to the AOF as a deletion.
+        Raise ValueError if it does not fit and no key can be evicted.
+        """
+        if self.used_memory() <= self._maxmemory:
+            return
+        with self._evict_lock:
+            while self.used_memory() > self._maxmemory:
+                if self._maxmemory_policy == "noeviction" or not self._evict_key():
+                    raise ValueError("OOM command not allowed when used memory > 'maxmemory'")
+
+    def _evict_key(self) -> bool:
+        # the best candidate among samples of every db
+        best = None
+        for dbname, db in list(self._dbs.items()):
+            with self._db_locks[dbname]:
+                candidate = db.eviction_candidate(self._maxmemory_policy, self._maxmemory_samples)
+            if candidate is not None and (best is None or candidate[0] > best[0]):
+                best = (candidate[0], dbname, candidate[1])
+        if best is None:
+            return False
+
+        _, dbname, key = best
+        seq = None
+        db_lock = self._db_locks[dbname]
+        locks = db_lock.acquire_keys([key])
+        try:
+            if self._dbs[dbname].delete(key):
+                self._evicted_keys += 1
+                if self.persistence_on and self._aof:
+                    seq = self._aof.append_command(DBCommandPair(dbname, ["del", key]))
+        finally:
+            db_lock.release(locks)
+
+        if seq is not None:
+            self._aof.commit(seq)
+        return True
+
+    def _process_blocking(self, dbname: str, command: Command, cmdtokens: Optional[List[str]]):
+        """
+        Run a blocking command, waiting without holding any lock while
+        none of its keys holds data. Callers waiting on the same key are
+        served in the order they started waiting: a write to the key wakes
+        only the oldest one, which wakes the next one once it is served.
+        """
+        if cmdtokens is None:
+            raise ValueError(f"{command.name} command must be given as tokens")
+        command._parse(cmdtokens)
+        keys = list(dict.fromkeys(command.get_keys(cmdtokens)))
+        # all the keys are locked, the caller waits only for some of them
+        wait_keys = list(dict.fromkeys(command.get_wait_keys(cmdtokens)))
+        db = self._dbs.get(dbname) or self.get_or_create_db(dbname)
+        # parsed already
+        ctx = CommandContext(db, None, self)
+        db_lock = self._db_locks[dbname]
+        deadline = time.monotonic() + command.timeout if command.timeout else None
+        waiter: Optional[Event] = None
+
+        while True:
+            seq = None
+            timed_out = False
+            locks = db_lock.acquire_keys(keys)
+            try:
+                result = command.execute(ctx)
+                if result is not None:
+                    if self.persistence_on and self._aof:
+                        seq = self._aof.append_command(DBCommandPair(dbname, command.to_tokens()))
+                    if waiter is not None:
+                        self._remove_waiter(dbname, wait_keys, waiter)
+                    # the keys may hold more data for the next waiter,
+                    # and a moved element makes the destination ready
+                    if self._waiters:
+                        self._signal_keys(dbname, db, keys)
+                elif deadline is not None and time.monotonic() >= deadline:
+                    timed_out = True
+                    if waiter is not None:
+                        self._remove_waiter(dbname, wait_keys, waiter)
+                        # a wakeup meant for this caller goes to the next one
+                        self._signal_keys(dbname, db, wait_keys)
+                elif waiter is None:
+                    waiter = Event()
+                    for key in wait_keys:
+                        self._waiters.setdefault((dbname, key), deque()).append(waiter)
+                else:
+                    # cleared while holding the locks, so a write after it is not missed
+                    waiter.clear()
+            except BaseException:
+                if waiter is not None:
+                    self._remove_waiter(dbname, wait_keys, waiter)
+                raise
+            finally:
+                db_lock.release(locks)
+
+            if result is not None:
+                if seq is not None:
+                    self._aof.commit(seq)
+                return result
+            if timed_out:
+                return None
+            waiter.wait(None if deadline is None else max(deadline - time.monotonic(), 0))
+
+    def _remove_waiter(self, dbname: str, keys: List[str], waiter: Event):
+        # must be called with the locks of the keys held
+        for key in keys:
+            queue = self._waiters.get((dbname, key))
+            if queue is None:
+                continue
+            try:
+                queue.remove(waiter)
+            except ValueError:
+                pass
+            if not queue:
+                self._waiters.pop((dbname, key), None)
+
+    def _signal_keys(self, dbname: str, db: LitedisDB, keys: List[str]):
+        # must be called with the locks of the keys held, wakes the oldest
+        # caller waiting on each key that holds data
+        for key in keys:
+            queue = self._waiters.get((dbname, key))
+            if queue and db.exists(key):
+                queue[0].set()
+
     def _replay_aof_commands(self) -> bool:
-        if not self._aof.exists_file():
+        dbs, replay_aof = self._load_snapshot()
+        if dbs is None and not self._aof.exists_file():
             return False
 
         with self._dbs_lock:
-            dbcmds = self._aof.load_commands()
-            dbs = DBCommandConverter.commands_to_dbs(dbcmds)
+            if replay_aof:
+                dbcmds = self._aof.load_commands()
+                dbs = DBCommandConverter.commands_to_dbs(dbcmds, dbs)
             self._dbs.clear()
-            self._dbs.update(dbs)
+            for db in dbs.values():
+                self._add_db(db)
 
         return True
 
+    def _load_snapshot(self):
+        """
+        Load the snapshot if the AOF continues it or is older than it,
+        return the dbs (None if not loaded) and whether the AOF still
+        has to be replayed on top of them
+        """
+        snapshot_generation = self._snapshot.read_generation()
+        if snapshot_generation is None:
+            return None, True
+
+        aof_exists = self._aof.exists_file()
+        if aof_exists and snapshot_generation < self._aof.generation:
+            # the AOF was rewritten as commands after the snapshot was taken
+            return None, True
+
+        _, dbs = self._snapshot.load()
+        if not aof_exists or snapshot_generation > self._aof.generation:
+            # the last rewrite stopped before resetting the AOF,
+            # everything in the AOF is already in the snapshot
+            self._aof.rewrite_commands([], generation=snapshot_generation)
+            return dbs, False
+
+        return dbs, True
+
     def _rewrite_aof_commands(self) -> bool:
 
-        with self._dbs_lock:
-            dbcommands = DBCommandConverter.dbs_to_commands(self._dbs)
-            self._aof.rewrite_commands(dbcommands)
+        with self._rewrite_lock:
+            self._rewrite_aof()
 
         return True
+
+    def _rewrite_aof(self):
+        # must be called with the rewrite lock held
+        stats = self._aof_rewrite_stats
+        start = time.monotonic()
+        live_dbs, dbs = self._freeze_dbs()
+        try:
+            generation = self._aof.generation + 1
+            if self._snapshot_on:
+                # the snapshot goes first, a crash in between leaves a snapshot
+                # newer than the AOF, which is then ignored on load
+                self._snapshot.save(dbs, generation)
+                self._aof.rewrite_commands([], generation)
+            else:
+                dbcommands = DBCommandConverter.dbs_to_commands(dbs)
+                self._aof.rewrite_commands(dbcommands, generation)
+                self._snapshot.remove_file()
+        except:
+            stats["aof_last_rewrite_status"] = "err"
+            raise
+        else:
+            stats["aof_last_rewrite_status"] = "ok"
+            stats["aof_rewrites"] += 1
+            stats["aof_last_rewrite_time_ms"] = int((time.monotonic() - start) * 1000)
+            stats["aof_last_rewrite_bytes"] = self._aof.size() + self._snapshot.size()
+            stats["aof_last_rewrite_keys"] = sum(1 for db in dbs.values() for _ in db.keys())
+            self._aof_base_size = self._aof.size()
+        finally:
+            self._last_rewrite_time = time.monotonic()
+            for db in live_dbs:
+                db.unfreeze()
+
+    def _freeze_dbs(self) -> Tuple[List[LitedisDB], Dict[str, LitedisDB]]:
+        """
+        Take a point-in-time copy of all dbs and mark the matching AOF
+        position, holding the db locks only while the key tables are copied.
+        Return the frozen dbs and their copies.
+        """
+        with self._dbs_lock:
+            dbnames = sorted(self._dbs)
+            taken = []
+            try:
+                for dbname in dbnames:
+                    db_lock = self._db_locks[dbname]
+                    taken.append((db_lock, db_lock.acquire_keys(None)))
+                self._aof.begin_rewrite()
+                live_dbs = [self._dbs[dbname] for dbname in dbnames]
+                return live_dbs, {db.name: db.freeze() for db in live_dbs}
+            finally:
+                for db_lock, locks in reversed(taken):
+                    db_lock.release(locks)
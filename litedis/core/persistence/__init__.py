@@ -1,2 +1,3 @@
 from .aof import AOF
 from .ldb import LitedisDB
+from .snapshot import Snapshot
@@ -1,61 +1,426 @@
+import ast
+import atexit
 import os
+import struct
 import tempfile
+import time
+import weakref
 from pathlib import Path
-from typing import TextIO, Iterable, Union, Optional
+from threading import Condition, Thread
+from typing import BinaryIO, Iterable, List, Union, Optional, Tuple
 
 from litedis.typing import DBCommandPair
 
+AOF_SIGNATURE = b"LITEDIS-AOF"
+AOF_VERSION = 2
+
+APPENDFSYNC_POLICIES = ("always", "everysec", "no")
+
+_PREFIX_SIZE = len(AOF_SIGNATURE) + 1
+_UINT32 = struct.Struct("<I")
+_UINT64 = struct.Struct("<Q")
+
+
+def _encode_header(generation: int) -> bytes:
+    return AOF_SIGNATURE + bytes([AOF_VERSION]) + _UINT64.pack(generation)
+
 
 class AOF:
+    """
+    Append only file, every record is a length-prefixed binary frame:
+
+        frame   := <payload size:u32> payload
+        payload := <count:u32> (<size:u32> <utf-8 bytes>){count}
+
+    where the first string of a payload is the dbname and the rest are the
+    command tokens. The file starts with a signature, a version byte and
+    the generation of the file, which is increased by every rewrite and
+    ties the file to the snapshot it continues.
+    Files written by older versions (one python repr per line) are still
+    readable and are converted the first time they are appended to.
+
+    Every committed record is written to the OS, appendfsync decides when
+    it is fsynced to the disk:
 
-    def __init__(self, data_path: Union[str, Path], filename="litedis.aof"):
+        always   - the writer waits until its record is written and fsynced,
+                   concurrent writers share one write and fsync (group commit)
+        everysec - a background thread fsyncs once per second
+        no       - the OS decides when the data reaches the disk
+
+    Files still open at interpreter exit are synced by an atexit hook.
+    """
+
+    def __init__(self,
+                 data_path: Union[str, Path],
+                 filename="litedis.aof",
+                 appendfsync="everysec"):
         self.data_path = data_path if isinstance(data_path, Path) else Path(data_path)
         self.data_path.mkdir(parents=True, exist_ok=True)
 
         self._filename = filename
         self._file_path = self.data_path / self._filename
-        self._file: Optional[TextIO] = None
+        self._file: Optional[BinaryIO] = None
+
+        self._buffer: List[bytes] = []
+        self._buffer_size = 0
+        self._buffer_cond = Condition()
+        self._appended_seq = 0
+        self._synced_seq = 0
+        self._writing = False
+        # whether records were written since the last fsync
+        self._dirty = False
+        self._flusher: Optional[Thread] = None
+        # records written to the old file while a rewrite is in progress
+        self._rewrite_seq: Optional[int] = None
+        self._rewrite_records: Optional[List[bytes]] = None
+
+        if appendfsync not in APPENDFSYNC_POLICIES:
+            raise ValueError(f"appendfsync must be one of {', '.join(APPENDFSYNC_POLICIES)}")
+        self.appendfsync = appendfsync
+
+        header = self._read_header()
+        self.generation = header[1] if header is not None else 0
+
+        _open_files.add(self)
 
     def __del__(self):
         self.close_file()
 
     def get_or_create_file(self):
         if self._file is None:
-            self._file = open(self._file_path, "a")
+            if self._is_legacy_file():
+                self._migrate_legacy_file()
+            self._file = open(self._file_path, "ab")
+            if self._file.tell() == 0:
+                self._file.write(_encode_header(self.generation))
+                self._file.flush()
         return self._file
 
     def exists_file(self):
         return self._file_path.exists()
 
+    def size(self) -> int:
+        """
+        Size of the file including the records that are not written yet
+        """
+        file_size = self._file_path.stat().st_size if self._file_path.exists() else 0
+        return file_size + self._buffer_size
+
     def close_file(self):
+        if self._buffer or self._dirty:
+            self.sync()
         if self._file is not None and not self._file.closed:
             self._file.close()
+        self._file = None
 
     def log_command(self, dbcmd: DBCommandPair):
+        self.commit(self.append_command(dbcmd))
+
+    def append_command(self, dbcmd: DBCommandPair) -> int:
+        """
+        Buffer a record and return its sequence number for `commit`
+        """
+        return self._append(self.encode_command(dbcmd))
+
+    def append_encoded(self, data: bytes) -> int:
+        """
+        Buffer records already joined by `encode_command` as one write,
+        return the sequence number of the whole batch for `commit`
+        """
+        return self._append(data)
+
+    def _append(self, data: bytes) -> int:
+        with self._buffer_cond:
+            self._buffer.append(data)
+            self._buffer_size += len(data)
+            self._appended_seq += 1
+            seq = self._appended_seq
+        return seq
+
+    def commit(self, seq: int):
+        """
+        Write the record to the OS and wait until it is as durable
+        as the appendfsync policy requires
+        """
+        if self.appendfsync == "always":
+            self.sync(seq)
+            return
+
+        self._flush(seq, fsync=False)
+        if self.appendfsync == "everysec" and self._flusher is None:
+            self._start_flusher()
+
+    def sync(self, seq: Optional[int] = None):
+        """
+        Write buffered records up to seq (all if None) to the file
+        and fsync it, unless appendfsync is no
+        """
+        self._flush(seq, fsync=self.appendfsync != "no")
+
+    def _flush(self, seq: Optional[int], fsync: bool):
+        """
+        Write buffered records up to seq (all if None) to the file.
+        Only one thread writes at a time, the others wait and find their
+        records written by it, so concurrent callers share one write.
+        """
+        cond = self._buffer_cond
+        with cond:
+            if seq is None:
+                seq = self._appended_seq
+            # with fsync, the records written by earlier commits are synced as well
+            while self._synced_seq < seq or (fsync and self._dirty):
+                if self._writing:
+                    cond.wait()
+                    continue
+
+                self._writing = True
+                pending, self._buffer = self._buffer, []
+                self._buffer_size = 0
+                first_seq = self._synced_seq + 1
+                target_seq = self._appended_seq
+                cond.release()
+                try:
+                    self._write(pending, fsync)
+                finally:
+                    cond.acquire()
+                    if self._rewrite_records is not None:
+                        skipped = max(self._rewrite_seq - first_seq + 1, 0)
+                        self._rewrite_records.extend(pending[skipped:])
+                    self._writing = False
+                    self._synced_seq = target_seq
+                    self._dirty = not fsync and (self._dirty or bool(pending))
+                    cond.notify_all()
+
+    def _write(self, pending: List[bytes], fsync: bool):
+        if not pending and not (fsync and self._dirty):
+            return
         file = self.get_or_create_file()
-        file.write(f"'{dbcmd.dbname}',{dbcmd.cmdtokens}\n")
-        file.flush()
+        if pending:
+            file.write(b"".join(pending))
+            file.flush()
+        if fsync:
+            os.fsync(file.fileno())
+
+    def _fsync(self):
+        """
+        Fsync the records written since the last fsync, without blocking
+        the writers: a duplicate of the file descriptor is synced
+        """
+        cond = self._buffer_cond
+        with cond:
+            while self._writing:
+                cond.wait()
+            if not self._dirty or self._file is None or self._file.closed:
+                return
+            fd = os.dup(self._file.fileno())
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _start_flusher(self):
+        with self._buffer_cond:
+            if self._flusher is not None:
+                return
+            # only a weak reference is kept so the AOF can still be collected
+            self._flusher = Thread(target=self._flush_loop, args=(weakref.ref(self),), daemon=True)
+            self._flusher.start()
+
+    @staticmethod
+    def _flush_loop(aof_ref):
+        while True:
+            time.sleep(1)
+            aof = aof_ref()
+            if aof is None:
+                return
+            aof._fsync()
+            del aof
 
     def load_commands(self):
 
-        if not self._file_path.exists():
+        self.close_file()
+
+        header = self._read_header()
+        if header is None:
             return
 
-        self.close_file()
-        with open(self._file_path, "r") as f:
-            for line in f:
-                yield DBCommandPair(*eval(line.strip()))
+        header_size, _ = header
+        if header_size == 0:
+            yield from self._load_legacy_commands()
+        else:
+            yield from self._load_binary_commands(header_size)
 
-    def rewrite_commands(self, commands: Iterable[DBCommandPair]):
+    def begin_rewrite(self):
+        """
+        Mark the point the commands passed to `rewrite_commands` are dumped at.
+        Records appended after it are kept and added to the rewritten file.
+        """
+        with self._buffer_cond:
+            self._rewrite_seq = self._appended_seq
+            self._rewrite_records = []
 
-        temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self._file_path))
+    def rewrite_commands(self, commands: Iterable[DBCommandPair], generation: Optional[int] = None):
+
+        if generation is None:
+            generation = self.generation
+        if self._rewrite_seq is None:
+            self.begin_rewrite()
 
         try:
-            with os.fdopen(temp_fd, 'w') as f:
-                for dbname, cmdtokens in commands:
-                    f.write(f"'{dbname}',{cmdtokens}\n")
+            temp_path = self._write_temp_file(commands, generation)
+
+            try:
+                self._replace_file(temp_path, generation)
+            except:
+                os.unlink(temp_path)
+                raise Exception(f"Failed to rewrite {self._file_path}")
+        finally:
+            with self._buffer_cond:
+                self._rewrite_seq = None
+                self._rewrite_records = None
+
+    def _write_temp_file(self, commands: Iterable[DBCommandPair], generation: int) -> str:
+        temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self._file_path))
 
-            os.replace(temp_path, self._file_path)
+        try:
+            with os.fdopen(temp_fd, 'wb') as f:
+                f.write(_encode_header(generation))
+                for dbcmd in commands:
+                    f.write(self.encode_command(dbcmd))
+                f.flush()
+                os.fsync(f.fileno())
         except:
             os.unlink(temp_path)
             raise Exception(f"Failed to rewrite {self._file_path}")
+
+        return temp_path
+
+    def _replace_file(self, path, generation: int):
+        # no buffered records may be written while the file is swapped,
+        # and the old handle must not be used afterwards
+        cond = self._buffer_cond
+        with cond:
+            while self._writing:
+                cond.wait()
+            self._writing = True
+        replaced = False
+        try:
+            if self._rewrite_records:
+                with open(path, "ab") as f:
+                    f.write(b"".join(self._rewrite_records))
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            os.replace(path, self._file_path)
+            replaced = True
+            self.generation = generation
+            if self._file is not None and not self._file.closed:
+                self._file.close()
+            self._file = None
+        finally:
+            with cond:
+                # the buffer holds the records after _synced_seq,
+                # the ones up to _rewrite_seq are covered by the dump
+                if replaced and self._rewrite_seq > self._synced_seq:
+                    del self._buffer[:self._rewrite_seq - self._synced_seq]
+                    self._buffer_size = sum(map(len, self._buffer))
+                    self._synced_seq = self._rewrite_seq
+                self._writing = False
+                cond.notify_all()
+
+    @staticmethod
+    def encode_command(dbcmd: DBCommandPair) -> bytes:
+        pieces = [dbcmd.dbname, *dbcmd.cmdtokens]
+        payload = [_UINT32.pack(len(pieces))]
+        for piece in pieces:
+            data = str(piece).encode("utf-8")
+            payload.append(_UINT32.pack(len(data)))
+            payload.append(data)
+        payload = b"".join(payload)
+        return _UINT32.pack(len(payload)) + payload
+
+    @staticmethod
+    def decode_command(payload: bytes) -> DBCommandPair:
+        unpack_from = _UINT32.unpack_from
+        count, = unpack_from(payload, 0)
+        offset = 4
+        pieces = []
+        for _ in range(count):
+            size, = unpack_from(payload, offset)
+            offset += 4
+            pieces.append(str(payload[offset:offset + size], "utf-8"))
+            offset += size
+        return DBCommandPair(pieces[0], pieces[1:])
+
+    def _read_header(self) -> Optional[Tuple[int, int]]:
+        """
+        Return (header size, generation) of the file, the header size is 0
+        for a legacy text file. Return None if the file is missing or empty.
+        """
+        if not self._file_path.exists():
+            return None
+        with open(self._file_path, "rb") as f:
+            prefix = f.read(_PREFIX_SIZE)
+            if not prefix:
+                return None
+            if not prefix.startswith(AOF_SIGNATURE):
+                return 0, 0
+
+            version = prefix[-1]
+            if version == 1:
+                return _PREFIX_SIZE, 0
+            if version == 2:
+                generation, = _UINT64.unpack(f.read(_UINT64.size))
+                return _PREFIX_SIZE + _UINT64.size, generation
+            raise ValueError(f"unsupported aof version in {self._file_path}")
+
+    def _is_legacy_file(self) -> bool:
+        header = self._read_header()
+        return header is not None and header[0] == 0
+
+    def _load_binary_commands(self, header_size: int):
+        decode = self.decode_command
+        valid_size = header_size
+        with open(self._file_path, "rb") as f:
+            f.seek(valid_size)
+            while True:
+                prefix = f.read(4)
+                if len(prefix) < 4:
+                    break
+                size, = _UINT32.unpack(prefix)
+                payload = f.read(size)
+                if len(payload) < size:
+                    break
+                valid_size += 4 + size
+                yield decode(payload)
+            truncated = f.tell() > valid_size
+
+        # drop a frame that was only partially written, so appends stay aligned
+        if truncated:
+            os.truncate(self._file_path, valid_size)
+
+    def _load_legacy_commands(self):
+        with open(self._file_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                yield DBCommandPair(*ast.literal_eval(line))
+
+    def _migrate_legacy_file(self):
+        temp_path = self._write_temp_file(self._load_legacy_commands(), self.generation)
+        os.replace(temp_path, self._file_path)
+
+
+# every AOF not yet collected, synced when the interpreter exits
+_open_files: "weakref.WeakSet[AOF]" = weakref.WeakSet()
+
+
+@atexit.register
+def _sync_open_files():
+    for aof in list(_open_files):
+        try:
+            aof.close_file()
+        except Exception:
+            pass
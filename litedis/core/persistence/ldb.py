@@ -1,31 +1,388 @@
+import itertools
+import random
+import sys
 import time
-from typing import Dict, Optional
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sortedcontainers import SortedList
 
 from litedis.core.command.sortedset import SortedSet
 from litedis.typing import LitedisObjectT
 
+# scans in progress kept per db, the least recently used one is dropped
+# beyond it or once idle for _SCAN_IDLE_SECONDS, a cursor of a dropped
+# scan starts the scan over
+_SCAN_CURSORS_MAX = 1024
+_SCAN_IDLE_SECONDS = 600
+
+# elements of a container looked at to estimate the size of the rest
+MEMORY_SAMPLES = 5
+# bytes a key takes in the key table besides the key itself
+_KEY_ENTRY_SIZE = 40
+# bytes an expiration takes: its entry in the expiration table, the time
+# and its slot in the ring walked by the active expire cycle
+_EXPIRATION_ENTRY_SIZE = 152
+# bytes a sorted set takes empty, and per member besides the member:
+# the score, the (score, member) pair and the slots of the sorted containers
+_ZSET_BASE_SIZE = 2528
+_ZSET_ENTRY_SIZE = 128
+
+EVICTION_POLICIES = ("noeviction", "allkeys-lru", "allkeys-lfu", "volatile-lru", "volatile-ttl")
+
+# LFU counters as in redis: a logarithmic access counter in the low 8 bits,
+# starting at _LFU_INIT_VAL and decremented once per _LFU_DECAY_MINUTES
+# without access, and the minute of the last access in the high bits
+_LFU_INIT_VAL = 5
+_LFU_LOG_FACTOR = 10
+_LFU_DECAY_MINUTES = 1
+
+
+def _container_size(value: LitedisObjectT) -> int:
+    """Bytes a container takes without its elements, a string in full"""
+    if type(value) is SortedSet:
+        return _ZSET_BASE_SIZE + len(value) * _ZSET_ENTRY_SIZE
+    return sys.getsizeof(value)
+
+
+def _element_size(value: LitedisObjectT, samples: int = MEMORY_SAMPLES) -> float:
+    """
+    Average bytes of up to samples elements of a container, all if 0,
+    a field of a hash counts with its value
+    """
+    getsizeof = sys.getsizeof
+    elements = value.members() if type(value) is SortedSet else value
+    sampled = itertools.islice(elements, samples) if samples > 0 else elements
+    total = count = 0
+    if type(value) is dict:
+        for field in sampled:
+            total += getsizeof(field) + getsizeof(value[field])
+            count += 1
+    else:
+        for element in sampled:
+            total += getsizeof(element)
+            count += 1
+    return total / count if count else 0.0
+
+
+def _elements_size(value: LitedisObjectT, elements: Optional[Iterable] = None) -> int:
+    """
+    Bytes of elements of a container, all of them if elements is None:
+    members of a list, set or sorted set, (field, value) pairs of a hash
+    """
+    getsizeof = sys.getsizeof
+    total = 0
+    if type(value) is dict:
+        for field, val in value.items() if elements is None else elements:
+            total += getsizeof(field) + getsizeof(val)
+        return total
+    if elements is None:
+        elements = value.members() if type(value) is SortedSet else value
+    for element in elements:
+        total += getsizeof(element)
+    return total
+
+
+def _estimate_value_size(value: LitedisObjectT, samples: int = MEMORY_SAMPLES) -> int:
+    """
+    Estimate the bytes a value takes from the size of the container and
+    the average size of up to samples of its elements, all of them if 0
+    """
+    if type(value) is str:
+        return sys.getsizeof(value)
+    return _container_size(value) + int(len(value) * _element_size(value, samples))
+
+
+class _KeyRing:
+    """
+    Keys in a list with their positions, walked round-robin from a cursor.
+    A key is added and removed in O(1), the freed slot is filled so that
+    the keys not walked yet in the current pass stay after the cursor.
+    Writers holding different shards change it under its own lock.
+    """
+    __slots__ = ('_keys', '_positions', '_cursor', '_lock')
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._cursor = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key: str):
+        with self._lock:
+            if key not in self._positions:
+                self._positions[key] = len(self._keys)
+                self._keys.append(key)
+
+    def discard(self, key: str):
+        with self._lock:
+            i = self._positions.pop(key, None)
+            if i is None:
+                return
+            keys = self._keys
+            last = keys.pop()
+            if i == len(keys):
+                self._cursor = min(self._cursor, i)
+                return
+            if i < self._cursor:
+                # a walked key fills the slot, the last key takes its place
+                self._cursor -= 1
+                hole = self._cursor
+                if hole != i and hole < len(keys):
+                    keys[i] = keys[hole]
+                    self._positions[keys[i]] = i
+                    i = hole
+            keys[i] = last
+            self._positions[last] = i
+
+    def sample(self, count: int) -> List[str]:
+        """Return up to count different keys picked at random"""
+        with self._lock:
+            return random.sample(self._keys, min(count, len(self._keys)))
+
+    def next(self) -> Optional[str]:
+        """Return the key at the cursor and move past it, None if empty"""
+        with self._lock:
+            if not self._keys:
+                return None
+            if self._cursor >= len(self._keys):
+                self._cursor = 0
+            key = self._keys[self._cursor]
+            self._cursor += 1
+            return key
+
+
+class _ScanState:
+    """Where a scan stopped, see `LitedisDB.scan`"""
+    __slots__ = ('key', 'container', 'resume', 'iterator', 'last_batch', 'version', 'copied', 'used')
+
+    def __init__(self, key: Optional[str], container, version: int):
+        self.key = key
+        self.container = container
+        # the last member returned, for ordered containers
+        self.resume: Optional[str] = None
+        # the iterator over an unordered container and its last batch
+        self.iterator: Optional[Iterator[str]] = None
+        self.last_batch: List[str] = []
+        # the write version of the key when the iterator was last used
+        self.version = version
+        # whether the iterator walks a copy of a set written during the scan
+        self.copied = False
+        self.used = 0.
+
 
 class LitedisDB:
     def __init__(self, name):
         self.name = name
         self._data: Dict[str, LitedisObjectT] = {}
         self._expirations: Dict[str, int] = {}
+        # data of a frozen copy being dumped, its containers are shared
+        # with this db until they are copied on first access
+        self._frozen_data: Optional[Dict[str, LitedisObjectT]] = None
+        # keys with an expiration walked round-robin by `delete_expired_keys`
+        self._expire_ring = _KeyRing()
+        # the scans in progress by id, see `scan`, scans of keys
+        # in different shards may run at the same time
+        self._scans: "OrderedDict[int, _ScanState]" = OrderedDict()
+        self._scan_ids = itertools.count(1)
+        # write versions of the keys being scanned, with the number of scans
+        # of each, and the version of the keyspace, bumped when a key is
+        # added or removed
+        self._versions: Dict[str, int] = {}
+        self._version_refs: Dict[str, int] = {}
+        self._keyspace_version = 0
+        self._scans_lock = Lock()
+        # keys in order, only kept once `enable_key_index` is called,
+        # writers holding different shards update it under its own lock
+        self._key_index: Optional[SortedList] = None
+        self._key_index_lock = Lock()
+        # estimated bytes of each key and their total, only kept once
+        # `enable_memory_accounting` is called
+        self._sizes: Optional[Dict[str, int]] = None
+        # bytes of the elements of each container, counted in full when
+        # the container is set and kept up to date by `account_elements`
+        self._element_sizes: Dict[str, int] = {}
+        self.used_memory = 0
+        self._memory_lock = Lock()
+        # last access time (lru) or access counter (lfu) of each key,
+        # only kept once `track_access` is called
+        self._access_policy: Optional[str] = None
+        self._access: Dict[str, float] = {}
+        # every key, sampled by `eviction_candidate` for an allkeys policy,
+        # only kept once `track_access` is called with one
+        self._key_ring: Optional[_KeyRing] = None
+
+    def enable_key_index(self):
+        """
+        Keep the keys in a sorted index, so listing the keys with a prefix
+        or in a range costs O(log n + k) instead of a walk of every key
+        """
+        with self._key_index_lock:
+            if self._key_index is None:
+                self._key_index = SortedList(self._data)
+
+    def enable_memory_accounting(self):
+        """
+        Keep an estimate of the bytes each key takes and their total in
+        `used_memory`, updated whenever a key is set or deleted
+        """
+        with self._memory_lock:
+            if self._sizes is None:
+                self._sizes = {}
+                for key, value in self._data.items():
+                    self._sizes[key] = size = self._estimate_key_size(key, value)
+                    self.used_memory += size
+
+    def _estimate_key_size(self, key: str, value: LitedisObjectT, recount: bool = True) -> int:
+        getsizeof = sys.getsizeof
+        size = getsizeof(key) + _KEY_ENTRY_SIZE
+        if key in self._expirations:
+            size += _EXPIRATION_ENTRY_SIZE
+        if type(value) is str:
+            return size + getsizeof(value)
+
+        # the elements are counted once, then changed in place by the
+        # write commands, which account what they add and remove
+        elements_size = self._element_sizes.get(key)
+        if elements_size is None or recount:
+            elements_size = self._element_sizes[key] = _elements_size(value)
+        return size + _container_size(value) + elements_size
+
+    def account_elements(self, key: str, added: Iterable = (), removed: Iterable = ()):
+        """
+        Account the elements a write command added to and removed from the
+        container at key in place: members of a list, set or sorted set,
+        (field, value) pairs of a hash, a changed field is removed with its
+        old value and added with the new one. The size of the container
+        itself is measured again by the `set` that follows.
+        """
+        if self._sizes is None or key not in self._element_sizes:
+            return
+        value = self._data[key]
+        delta = _elements_size(value, added)
+        if removed:
+            delta -= _elements_size(value, removed)
+        self._element_sizes[key] += delta
+        with self._memory_lock:
+            self.used_memory += delta
+            self._sizes[key] += delta
+
+    def track_access(self, policy: str):
+        """
+        Keep the access time of each key for an lru policy, or an access
+        counter for an lfu policy, to pick the keys `eviction_candidate`
+        returns
+        """
+        if policy.endswith("lru"):
+            self._access_policy = "lru"
+        elif policy.endswith("lfu"):
+            self._access_policy = "lfu"
+        else:
+            self._access_policy = None
+        self._access = {}
+        if policy.startswith("allkeys"):
+            self._key_ring = _KeyRing()
+            for key in self._data:
+                self._key_ring.add(key)
+        else:
+            self._key_ring = None
+
+    def _touch(self, key: str):
+        if self._access_policy == "lru":
+            self._access[key] = time.monotonic()
+            return
+
+        now = int(time.monotonic() / 60)
+        counter = self._lfu_counter(key, now)
+        if counter < 255:
+            # the more accesses a key has, the less likely one counts
+            base = max(counter - _LFU_INIT_VAL, 0)
+            if random.random() < 1.0 / (base * _LFU_LOG_FACTOR + 1):
+                counter += 1
+        self._access[key] = (now << 8) | counter
+
+    def _lfu_counter(self, key: str, now: int) -> int:
+        packed = self._access.get(key)
+        if packed is None:
+            return _LFU_INIT_VAL
+        periods = (now - (packed >> 8)) // _LFU_DECAY_MINUTES
+        return max((packed & 255) - periods, 0)
+
+    def _forget(self, key: str):
+        # drop the metadata of a key removed from _data
+        self._keyspace_version += 1
+        if key in self._versions:
+            self._bump_version(key)
+        if self._key_index is not None:
+            self._unindex_key(key)
+        if self._key_ring is not None:
+            self._key_ring.discard(key)
+        if self._sizes is not None:
+            with self._memory_lock:
+                self.used_memory -= self._sizes.pop(key, 0)
+            self._element_sizes.pop(key, None)
+        if self._access_policy is not None:
+            self._access.pop(key, None)
+
+    def _index_key(self, key: str):
+        with self._key_index_lock:
+            self._key_index.add(key)
+
+    def _unindex_key(self, key: str):
+        with self._key_index_lock:
+            self._key_index.discard(key)
 
     def set(self, key: str, value: LitedisObjectT):
         self._check_value_type(key, value)
+        if key not in self._data:
+            self._keyspace_version += 1
+            if self._key_index is not None:
+                self._index_key(key)
+            if self._key_ring is not None:
+                self._key_ring.add(key)
+        if key in self._versions:
+            self._bump_version(key)
+        # a container changed in place is accounted by `account_elements`
+        changed_in_place = self._data.get(key) is value
         self._data[key] = value
+        if self._sizes is not None:
+            size = self._estimate_key_size(key, value, recount=not changed_in_place)
+            with self._memory_lock:
+                self.used_memory += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+        if self._access_policy is not None:
+            self._touch(key)
 
     def _check_value_type(self, key: str, value: LitedisObjectT):
-        if not type(value) in [str, list, dict, set, SortedSet]:
+        if not type(value) in [str, deque, dict, set, SortedSet]:
             raise TypeError(f"not supported type {type(value)}")
         if key in self._data:
             if type(self._data[key]) != type(value):
                 raise TypeError("type of value does not match the type in database")
 
-    def get(self, key: str) -> Optional[LitedisObjectT]:
+    def get(self, key: str, for_write: bool = False) -> Optional[LitedisObjectT]:
+        """
+        Return the value of the key, pass for_write when the caller modifies
+        the container in place, so a container shared with a frozen copy
+        is copied first. Reads get the shared container.
+        """
         if self._delete_expired(key):
             return None
-        return self._data.get(key)
+        value = self._data.get(key)
+        if self._access_policy is not None and value is not None:
+            self._touch(key)
+        if for_write and key in self._versions:
+            self._bump_version(key)
+        if for_write and self._frozen_data is not None and type(value) is not str:
+            # copy on write, commands modify the containers they get in place
+            if value is not None and self._frozen_data.get(key) is value:
+                value = value.copy()
+                self._data[key] = value
+        return value
 
     def get_str(self, key: str) -> Optional[str]:
         value = self.get(key)
@@ -35,32 +392,32 @@ class LitedisDB:
             raise TypeError("value is not string")
         return value
 
-    def get_dict(self, key: str) -> Optional[dict]:
-        value = self.get(key)
+    def get_dict(self, key: str, for_write: bool = False) -> Optional[dict]:
+        value = self.get(key, for_write)
         if value is None:
             return None
         if type(value) != dict:
             raise TypeError("value is not a hash")
         return value
 
-    def get_list(self, key: str) -> Optional[list]:
-        value = self.get(key)
+    def get_list(self, key: str, for_write: bool = False) -> Optional[deque]:
+        value = self.get(key, for_write)
         if value is None:
             return None
-        if type(value) != list:
+        if type(value) != deque:
             raise TypeError("value is not a list")
         return value
 
-    def get_set(self, key: str) -> Optional[set]:
-        value = self.get(key)
+    def get_set(self, key: str, for_write: bool = False) -> Optional[set]:
+        value = self.get(key, for_write)
         if value is None:
             return None
         if type(value) != set:
             raise TypeError("value is not a set")
         return value
 
-    def get_zset(self, key: str) -> Optional[SortedSet]:
-        value = self.get(key)
+    def get_zset(self, key: str, for_write: bool = False) -> Optional[SortedSet]:
+        value = self.get(key, for_write)
         if value is None:
             return None
         if type(value) != SortedSet:
@@ -80,8 +437,31 @@ class LitedisDB:
 
         del self._data[key]
         del self._expirations[key]
+        self._expire_ring.discard(key)
+        self._forget(key)
         return True
 
+    def delete_expired_keys(self, count: int) -> Tuple[int, int]:
+        """
+        Check the expiration of up to count keys, continuing where the last
+        call stopped, and delete the expired ones.
+        Return the number of keys checked and the number deleted.
+        """
+        now = int(time.time() * 1000)
+        deleted = 0
+        ring = self._expire_ring
+        # no more keys than the ring holds, so a call is at most one pass
+        checked = min(count, len(ring))
+        for _ in range(checked):
+            key = ring.next()
+            if self._expirations[key] < now:
+                del self._data[key]
+                del self._expirations[key]
+                ring.discard(key)
+                self._forget(key)
+                deleted += 1
+        return checked, deleted
+
     def exists(self, item: str) -> bool:
         if self._delete_expired(item):
             return False
@@ -92,16 +472,227 @@ class LitedisDB:
             return 0
         del self._data[key]
         self.delete_expiration(key)
+        self._forget(key)
         return 1
 
-    def keys(self):
-        for key in self._data.keys():
-            yield key
+    def keys(self, prefix: str = ""):
+        if not prefix:
+            for key in self._data.keys():
+                yield key
+        elif self._key_index is not None:
+            for key in self._key_index.irange(minimum=prefix):
+                if not key.startswith(prefix):
+                    break
+                yield key
+        else:
+            for key in self._data.keys():
+                if key.startswith(prefix):
+                    yield key
+
+    def keys_range(self,
+                   minimum: Optional[str] = None,
+                   maximum: Optional[str] = None,
+                   inclusive: Tuple[bool, bool] = (True, True),
+                   reverse: bool = False) -> Iterator[str]:
+        """
+        Iterate the keys between minimum and maximum in order, None is
+        unbounded. Without the key index the keys are sorted first.
+        """
+        index = self._key_index if self._key_index is not None else SortedList(self._data)
+        return index.irange(minimum, maximum, inclusive, reverse)
+
+    def _bump_version(self, key: str):
+        # the version may be dropped by a scan of another shard meanwhile
+        with self._scans_lock:
+            if key in self._versions:
+                self._versions[key] += 1
+
+    def _version_of(self, key: Optional[str]) -> int:
+        return self._keyspace_version if key is None else self._versions.get(key, 0)
+
+    def scan(self, key: Optional[str], container, cursor: int, count: int, prefix: str = "") -> Tuple[int, list]:
+        """
+        Walk the members of the container at key, a hash, set or sorted set,
+        or the keys of the db starting with prefix if key is None, count
+        at a time. Each call returns the next cursor and the next members,
+        and cursor 0 at the end. Every member present during the whole scan
+        is returned, members added or removed during it may or may not be,
+        and a member may be returned twice. Removed members are left for
+        the caller to skip.
+
+        Sorted sets, and the keys once the key index is kept, resume after
+        the last member returned. Hashes and the keys otherwise keep an
+        iterator, which resumes after the last batch in insertion order once
+        they were written to. Sets have no order to resume in, a set written
+        during the scan is walked again from a copy taken then.
+        """
+        if key is None:
+            container = self._data
+        now = time.monotonic()
+        with self._scans_lock:
+            self._drop_idle_scans(now)
+            state = self._scans.get(cursor) if cursor else None
+            if state is None or state.key != key or state.container is not container:
+                # a new scan, or one that was dropped, which starts over
+                if state is not None:
+                    self._drop_scan(cursor)
+                cursor = next(self._scan_ids)
+                if key is not None:
+                    self._version_refs[key] = self._version_refs.get(key, 0) + 1
+                    self._versions.setdefault(key, 0)
+                state = _ScanState(key, container, self._version_of(key))
+                self._scans[cursor] = state
+                if len(self._scans) > _SCAN_CURSORS_MAX:
+                    self._drop_scan(next(iter(self._scans)))
+            else:
+                self._scans.move_to_end(cursor)
+            state.used = now
+
+        if type(container) is SortedSet or (key is None and self._key_index is not None):
+            batch = self._scan_ordered(state, count, prefix)
+        else:
+            batch = self._scan_unordered(state, count, prefix)
+
+        if len(batch) < count:
+            with self._scans_lock:
+                self._drop_scan(cursor)
+            return 0, batch
+        return cursor, batch
+
+    def _drop_scan(self, cursor: int):
+        # must be called with the scans lock held
+        state = self._scans.pop(cursor, None)
+        if state is None or state.key is None:
+            return
+        refs = self._version_refs[state.key] - 1
+        if refs:
+            self._version_refs[state.key] = refs
+        else:
+            del self._version_refs[state.key]
+            del self._versions[state.key]
+
+    def _drop_idle_scans(self, now: float):
+        # must be called with the scans lock held
+        while self._scans:
+            cursor, state = next(iter(self._scans.items()))
+            if now - state.used < _SCAN_IDLE_SECONDS:
+                break
+            self._drop_scan(cursor)
+
+    def _scan_ordered(self, state: _ScanState, count: int, prefix: str) -> List[str]:
+        if state.key is not None:
+            members = state.container.members_after(state.resume)
+        else:
+            if state.resume is None:
+                members = self._key_index.irange(minimum=prefix or None)
+            else:
+                members = self._key_index.irange(minimum=state.resume, inclusive=(False, True))
+            if prefix:
+                members = itertools.takewhile(lambda member: member.startswith(prefix), members)
+        batch = list(itertools.islice(members, count))
+        if batch:
+            state.resume = batch[-1]
+        return batch
+
+    def _scan_unordered(self, state: _ScanState, count: int, prefix: str) -> List[str]:
+        version = self._version_of(state.key)
+        if state.iterator is None:
+            state.iterator = self._scan_iterator(state.container, prefix)
+        elif version != state.version and not state.copied:
+            self._resume_scan(state, prefix)
+        state.version = version
+
+        try:
+            batch = list(itertools.islice(state.iterator, count))
+        except RuntimeError:
+            # changed by a write the version did not see
+            self._resume_scan(state, prefix)
+            batch = list(itertools.islice(state.iterator, count))
+        state.last_batch = batch
+        return batch
+
+    @staticmethod
+    def _scan_iterator(members: Iterable[str], prefix: str) -> Iterator[str]:
+        if prefix:
+            return filter(lambda member: member.startswith(prefix), members)
+        return iter(members)
+
+    def _resume_scan(self, state: _ScanState, prefix: str):
+        """
+        Start a new iterator over the container of the scan, which was
+        written to, after the members of the last batch still in it
+        """
+        container = state.container
+        if type(container) is set:
+            state.iterator = self._scan_iterator(list(container), prefix)
+            state.copied = True
+            return
+
+        # a dict keeps the order its keys were added in, the keys of the
+        # last batch that are still there follow each other
+        members = self._scan_iterator(container, prefix)
+        last_batch = set(state.last_batch)
+        if next(filter(last_batch.__contains__, members), None) is None:
+            # none of them is left, start over
+            state.iterator = self._scan_iterator(container, prefix)
+            return
+        for member in members:
+            if member not in last_batch:
+                members = itertools.chain((member,), members)
+                break
+        state.iterator = members
+
+    def eviction_candidate(self, policy: str, samples: int) -> Optional[Tuple[float, str]]:
+        """
+        Look at samples keys picked at random, only among the ones with an
+        expiration for a volatile policy, and return the best one to evict
+        with its score, the higher the better: the idle time for lru, the
+        inverse of the access counter for lfu, the nearness of the
+        expiration for ttl. Return None if there is no key to evict.
+        """
+        ring = self._expire_ring if policy.startswith("volatile") else self._key_ring
+        if ring is None:
+            return None
+
+        best = None
+        now = time.monotonic()
+        now_min = int(now / 60)
+        for key in ring.sample(samples):
+            if policy == "volatile-ttl":
+                expiration = self._expirations.get(key)
+                if expiration is None:
+                    continue
+                score = -expiration
+            elif policy.endswith("lfu"):
+                score = 255 - self._lfu_counter(key, now_min)
+            else:
+                score = now - self._access.get(key, 0)
+            if best is None or score > best[0]:
+                best = (score, key)
+        return best
+
+    def freeze(self) -> "LitedisDB":
+        """
+        Return a point-in-time copy of the db for dumping, only the key
+        tables are copied, a container is copied when this db accesses it
+        again. Call `unfreeze` once the copy is no longer used.
+        """
+        frozen = LitedisDB(self.name)
+        frozen._data = self._data.copy()
+        frozen._expirations = self._expirations.copy()
+        self._frozen_data = frozen._data
+        return frozen
+
+    def unfreeze(self):
+        self._frozen_data = None
 
     def set_expiration(self, key: str, expiration: int) -> int:
         if key not in self._data:
             return 0
+        if self._sizes is not None and key not in self._expirations:
+            self._resize_key(key, _EXPIRATION_ENTRY_SIZE)
         self._expirations[key] = expiration
+        self._expire_ring.add(key)
         return 1
 
     def get_expiration(self, key: str) -> int:
@@ -118,8 +709,41 @@ class LitedisDB:
         if key not in self._expirations:
             return 0
         del self._expirations[key]
+        self._expire_ring.discard(key)
+        if self._sizes is not None:
+            self._resize_key(key, -_EXPIRATION_ENTRY_SIZE)
         return 1
 
+    def _resize_key(self, key: str, delta: int):
+        with self._memory_lock:
+            if key in self._sizes:
+                self._sizes[key] += delta
+                self.used_memory += delta
+
+    def memory_usage(self, key: str, samples: int = MEMORY_SAMPLES) -> Optional[int]:
+        """
+        Estimate the bytes a key takes with its value and expiration,
+        sampling up to samples elements of a container, all of them if 0.
+        Return None if the key does not exist.
+        """
+        # not an access for the eviction policies
+        if self._delete_expired(key) or key not in self._data:
+            return None
+        value = self._data[key]
+        size = sys.getsizeof(key) + _KEY_ENTRY_SIZE + _estimate_value_size(value, samples)
+        if key in self._expirations:
+            size += _EXPIRATION_ENTRY_SIZE
+        return size
+
+    def estimate_memory(self) -> int:
+        """
+        Return `used_memory` if memory accounting is enabled,
+        otherwise estimate it now by walking every key
+        """
+        if self._sizes is not None:
+            return self.used_memory
+        return sum(self.memory_usage(key) or 0 for key in list(self._data))
+
     def get_type(self, key: str) -> str:
         if key not in self._data:
             return "none"
@@ -127,7 +751,7 @@ class LitedisDB:
         value = self._data[key]
         if isinstance(value, str):
             return "string"
-        elif isinstance(value, list):
+        elif isinstance(value, deque):
             return "list"
         elif isinstance(value, dict):
             return "hash"
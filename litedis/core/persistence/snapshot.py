@@ -0,0 +1,248 @@
+import os
+import struct
+import tempfile
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from litedis.core.command.sortedset import SortedSet
+from litedis.core.persistence.ldb import LitedisDB
+
+LDB_SIGNATURE = b"LITEDIS-LDB"
+LDB_VERSION = 1
+
+_FLAG_COMPRESSED = 1
+
+_TYPE_STRING = 0
+_TYPE_LIST = 1
+_TYPE_HASH = 2
+_TYPE_SET = 3
+_TYPE_ZSET = 4
+
+_HEADER = struct.Struct("<BBQ")  # version, flags, generation
+_DB_HEADER = struct.Struct("<Q")  # number of keys
+_ENTRY_HEADER = struct.Struct("<Bq")  # value type, expiration (-1 for none)
+_UINT32 = struct.Struct("<I")
+_DOUBLE = struct.Struct("<d")
+
+
+class Snapshot:
+    """
+    Point-in-time dump of the databases, loaded without replaying commands.
+
+    After the header (signature, version, flags and the generation of the
+    AOF that continues the snapshot) the body, zlib compressed if the
+    compressed flag is set, is a sequence of databases:
+
+        db    := <name:str> <count:u64> entry{count}
+        entry := <type:u8> <expiration:i64> <key:str> value
+        str   := <size:u32> <utf-8 bytes>
+
+    where a value is a str for strings, and a u32 count followed by the
+    elements for lists and sets, field-value pairs for hashes and
+    member-score(f64) pairs for sorted sets.
+    """
+
+    def __init__(self,
+                 data_path: Union[str, Path],
+                 filename="litedis.ldb",
+                 compress=False):
+        self.data_path = data_path if isinstance(data_path, Path) else Path(data_path)
+        self.data_path.mkdir(parents=True, exist_ok=True)
+
+        self._filename = filename
+        self._file_path = self.data_path / self._filename
+        self.compress = compress
+
+    def exists_file(self):
+        return self._file_path.exists()
+
+    def remove_file(self):
+        if self._file_path.exists():
+            os.unlink(self._file_path)
+
+    def size(self) -> int:
+        return self._file_path.stat().st_size if self._file_path.exists() else 0
+
+    def read_generation(self) -> Optional[int]:
+        if not self._file_path.exists():
+            return None
+        with open(self._file_path, "rb") as f:
+            _, _, generation = self._read_header(f)
+        return generation
+
+    def save(self, dbs: Dict[str, LitedisDB], generation: int = 0):
+
+        temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self._file_path))
+
+        try:
+            with os.fdopen(temp_fd, 'wb') as f:
+                flags = _FLAG_COMPRESSED if self.compress else 0
+                f.write(LDB_SIGNATURE + _HEADER.pack(LDB_VERSION, flags, generation))
+
+                compressor = zlib.compressobj() if self.compress else None
+                for chunk in self._encode_dbs(dbs):
+                    f.write(compressor.compress(chunk) if compressor else chunk)
+                if compressor:
+                    f.write(compressor.flush())
+
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(temp_path, self._file_path)
+        except:
+            os.unlink(temp_path)
+            raise Exception(f"Failed to save {self._file_path}")
+
+    def load(self) -> Tuple[int, Dict[str, LitedisDB]]:
+        """
+        Return the generation and the databases of the snapshot
+        """
+        with open(self._file_path, "rb") as f:
+            _, flags, generation = self._read_header(f)
+            body = f.read()
+
+        if flags & _FLAG_COMPRESSED:
+            body = zlib.decompress(body)
+
+        return generation, self._decode_dbs(body)
+
+    def _read_header(self, f):
+        signature = f.read(len(LDB_SIGNATURE))
+        if signature != LDB_SIGNATURE:
+            raise ValueError(f"{self._file_path} is not a litedis snapshot")
+        version, flags, generation = _HEADER.unpack(f.read(_HEADER.size))
+        if version != LDB_VERSION:
+            raise ValueError(f"unsupported snapshot version in {self._file_path}")
+        return version, flags, generation
+
+    @staticmethod
+    def _encode_dbs(dbs: Dict[str, LitedisDB]):
+        pack_u32 = _UINT32.pack
+        pack_double = _DOUBLE.pack
+        pack_entry = _ENTRY_HEADER.pack
+
+        def pack_str(s):
+            data = str(s).encode("utf-8")
+            return pack_u32(len(data)) + data
+
+        now = int(time.time() * 1000)
+        for dbname, db in dbs.items():
+            expirations = db._expirations
+            # expired keys are left out, they would be deleted on first access anyway
+            items = [(key, value) for key, value in db._data.items()
+                     if expirations.get(key, now) >= now]
+
+            out = [pack_str(dbname), _DB_HEADER.pack(len(items))]
+            size = 0
+            for key, value in items:
+                expiration = expirations.get(key, -1)
+                if isinstance(value, str):
+                    out.append(pack_entry(_TYPE_STRING, expiration))
+                    out.append(pack_str(key))
+                    out.append(pack_str(value))
+                elif isinstance(value, dict):
+                    out.append(pack_entry(_TYPE_HASH, expiration))
+                    out.append(pack_str(key))
+                    out.append(pack_u32(len(value)))
+                    for field, val in value.items():
+                        out.append(pack_str(field))
+                        out.append(pack_str(val))
+                elif isinstance(value, (deque, set)):
+                    out.append(pack_entry(_TYPE_LIST if isinstance(value, deque) else _TYPE_SET, expiration))
+                    out.append(pack_str(key))
+                    out.append(pack_u32(len(value)))
+                    out.extend(pack_str(element) for element in value)
+                elif isinstance(value, SortedSet):
+                    out.append(pack_entry(_TYPE_ZSET, expiration))
+                    out.append(pack_str(key))
+                    out.append(pack_u32(len(value)))
+                    for member, score in value.items():
+                        out.append(pack_str(member))
+                        out.append(pack_double(score))
+                else:
+                    raise TypeError(f"the value type the key({key}) is not supported")
+
+                size += 1
+                if size >= 1024:
+                    yield b"".join(out)
+                    out.clear()
+                    size = 0
+
+            if out:
+                yield b"".join(out)
+
+    @staticmethod
+    def _decode_dbs(body: bytes) -> Dict[str, LitedisDB]:
+        unpack_u32 = _UINT32.unpack_from
+        unpack_double = _DOUBLE.unpack_from
+        unpack_entry = _ENTRY_HEADER.unpack_from
+
+        def read_str(offset):
+            size, = unpack_u32(body, offset)
+            offset += 4
+            return str(body[offset:offset + size], "utf-8"), offset + size
+
+        def read_strs(offset, count):
+            result = []
+            for _ in range(count):
+                size, = unpack_u32(body, offset)
+                offset += 4
+                result.append(str(body[offset:offset + size], "utf-8"))
+                offset += size
+            return result, offset
+
+        now = int(time.time() * 1000)
+        dbs = {}
+        pos = 0
+        end = len(body)
+        while pos < end:
+            dbname, pos = read_str(pos)
+            count, = _DB_HEADER.unpack_from(body, pos)
+            pos += _DB_HEADER.size
+
+            db = dbs.get(dbname)
+            if db is None:
+                db = LitedisDB(dbname)
+                dbs[dbname] = db
+            data = db._data
+            expirations = db._expirations
+
+            for _ in range(count):
+                type_, expiration = unpack_entry(body, pos)
+                pos += _ENTRY_HEADER.size
+                key, pos = read_str(pos)
+
+                if type_ == _TYPE_STRING:
+                    value, pos = read_str(pos)
+                else:
+                    size, = unpack_u32(body, pos)
+                    pos += 4
+                    if type_ == _TYPE_LIST:
+                        value, pos = read_strs(pos, size)
+                        value = deque(value)
+                    elif type_ == _TYPE_SET:
+                        value, pos = read_strs(pos, size)
+                        value = set(value)
+                    elif type_ == _TYPE_HASH:
+                        pairs, pos = read_strs(pos, size * 2)
+                        value = dict(zip(pairs[::2], pairs[1::2]))
+                    elif type_ == _TYPE_ZSET:
+                        mapping = {}
+                        for _ in range(size):
+                            member, pos = read_str(pos)
+                            mapping[member], = unpack_double(body, pos)
+                            pos += _DOUBLE.size
+                        value = SortedSet(mapping)
+                    else:
+                        raise ValueError(f"unknown value type {type_} in snapshot")
+
+                if expiration != -1:
+                    if expiration < now:
+                        continue
+                    expirations[key] = expiration
+                data[key] = value
+
+        return dbs
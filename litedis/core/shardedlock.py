@@ -0,0 +1,51 @@
+from threading import Lock
+from typing import Iterable, List, Optional
+
+
+class ShardedLock:
+    """
+    Lock of a db whose keyspace is hash-partitioned into shards that are
+    locked independently, so commands on unrelated keys do not contend.
+    Shards are always taken in index order, so commands locking several of
+    them cannot deadlock. With a single shard it locks the whole db.
+
+    Used as a context manager it locks all shards.
+    """
+    __slots__ = ('_locks', 'shards', 'first')
+
+    def __init__(self, shards: int = 1):
+        if shards < 1:
+            raise ValueError("shards must be positive")
+        self._locks = [Lock() for _ in range(shards)]
+        self.shards = shards
+        # the lock of the whole db when there is a single shard
+        self.first = self._locks[0]
+
+    def shard_of(self, key: str) -> int:
+        return hash(key) % self.shards
+
+    def acquire_keys(self, keys: Optional[Iterable[str]]) -> List[Lock]:
+        """
+        Lock the shards of the keys, all shards if keys is empty or None.
+        Return the locks taken, to be passed to `release`.
+        """
+        locks = self._locks
+        if keys and self.shards > 1:
+            shards = self.shards
+            locks = [locks[index] for index in sorted({hash(key) % shards for key in keys})]
+
+        for lock in locks:
+            lock.acquire()
+        return locks
+
+    @staticmethod
+    def release(locks: List[Lock]):
+        for lock in reversed(locks):
+            lock.release()
+
+    def __enter__(self):
+        self.acquire_keys(None)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release(self._locks)
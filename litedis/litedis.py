@@ -5,9 +5,12 @@ from litedis.client.commands import (
     BasicCommands,
     HashCommands,
     ListCommands,
+    ServerCommands,
     SetCommands,
     ZSetCommands
 )
+from litedis.client.pipeline import Pipeline
+from litedis.core.command.base import Command
 from litedis.core.dbmanager import DBManager
 from litedis.typing import CommandProcessor, DBCommandPair
 
@@ -16,6 +19,7 @@ class Litedis(
     BasicCommands,
     HashCommands,
     ListCommands,
+    ServerCommands,
     SetCommands,
     ZSetCommands
 ):
@@ -23,15 +27,49 @@ class Litedis(
                  dbname: str = "db",
                  persistence_on: bool = True,
                  data_path: Union[str, Path] = "ldbdata",
-                 aof_rewrite_cycle: int = 666):
+                 aof_rewrite_cycle: int = 666,
+                 aof_rewrite_percentage: int = 100,
+                 aof_rewrite_min_size: int = 64 * 1024 * 1024,
+                 appendfsync: str = "everysec",
+                 snapshot_on: bool = False,
+                 snapshot_compress: bool = False,
+                 active_expire_hz: int = 10,
+                 db_shards: int = 1,
+                 key_index: bool = False,
+                 maxmemory: int = 0,
+                 maxmemory_policy: str = "noeviction",
+                 maxmemory_samples: int = 5,
+                 memory_accounting: bool = True):
         self.dbname = dbname
 
         dbmanager = DBManager(data_path,
                               persistence_on=persistence_on,
-                              aof_rewrite_cycle=aof_rewrite_cycle)
+                              aof_rewrite_cycle=aof_rewrite_cycle,
+                              aof_rewrite_percentage=aof_rewrite_percentage,
+                              aof_rewrite_min_size=aof_rewrite_min_size,
+                              appendfsync=appendfsync,
+                              snapshot_on=snapshot_on,
+                              snapshot_compress=snapshot_compress,
+                              active_expire_hz=active_expire_hz,
+                              db_shards=db_shards,
+                              key_index=key_index,
+                              maxmemory=maxmemory,
+                              maxmemory_policy=maxmemory_policy,
+                              maxmemory_samples=maxmemory_samples,
+                              memory_accounting=memory_accounting)
 
         self.executor: CommandProcessor = dbmanager
 
     def execute(self, *args) -> Any:
         result = self.executor.process_command(DBCommandPair(self.dbname, list(args)))
         return result
+
+    def execute_command(self, command: Command) -> Any:
+        """
+        Run a command created by a typed constructor, e.g.
+        `SetCommand.from_args(key, value, px=100)`, skipping the tokens
+        """
+        return self.executor.process_parsed_command(self.dbname, command)
+
+    def pipeline(self, raise_on_error: bool = True) -> Pipeline:
+        return Pipeline(self.executor, self.dbname, raise_on_error=raise_on_error)
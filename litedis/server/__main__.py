@@ -0,0 +1,3 @@
+from litedis.server.server import main
+
+main()
@@ -0,0 +1,194 @@
+import math
+from collections import deque
+from typing import Any, List, Optional
+
+# limits of redis, a peer sending more is disconnected
+MAX_BULK_LENGTH = 512 * 1024 * 1024
+MAX_MULTIBULK_LENGTH = 1024 * 1024
+MAX_INLINE_LENGTH = 64 * 1024
+
+
+class RespProtocolError(ValueError):
+    """The peer sent data that is not a valid RESP request"""
+
+
+class SimpleString(str):
+    """A reply sent as a RESP simple string, e.g. +OK, rather than a bulk string"""
+
+
+OK = SimpleString("OK")
+
+
+class RespParser:
+    """
+    Split the bytes received from a connection into requests. A request
+    is a RESP array of bulk strings, or an inline command as typed in
+    telnet. Data is fed as it arrives, `feed` returns the requests it
+    completed, an incomplete request is kept until the rest arrives, so
+    a whole pipeline received at once is parsed in one call.
+    """
+
+    __slots__ = ('_buffer', '_pos', '_pending', '_remaining')
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0
+        # arguments of the array being read and the number still missing
+        self._pending: List[str] = []
+        self._remaining = 0
+
+    def feed(self, data: bytes) -> List[List[str]]:
+        self._buffer += data
+        requests = []
+        while True:
+            request = self._parse_request()
+            if request is None:
+                break
+            if request:
+                requests.append(request)
+        # the parsed bytes are dropped once per call, not per request
+        if self._pos:
+            del self._buffer[:self._pos]
+            self._pos = 0
+        return requests
+
+    def _read_line(self) -> Optional[bytes]:
+        end = self._buffer.find(b'\r\n', self._pos)
+        if end < 0:
+            if len(self._buffer) - self._pos > MAX_INLINE_LENGTH:
+                raise RespProtocolError('too big inline request')
+            return None
+        line = bytes(self._buffer[self._pos:end])
+        self._pos = end + 2
+        return line
+
+    def _parse_request(self) -> Optional[List[str]]:
+        if not self._remaining:
+            if self._pos >= len(self._buffer):
+                return None
+            if self._buffer[self._pos] != ord('*'):
+                return self._parse_inline()
+            line = self._read_line()
+            if line is None:
+                return None
+            count = self._parse_length(line[1:], 'multibulk', MAX_MULTIBULK_LENGTH)
+            if count <= 0:
+                # an empty array is skipped like redis does
+                return []
+            self._remaining = count
+            self._pending = []
+
+        while self._remaining:
+            start = self._pos
+            line = self._read_line()
+            if line is None:
+                return None
+            if not line.startswith(b'$'):
+                raise RespProtocolError(f"expected '$', got '{line[:1].decode('latin-1')}'")
+            length = self._parse_length(line[1:], 'bulk', MAX_BULK_LENGTH)
+            end = self._pos + length
+            if len(self._buffer) < end + 2:
+                # the header is read again once the whole string is there
+                self._pos = start
+                return None
+            self._pending.append(self._decode(self._buffer[self._pos:end]))
+            self._pos = end + 2
+            self._remaining -= 1
+
+        request, self._pending = self._pending, []
+        return request
+
+    def _parse_inline(self) -> Optional[List[str]]:
+        line = self._read_line()
+        if line is None:
+            return None
+        return self._decode(line).split()
+
+    @staticmethod
+    def _parse_length(token: bytes, kind: str, limit: int) -> int:
+        try:
+            length = int(token)
+        except ValueError:
+            raise RespProtocolError(f'invalid {kind} length')
+        if length > limit or (length < 0 and kind == 'bulk'):
+            raise RespProtocolError(f'invalid {kind} length')
+        return length
+
+    @staticmethod
+    def _decode(data) -> str:
+        try:
+            return bytes(data).decode('utf-8')
+        except UnicodeDecodeError:
+            raise RespProtocolError('invalid utf-8 in request')
+
+
+def encode_error(error: BaseException) -> bytes:
+    message = ' '.join(str(error).split()) or type(error).__name__
+    code = message.split(' ', 1)[0]
+    if not (code.isupper() and code.isalpha()):
+        # like redis, a reply error starts with an upper case code
+        message = f'ERR {message}'
+    return f'-{message}\r\n'.encode('utf-8')
+
+
+def _format_float(value: float) -> str:
+    if math.isinf(value):
+        return 'inf' if value > 0 else '-inf'
+    if math.isnan(value):
+        return 'nan'
+    text = repr(value)
+    # redis replies 3 rather than 3.0
+    return text[:-2] if text.endswith('.0') else text
+
+
+def encode_reply(value: Any, protocol: int = 2) -> bytes:
+    """
+    Encode the result of a command as a RESP2 or RESP3 reply. Dicts and
+    sets are flattened into arrays in RESP2, None is a null bulk string,
+    an exception is an error reply.
+    """
+    out = bytearray()
+    _encode(value, protocol, out)
+    return bytes(out)
+
+
+def _encode(value: Any, protocol: int, out: bytearray):
+    if isinstance(value, SimpleString):
+        out += b'+%s\r\n' % value.encode('utf-8')
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        out += b'$%d\r\n%s\r\n' % (len(data), data)
+    elif value is None:
+        out += b'_\r\n' if protocol == 3 else b'$-1\r\n'
+    elif isinstance(value, bool):
+        if protocol == 3:
+            out += b'#t\r\n' if value else b'#f\r\n'
+        else:
+            out += b':1\r\n' if value else b':0\r\n'
+    elif isinstance(value, int):
+        out += b':%d\r\n' % value
+    elif isinstance(value, float):
+        text = _format_float(value).encode('ascii')
+        if protocol == 3:
+            out += b',%s\r\n' % text
+        else:
+            out += b'$%d\r\n%s\r\n' % (len(text), text)
+    elif isinstance(value, (list, tuple, deque)):
+        out += b'*%d\r\n' % len(value)
+        for item in value:
+            _encode(item, protocol, out)
+    elif isinstance(value, dict):
+        out += (b'%%%d\r\n' if protocol == 3 else b'*%d\r\n') % (len(value) * (1 if protocol == 3 else 2))
+        for field, item in value.items():
+            _encode(field, protocol, out)
+            _encode(item, protocol, out)
+    elif isinstance(value, (set, frozenset)):
+        out += (b'~%d\r\n' if protocol == 3 else b'*%d\r\n') % len(value)
+        for item in value:
+            _encode(item, protocol, out)
+    elif isinstance(value, BaseException):
+        out += encode_error(value)
+    elif isinstance(value, bytes):
+        out += b'$%d\r\n%s\r\n' % (len(value), value)
+    else:
+        _encode(str(value), protocol, out)
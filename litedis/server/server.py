@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from typing import List, Optional, Set
+
+from litedis.core.command.factory import CommandFactory, _parsers
+from litedis.core.command.pattern import match_pattern
+from litedis.core.dbmanager import DBManager
+from litedis.core.persistence.ldb import EVICTION_POLICIES
+from litedis.server.resp import OK, RespParser, RespProtocolError, SimpleString, encode_error, encode_reply
+from litedis.typing import CommandProcessor, DBCommandPair, ReadWriteType
+
+logger = logging.getLogger(__name__)
+
+# bytes read from a connection at a time, a pipeline received
+# in one read is run as one batch
+_READ_SIZE = 64 * 1024
+
+# commands whose result is a number kept as a string, replied as an integer
+_INTEGER_REPLIES = frozenset(('incrby', 'decrby'))
+# commands whose result is a flat list of field and value pairs, a map in RESP3
+_MAP_REPLIES = frozenset(('hgetall',))
+
+
+class _Connection:
+    __slots__ = ('id', 'dbname', 'protocol', 'name', 'closing')
+
+    def __init__(self, id: int, dbname: str):
+        self.id = id
+        self.dbname = dbname
+        self.protocol = 2
+        self.name: Optional[str] = None
+        # set by QUIT, the connection is closed once its replies are sent
+        self.closing = False
+
+
+class LitedisServer:
+    """
+    Serve the commands of a db manager over RESP2 and RESP3, on TCP,
+    a Unix socket or both.
+
+        server = LitedisServer(DBManager("ldbdata"), port=6379)
+        asyncio.run(server.serve_forever())
+
+    Each connection has its own db, `dbname` until SELECT changes it, and
+    its protocol, RESP2 until HELLO 3. Commands a client pipelines are
+    parsed together, and the consecutive ones on the db run as one batch
+    under one acquisition of the db locks, see `process_commands`.
+
+    With `workers` 0 the commands run on the event loop thread, which is
+    the fastest while they never wait. With more workers they run on a
+    pool of that many threads, so the loop keeps serving other clients
+    while a command waits for the disk (appendfsync always) or for the
+    locks of its keys (db_shards > 1). Blocking commands like BLPOP
+    always wait on a thread of their own.
+    """
+
+    def __init__(self,
+                 executor: CommandProcessor,
+                 dbname: str = "db",
+                 host: Optional[str] = "127.0.0.1",
+                 port: int = 6379,
+                 unixsocket: Optional[str] = None,
+                 unixsocketperm: Optional[int] = None,
+                 workers: int = 0):
+        if port == 0 and not unixsocket:
+            raise ValueError("server requires a port or a unixsocket")
+        if workers < 0:
+            raise ValueError("workers must not be negative")
+        self.executor = executor
+        self.dbname = dbname
+        self.host = host
+        self.port = port
+        self.unixsocket = unixsocket
+        self.unixsocketperm = unixsocketperm
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(workers, thread_name_prefix="litedis-worker") if workers else None)
+        self._servers: List[asyncio.AbstractServer] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._ids = itertools.count(1)
+
+    @property
+    def sockets(self) -> list:
+        return [sock for server in self._servers for sock in server.sockets]
+
+    async def start(self):
+        """Start listening, the connections are served by the running loop"""
+        if self.port:
+            self._servers.append(await asyncio.start_server(self._handle, self.host, self.port))
+        if self.unixsocket:
+            if os.path.exists(self.unixsocket):
+                # left by a server that did not shut down
+                os.unlink(self.unixsocket)
+            self._servers.append(await asyncio.start_unix_server(self._handle, self.unixsocket))
+            if self.unixsocketperm is not None:
+                os.chmod(self.unixsocket, self.unixsocketperm)
+
+    async def serve_forever(self):
+        if not self._servers:
+            await self.start()
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in self._servers))
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stop listening and close the connections"""
+        for server in self._servers:
+            server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        if self.unixsocket and os.path.exists(self.unixsocket):
+            os.unlink(self.unixsocket)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        conn = _Connection(next(self._ids), self.dbname)
+        parser = RespParser()
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            while not conn.closing:
+                data = await reader.read(_READ_SIZE)
+                if not data:
+                    break
+                try:
+                    requests = parser.feed(data)
+                except RespProtocolError as e:
+                    writer.write(encode_error(ValueError(f"Protocol error: {e}")))
+                    break
+                if requests:
+                    writer.write(await self._run(conn, requests))
+                    await writer.drain()
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # the client went away, or the server is closing
+            pass
+        finally:
+            self._tasks.discard(task)
+            writer.close()
+
+    async def _run(self, conn: _Connection, requests: List[List[str]]) -> bytes:
+        """Run the requests of a connection in order and return their replies"""
+        replies = []
+        # consecutive db commands, run together
+        batch: List[List[str]] = []
+        for tokens in requests:
+            if conn.closing:
+                break
+            handler = _CONNECTION_COMMANDS.get(tokens[0].lower())
+            if handler is not None:
+                await self._flush(conn, batch, replies)
+                try:
+                    result = handler(self, conn, tokens)
+                except Exception as e:
+                    result = e
+                replies.append(encode_reply(result, conn.protocol))
+                continue
+            try:
+                cls = CommandFactory.get_class(tokens[0])
+            except ValueError:
+                # the batch replies with the error
+                cls = None
+            if cls is not None and (cls.blocking or 'admin' in cls.flags):
+                await self._flush(conn, batch, replies)
+                try:
+                    result = await self._call(self.executor.process_command,
+                                              DBCommandPair(conn.dbname, tokens),
+                                              blocking=cls.blocking)
+                except Exception as e:
+                    result = e
+                replies.append(self._encode(cls, result, conn.protocol))
+            else:
+                batch.append(tokens)
+        await self._flush(conn, batch, replies)
+        return b"".join(replies)
+
+    async def _flush(self, conn: _Connection, batch: List[List[str]], replies: List[bytes]):
+        if not batch:
+            return
+        commands = list(batch)
+        batch.clear()
+        results = await self._call(self.executor.process_commands, conn.dbname, commands)
+        for tokens, result in zip(commands, results):
+            cls = None if isinstance(result, Exception) else CommandFactory.get_class(tokens[0])
+            replies.append(self._encode(cls, result, conn.protocol))
+
+    async def _call(self, fn, *args, blocking: bool = False):
+        if blocking:
+            # may wait for long, never on the loop or a worker
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        if self._pool is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    @staticmethod
+    def _encode(cls, result, protocol: int) -> bytes:
+        if cls is not None:
+            if isinstance(result, str) and cls.rwtype is ReadWriteType.Write:
+                if result == "OK":
+                    # a status reply, not a value that happens to be "OK"
+                    result = OK
+                elif cls.name in _INTEGER_REPLIES:
+                    result = int(result)
+            elif protocol == 3 and isinstance(result, list) and cls.name in _MAP_REPLIES:
+                result = dict(zip(result[::2], result[1::2]))
+        return encode_reply(result, protocol)
+
+    # commands on the connection rather than on the db
+
+    def _ping(self, conn: _Connection, tokens: List[str]):
+        if len(tokens) > 2:
+            raise ValueError("wrong number of arguments for 'ping' command")
+        return tokens[1] if len(tokens) == 2 else SimpleString("PONG")
+
+    def _echo(self, conn: _Connection, tokens: List[str]):
+        if len(tokens) != 2:
+            raise ValueError("wrong number of arguments for 'echo' command")
+        return tokens[1]
+
+    def _quit(self, conn: _Connection, tokens: List[str]):
+        conn.closing = True
+        return OK
+
+    def _select(self, conn: _Connection, tokens: List[str]):
+        if len(tokens) != 2:
+            raise ValueError("wrong number of arguments for 'select' command")
+        # litedis dbs have names, any name selects its db
+        conn.dbname = tokens[1]
+        return OK
+
+    def _auth(self, conn: _Connection, tokens: List[str]):
+        raise ValueError("AUTH <password> called without any password configured for the default user")
+
+    def _hello(self, conn: _Connection, tokens: List[str]):
+        protocol = conn.protocol
+        i = 1
+        if len(tokens) > 1:
+            try:
+                protocol = int(tokens[1])
+            except ValueError:
+                raise ValueError("Protocol version is not an integer or out of range")
+            if protocol not in (2, 3):
+                raise ValueError("NOPROTO unsupported protocol version")
+            i = 2
+        name = conn.name
+        while i < len(tokens):
+            option = tokens[i].upper()
+            if option == "AUTH" and i + 2 < len(tokens):
+                # no password is configured, any credentials are accepted
+                i += 3
+            elif option == "SETNAME" and i + 1 < len(tokens):
+                name = tokens[i + 1]
+                i += 2
+            else:
+                raise ValueError(f"syntax error in HELLO option '{tokens[i]}'")
+        conn.protocol = protocol
+        conn.name = name
+        return {
+            "server": "litedis",
+            "version": _version(),
+            "proto": protocol,
+            "id": conn.id,
+            "mode": "standalone",
+            "role": "master",
+            "modules": [],
+        }
+
+    def _client(self, conn: _Connection, tokens: List[str]):
+        if len(tokens) < 2:
+            raise ValueError("wrong number of arguments for 'client' command")
+        subcommand = tokens[1].upper()
+        if subcommand == "SETNAME" and len(tokens) == 3:
+            conn.name = tokens[2] or None
+            return OK
+        if subcommand == "GETNAME" and len(tokens) == 2:
+            return conn.name
+        if subcommand == "ID" and len(tokens) == 2:
+            return conn.id
+        if subcommand == "SETINFO" and len(tokens) == 4:
+            return OK
+        raise ValueError(f"unknown subcommand or wrong number of arguments for '{tokens[1]}'")
+
+    def _command(self, conn: _Connection, tokens: List[str]):
+        if len(tokens) == 2 and tokens[1].upper() == "COUNT":
+            return len(_command_names())
+        # command docs are not served, clients like redis-cli go without them
+        return []
+
+    def _config(self, conn: _Connection, tokens: List[str]):
+        if len(tokens) < 3 or tokens[1].upper() != "GET":
+            raise ValueError("only CONFIG GET is supported")
+        config = {
+            "save": "",
+            "appendonly": "yes" if getattr(self.executor, "persistence_on", False) else "no",
+        }
+        return {name: value for name, value in config.items()
+                if any(match_pattern(pattern.lower(), name) for pattern in tokens[2:])}
+
+
+_CONNECTION_COMMANDS = {
+    "ping": LitedisServer._ping,
+    "echo": LitedisServer._echo,
+    "quit": LitedisServer._quit,
+    "select": LitedisServer._select,
+    "auth": LitedisServer._auth,
+    "hello": LitedisServer._hello,
+    "client": LitedisServer._client,
+    "command": LitedisServer._command,
+    "config": LitedisServer._config,
+}
+
+
+def _command_names() -> List[str]:
+    return list(_parsers) + list(_CONNECTION_COMMANDS)
+
+
+def _version() -> str:
+    try:
+        return version("litedis")
+    except PackageNotFoundError:
+        return "0"
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="litedis-server", description="Serve litedis over the redis protocol")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=6379, help="TCP port, 0 to listen on the unix socket only")
+    parser.add_argument("--unixsocket", help="path of a unix socket to listen on")
+    parser.add_argument("--unixsocketperm", type=lambda s: int(s, 8), help="permissions of the unix socket, e.g. 700")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="threads running the commands, 0 runs them on the event loop (default)")
+    parser.add_argument("--dbname", default="db", help="db of new connections (default: db)")
+    parser.add_argument("--data-path", default="ldbdata", help="directory of the data files (default: ldbdata)")
+    parser.add_argument("--no-persistence", action="store_true", help="keep the data in memory only")
+    parser.add_argument("--appendfsync", default="everysec", choices=("always", "everysec", "no"))
+    parser.add_argument("--snapshot", action="store_true", help="rewrite the AOF as a binary snapshot")
+    parser.add_argument("--db-shards", type=int, default=1, help="locks per db, see db_shards")
+    parser.add_argument("--key-index", action="store_true", help="keep the keys sorted for prefix KEYS and SCAN")
+    parser.add_argument("--maxmemory", type=int, default=0, help="bytes the data may take, 0 for no limit")
+    parser.add_argument("--maxmemory-policy", default="noeviction", choices=EVICTION_POLICIES)
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point of `litedis-server`"""
+    args = _parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(message)s")
+
+    dbmanager = DBManager(args.data_path,
+                          persistence_on=not args.no_persistence,
+                          appendfsync=args.appendfsync,
+                          snapshot_on=args.snapshot,
+                          db_shards=args.db_shards,
+                          key_index=args.key_index,
+                          maxmemory=args.maxmemory,
+                          maxmemory_policy=args.maxmemory_policy)
+    server = LitedisServer(dbmanager,
+                           dbname=args.dbname,
+                           host=args.host,
+                           port=args.port,
+                           unixsocket=args.unixsocket,
+                           unixsocketperm=args.unixsocketperm,
+                           workers=args.workers)
+
+    async def serve():
+        await server.start()
+        logger.info("litedis server ready, listening on %s",
+                    ", ".join(str(sock.getsockname()) for sock in server.sockets))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -1,9 +1,13 @@
+from collections import deque
 from enum import Enum
-from typing import Protocol, NamedTuple, Union, List
+from typing import Protocol, NamedTuple, Union, List, TYPE_CHECKING
 
 from litedis.core.command.sortedset import SortedSet
 
-LitedisObjectT = Union[dict, list, set, str, SortedSet]
+if TYPE_CHECKING:
+    from litedis.core.command.base import Command
+
+LitedisObjectT = Union[dict, deque, set, str, SortedSet]
 
 
 class ReadWriteType(Enum):
@@ -18,3 +22,7 @@ class DBCommandPair(NamedTuple):
 
 class CommandProcessor(Protocol):
     def process_command(self, dbcmd: DBCommandPair): ...
+
+    def process_parsed_command(self, dbname: str, command: "Command"): ...
+
+    def process_commands(self, dbname: str, commands: List[Union[List[str], "Command"]]) -> list: ...
@@ -19,4 +19,9 @@ setup(
     install_requires=[
         "sortedcontainers"
     ],
+    entry_points={
+        'console_scripts': [
+            'litedis-server=litedis.server:main',
+        ],
+    },
 )
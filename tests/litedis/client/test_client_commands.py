@@ -1,5 +1,5 @@
-from collections import defaultdict
-from threading import Lock
+import time
+from threading import Lock, Thread
 
 import pytest
 
@@ -15,7 +15,7 @@ class BaseTest:
         """Reset DBManager state before each test"""
         DBManager._dbs = {}
         DBManager._dbs_lock = Lock()
-        DBManager._db_locks = defaultdict(Lock)
+        DBManager._db_locks = {}
         DBManager._instances = {}
         yield
 
@@ -154,6 +154,19 @@ class TestBasicCommands(BaseTest):
         assert client.renamenx("source", "dest") == 0
         assert client.get("dest") == "value2"
 
+    def test_scan(self, client):
+        client.mset({f"key{i}": "value" for i in range(15)})
+        client.rpush("list1", "a")
+        keys = []
+        cursor = 0
+        while True:
+            cursor, batch = client.scan(cursor, match="key*", count=4)
+            keys.extend(batch)
+            if cursor == 0:
+                break
+        assert sorted(keys) == sorted(f"key{i}" for i in range(15))
+        assert client.scan(0, count=100, _type="list") == [0, ["list1"]]
+
     def test_strlen(self, client):
         client.set("key1", "Hello World")
         assert client.strlen("key1") == 11
@@ -297,6 +310,24 @@ class TestHashCommands(BaseTest):
 
 class TestListCommands(BaseTest):
 
+    def test_blpop(self, client):
+        results = []
+        consumer = Thread(target=lambda: results.append(client.blpop("jobs", timeout=5)))
+        consumer.start()
+        time.sleep(0.05)
+        client.rpush("jobs", "job1")
+        consumer.join(5)
+        assert results == [["jobs", "job1"]]
+
+        assert client.brpop("jobs", timeout=0.05) is None
+
+    def test_lmove(self, client):
+        client.rpush("list1", "a", "b")
+        assert client.lmove("list1", "list2", "RIGHT", "LEFT") == "b"
+        assert client.blmove("list1", "list2", "LEFT", "LEFT", timeout=0.05) == "a"
+        assert client.lrange("list2", 0, -1) == ["a", "b"]
+        assert client.blmove("list1", "list2", "LEFT", "LEFT", timeout=0.05) is None
+
     def test_lindex(self, client):
         client.rpush("list1", "value1", "value2", "value3")
         assert client.lindex("list1", 0) == "value1"
@@ -617,6 +648,17 @@ class TestSetCommands(BaseTest):
         # Remove from empty set
         assert client.srem("nonexistent", "member1") == 0
 
+    def test_sscan(self, client):
+        client.sadd("set1", *[f"member{i}" for i in range(20)])
+        members = []
+        cursor = 0
+        while True:
+            cursor, batch = client.sscan("set1", cursor, match="member1*", count=5)
+            members.extend(batch)
+            if cursor == 0:
+                break
+        assert sorted(members) == sorted(["member1"] + [f"member1{i}" for i in range(10)])
+
     def test_sunion(self, client):
         client.sadd("set1", "a", "b", "c")
         client.sadd("set2", "c", "d", "e")
@@ -636,6 +678,13 @@ class TestSetCommands(BaseTest):
 
 
 class TestZSetCommands(BaseTest):
+
+    def test_bzpopmin_bzpopmax(self, client):
+        client.zadd("zset1", {"a": 1, "b": 2})
+        assert client.bzpopmin("zset0", "zset1") == ["zset1", "a", 1]
+        assert client.bzpopmax("zset1", timeout=0.05) == ["zset1", "b", 2]
+        assert client.bzpopmax("zset1", timeout=0.05) is None
+
     def test_zadd(self, client):
         # Add single member
         assert client.zadd("zset1", {"member1": 1.0}) == 1
@@ -766,3 +815,20 @@ class TestZSetCommands(BaseTest):
         client.zadd("zset2", {"b": 2, "c": 3})
         result = client.zunion(2, "zset1", "zset2")
         assert set(result) == {"a", "b", "c"}
+
+
+class TestServerCommands(BaseTest):
+
+    def test_bgrewriteaof(self, client):
+        client.set("key1", "value1")
+        assert client.bgrewriteaof() == "Background append only file rewriting started"
+        while client.info("persistence")["aof_rewrite_in_progress"]:
+            time.sleep(0.01)
+        assert client.info("persistence")["aof_rewrites"] == 1
+
+    def test_info(self, client):
+        info = client.info("persistence")
+        assert info["aof_rewrites"] == 0
+        assert "aof_current_size" in info
+        assert client.info() == {**client.info("memory"), **info}
+        assert client.info("unknown") == {}
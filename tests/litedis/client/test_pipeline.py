@@ -0,0 +1,95 @@
+from threading import Lock
+
+import pytest
+
+from litedis.core.dbcommand import DBCommandPair
+from litedis.core.dbmanager import DBManager
+from litedis.litedis import Litedis
+
+
+@pytest.fixture(autouse=True)
+def reset_dbmanager():
+    DBManager._dbs = {}
+    DBManager._dbs_lock = Lock()
+    DBManager._db_locks = {}
+    DBManager._instances = {}
+    yield
+
+
+@pytest.fixture
+def client(tmp_path_factory):
+    return Litedis(dbname="test", data_path=tmp_path_factory.mktemp("litedis_test"), appendfsync="always")
+
+
+def test_pipeline_execute(client):
+    pipe = client.pipeline()
+    pipe.set("key1", "1").incrby("key1", 2).get("key1")
+    pipe.execute("lpush", "list", "a", "b")
+    assert len(pipe) == 4
+    assert pipe.execute() == ["OK", 3, "3", 2]
+    assert len(pipe) == 0
+    assert pipe.execute() == []
+
+
+def test_pipeline_context_manager(client):
+    with client.pipeline() as pipe:
+        for i in range(100):
+            pipe.hset("hash", {f"field{i}": str(i)})
+    assert client.hlen("hash") == 100
+
+    with pytest.raises(RuntimeError):
+        with client.pipeline() as pipe:
+            pipe.set("key1", "value1")
+            raise RuntimeError()
+    assert client.get("key1") is None
+
+
+def test_pipeline_one_aof_write(client):
+    aof = client.executor._aof
+    size = aof.size()
+    with client.pipeline() as pipe:
+        pipe.set("key1", "value1").get("key1").rpush("list", "a")
+
+    assert aof._appended_seq == 1
+    assert list(aof.load_commands()) == [
+        DBCommandPair("test", ["set", "key1", "value1"]),
+        DBCommandPair("test", ["rpush", "list", "a"]),
+    ]
+    assert aof.size() > size
+
+
+def test_pipeline_errors(client):
+    client.set("key1", "value1")
+
+    pipe = client.pipeline()
+    pipe.lpush("key1", "a").set("key2", "value2").execute("unknown")
+    with pytest.raises(TypeError):
+        pipe.execute()
+    # the commands after a failing one still ran
+    assert client.get("key2") == "value2"
+
+    pipe = client.pipeline(raise_on_error=False)
+    results = pipe.lpush("key1", "a").incrby("counter", 1).execute("unknown").execute()
+    assert isinstance(results[0], TypeError)
+    assert results[1] == 1
+    assert isinstance(results[2], ValueError)
+
+
+def test_pipeline_blocking_commands_do_not_wait(client):
+    results = client.pipeline().blpop("list", timeout=0).rpush("list", "a").blpop("list", timeout=0).execute()
+    assert results == [None, 1, ["list", "a"]]
+    assert list(client.executor._aof.load_commands()) == [
+        DBCommandPair("test", ["rpush", "list", "a"]),
+        DBCommandPair("test", ["lpop", "list"]),
+    ]
+
+
+def test_pipeline_sharded():
+    client = Litedis(dbname="test", persistence_on=False, db_shards=4)
+    with client.pipeline() as pipe:
+        pipe.mset({"key1": "1", "key2": "2"}).incrby("key3", 3).keys("*")
+    assert client.mget("key1", "key2", "key3") == ["1", "2", "3"]
+
+    keys, exists = client.pipeline().keys("*").exists("key1", "key4").execute()
+    assert sorted(keys) == ["key1", "key2", "key3"]
+    assert exists == 1
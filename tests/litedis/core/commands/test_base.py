@@ -0,0 +1,79 @@
+import pytest
+
+from litedis.core.command.base import to_float, to_int
+from litedis.core.command.basiccmds import IncrbyCommand, SetCommand
+from litedis.core.command.factory import CommandFactory
+from litedis.core.command.hashcmds import HSetCommand
+from litedis.core.command.zsetcmds import ZAddCommand
+
+
+def get_keys(*tokens):
+    return CommandFactory.create(tokens[0]).get_keys(list(tokens))
+
+
+def test_get_keys_single_key():
+    assert get_keys("set", "key1", "value", "EX", "10") == ["key1"]
+    assert get_keys("lpush", "list", "a", "b") == ["list"]
+
+
+def test_get_keys_key_range():
+    assert get_keys("del", "key1", "key2", "key3") == ["key1", "key2", "key3"]
+    assert get_keys("mset", "key1", "v1", "key2", "v2") == ["key1", "key2"]
+    assert get_keys("rename", "key1", "key2") == ["key1", "key2"]
+    assert get_keys("renamenx", "key1", "key2") == ["key1", "key2"]
+    assert get_keys("smove", "src", "dst", "member") == ["src", "dst"]
+
+
+def test_get_keys_numkeys():
+    assert get_keys("zunion", "2", "zset1", "zset2", "WITHSCORES") == ["zset1", "zset2"]
+    assert get_keys("sintercard", "2", "set1", "set2", "LIMIT", "1") == ["set1", "set2"]
+    assert get_keys("zmpop", "1", "zset1", "MIN") == ["zset1"]
+    assert get_keys("zunion", "invalid", "zset1") == []
+
+
+def test_get_keys_movable():
+    assert get_keys("sort", "list", "ALPHA", "STORE", "dst") == ["list", "dst"]
+    assert get_keys("sort", "list") == ["list"]
+
+
+def test_get_keys_whole_keyspace():
+    assert get_keys("keys", "*") == []
+    assert get_keys("randomkey") == []
+
+
+def test_to_int_and_to_float():
+    assert to_int(5, "invalid") == 5
+    assert to_int("5", "invalid") == 5
+    assert to_float(1, "invalid") == 1.
+    assert to_float("1.5", "invalid") == 1.5
+    with pytest.raises(ValueError, match="invalid"):
+        to_int("a", "invalid")
+    with pytest.raises(ValueError, match="invalid"):
+        to_int(1.5, "invalid")
+    with pytest.raises(ValueError, match="invalid"):
+        to_float("a", "invalid")
+
+
+def test_from_args_to_tokens():
+    assert SetCommand.from_args("key", "value", px=100, nx=True).to_tokens() == \
+           ["set", "key", "value", "PX", "100", "NX"]
+    assert IncrbyCommand.from_args("key", 2).to_tokens() == ["incrby", "key", "2"]
+    assert HSetCommand.from_args("hash", {"f1": "v1", "f2": "v2"}).to_tokens() == \
+           ["hset", "hash", "f1", "v1", "f2", "v2"]
+    assert ZAddCommand.from_args("zset", {"a": 1}).to_tokens() == ["zadd", "zset", "1.0", "a"]
+
+    # the canonical tokens parse back to the same command
+    command = CommandFactory.create("set")
+    command._parse(["set", "key", "value", "PX", "100", "NX"])
+    assert (command.key, command.value, command.px, command.nx) == ("key", "value", 100, True)
+
+
+def test_from_args_validation():
+    with pytest.raises(ValueError, match="mutually exclusive"):
+        SetCommand.from_args("key", "value", nx=True, xx=True)
+    with pytest.raises(ValueError, match="must be positive"):
+        SetCommand.from_args("key", "value", ex=0)
+    with pytest.raises(ValueError, match="increment must be an integer"):
+        IncrbyCommand.from_args("key", "a")
+    with pytest.raises(ValueError, match="invalid score"):
+        ZAddCommand.from_args("zset", {"a": "b"})
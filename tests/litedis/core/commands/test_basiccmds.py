@@ -1,4 +1,5 @@
 import time
+from collections import deque
 from unittest.mock import patch
 
 import pytest
@@ -25,6 +26,7 @@ from litedis.core.command.basiccmds import (
     RandomKeyCommand,
     RenameCommand,
     RenamenxCommand,
+    ScanCommand,
     StrlenCommand,
     SubstrCommand,
     TTLCommand,
@@ -162,7 +164,7 @@ class TestGetCommand:
         assert result is None
 
     def test_get_wrong_type(self, ctx):
-        ctx.db.set('key', [1, 2, 3])  # Set non-string value
+        ctx.db.set('key', deque([1, 2, 3]))  # Set non-string value
         ctx.cmdtokens = ['get', 'key']
         cmd = GetCommand()
         with pytest.raises(TypeError):
@@ -186,7 +188,7 @@ class TestAppendCommand:
         assert ctx.db.get('key') == 'World'
 
     def test_append_wrong_type(self, ctx):
-        ctx.db.set('key', [1, 2, 3])
+        ctx.db.set('key', deque([1, 2, 3]))
         ctx.cmdtokens = ['append', 'key', 'value']
         cmd = AppendCommand()
         with pytest.raises(TypeError):
@@ -215,7 +217,7 @@ class TestDecrbyCommand:
             cmd.execute(ctx)
 
     def test_decrby_wrong_type(self, ctx):
-        ctx.db.set('key', [1, 2, 3])
+        ctx.db.set('key', deque([1, 2, 3]))
         ctx.cmdtokens = ['decrby', 'key', '5']
         cmd = DecrbyCommand()
         with pytest.raises(TypeError):
@@ -617,7 +619,7 @@ class TestIncrbyCommand:
             cmd.execute(ctx)
 
     def test_incrby_wrong_type(self, ctx):
-        ctx.db.set('key', [1, 2, 3])
+        ctx.db.set('key', deque([1, 2, 3]))
         ctx.cmdtokens = ['incrby', 'key', '5']
         cmd = IncrbyCommand()
         with pytest.raises(TypeError):
@@ -662,7 +664,7 @@ class TestIncrbyfloatCommand:
             cmd.execute(ctx)
 
     def test_incrbyfloat_wrong_type(self, ctx):
-        ctx.db.set('key', [1, 2, 3])
+        ctx.db.set('key', deque([1, 2, 3]))
         ctx.cmdtokens = ['incrbyfloat', 'key', '5.5']
         cmd = IncrbyfloatCommand()
         with pytest.raises(TypeError):
@@ -750,7 +752,7 @@ class TestMgetCommand:
 
     def test_mget_wrong_type(self, ctx):
         ctx.db.set('key1', 'value1')
-        ctx.db.set('key2', [1, 2, 3])  # Wrong type
+        ctx.db.set('key2', deque([1, 2, 3]))  # Wrong type
         ctx.cmdtokens = ['mget', 'key1', 'key2']
         cmd = MGetCommand()
         result = cmd.execute(ctx)
@@ -985,6 +987,52 @@ class TestRenamenxCommand:
             RenamenxCommand().execute(ctx)
 
 
+class TestScanCommand:
+    def test_scan_all_keys(self, ctx):
+        for i in range(25):
+            ctx.db.set(f'key{i}', 'value')
+        keys = []
+        cursor = 0
+        while True:
+            ctx.cmdtokens = ['scan', str(cursor), 'COUNT', '10']
+            cursor, batch = ScanCommand().execute(ctx)
+            assert len(batch) <= 10
+            keys.extend(batch)
+            if cursor == 0:
+                break
+        assert sorted(keys) == sorted(f'key{i}' for i in range(25))
+
+    def test_scan_match_and_type(self, ctx):
+        ctx.db.set('user:1', 'a')
+        ctx.db.set('user:2', {'field': 'value'})
+        ctx.db.set('other', 'b')
+        ctx.cmdtokens = ['scan', '0', 'MATCH', 'user:*']
+        assert sorted(ScanCommand().execute(ctx)[1]) == ['user:1', 'user:2']
+        ctx.cmdtokens = ['scan', '0', 'MATCH', 'user:*', 'TYPE', 'hash']
+        assert ScanCommand().execute(ctx) == [0, ['user:2']]
+
+    def test_scan_skips_deleted_keys(self, ctx):
+        for i in range(4):
+            ctx.db.set(f'key{i}', 'value')
+        ctx.cmdtokens = ['scan', '0', 'COUNT', '2']
+        cursor, first = ScanCommand().execute(ctx)
+        rest = [k for k in ctx.db.keys() if k not in first]
+        ctx.db.delete(rest[0])
+        ctx.cmdtokens = ['scan', str(cursor), 'COUNT', '2']
+        assert ScanCommand().execute(ctx) == [0, rest[1:]]
+
+    def test_scan_invalid_args(self, ctx):
+        ctx.cmdtokens = ['scan', '-1']
+        with pytest.raises(ValueError, match='cursor must be non-negative'):
+            ScanCommand().execute(ctx)
+        ctx.cmdtokens = ['scan', '0', 'COUNT', '0']
+        with pytest.raises(ValueError, match='count must be a positive integer'):
+            ScanCommand().execute(ctx)
+        ctx.cmdtokens = ['scan', '0', 'FOO', 'bar']
+        with pytest.raises(ValueError, match='invalid argument'):
+            ScanCommand().execute(ctx)
+
+
 class TestStrlenCommand:
     def test_strlen_basic(self, ctx):
         ctx.db.set('key', 'hello')
@@ -1007,7 +1055,7 @@ class TestStrlenCommand:
         assert result == 0
 
     def test_strlen_wrong_type(self, ctx):
-        ctx.db.set('key', [1, 2, 3])
+        ctx.db.set('key', deque([1, 2, 3]))
         ctx.cmdtokens = ['strlen', 'key']
         cmd = StrlenCommand()
         with pytest.raises(TypeError):
@@ -1050,7 +1098,7 @@ class TestSubstrCommand:
         assert result is None
 
     def test_substr_wrong_type(self, ctx):
-        ctx.db.set('key', [1, 2, 3])
+        ctx.db.set('key', deque([1, 2, 3]))
         ctx.cmdtokens = ['substr', 'key', '0', '1']
         cmd = SubstrCommand()
         with pytest.raises(TypeError):
@@ -1145,7 +1193,7 @@ class TestTypeCommand:
         assert result == 'string'
 
     def test_type_list(self, ctx):
-        ctx.db.set('key', [1, 2, 3])
+        ctx.db.set('key', deque([1, 2, 3]))
         ctx.cmdtokens = ['type', 'key']
         cmd = TypeCommand()
         result = cmd.execute(ctx)
@@ -0,0 +1,51 @@
+import pytest
+
+from litedis.core.command.basiccmds import GetCommand, SetCommand
+from litedis.core.command.factory import CommandFactory, _parsers
+from litedis.typing import ReadWriteType
+
+
+def test_get_class_case_insensitive():
+    assert CommandFactory.get_class("get") is GetCommand
+    assert CommandFactory.get_class("GET") is GetCommand
+    assert CommandFactory.get_class("SeT") is SetCommand
+
+
+def test_get_class_unknown():
+    with pytest.raises(ValueError, match="unknown command name: nosuch"):
+        CommandFactory.get_class("nosuch")
+
+
+def test_private_base_classes_are_not_commands():
+    assert all(not name.startswith("_") for name in _parsers)
+    with pytest.raises(ValueError, match="unknown command name"):
+        CommandFactory.get_class("_zrank")
+
+
+def test_command_table_metadata():
+    for name, cls in _parsers.items():
+        assert cls.name == name
+        assert cls.arity != 0
+        if cls.rwtype == ReadWriteType.Write:
+            assert "write" in cls.flags
+        else:
+            assert "readonly" in cls.flags
+
+    assert CommandFactory.get_class("info").flags == ("readonly", "admin")
+    assert "movablekeys" in CommandFactory.get_class("zunion").flags
+    assert "denyoom" in CommandFactory.get_class("set").flags
+    assert "denyoom" not in CommandFactory.get_class("del").flags
+
+
+def test_create_from_tokens_checks_arity():
+    assert isinstance(CommandFactory.create_from_tokens(["GET", "key"]), GetCommand)
+    assert isinstance(CommandFactory.create_from_tokens(["set", "key", "value", "NX"]), SetCommand)
+
+    with pytest.raises(ValueError, match="wrong number of arguments for 'get' command"):
+        CommandFactory.create_from_tokens(["get"])
+    with pytest.raises(ValueError, match="wrong number of arguments for 'get' command"):
+        CommandFactory.create_from_tokens(["get", "key1", "key2"])
+    with pytest.raises(ValueError, match="wrong number of arguments for 'set' command"):
+        CommandFactory.create_from_tokens(["set", "key"])
+    with pytest.raises(ValueError, match="empty command"):
+        CommandFactory.create_from_tokens([])
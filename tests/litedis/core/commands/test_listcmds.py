@@ -1,10 +1,16 @@
+from collections import deque
+
 import pytest
 
 from litedis.core.command.base import CommandContext
 from litedis.core.command.listcmds import (
+    BLMoveCommand,
+    BLPopCommand,
+    BRPopCommand,
     LIndexCommand,
     LInsertCommand,
     LLenCommand,
+    LMoveCommand,
     LPopCommand,
     LPushCommand,
     LPushXCommand,
@@ -37,19 +43,19 @@ class TestLIndexCommand:
         assert cmd.execute(ctx) is None
 
     def test_lindex_valid_index(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lindex', 'mylist', '1']
         cmd = LIndexCommand()
         assert cmd.execute(ctx) == 'b'
 
     def test_lindex_negative_index(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lindex', 'mylist', '-1']
         cmd = LIndexCommand()
         assert cmd.execute(ctx) == 'c'
 
     def test_lindex_out_of_bounds(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lindex', 'mylist', '5']
         cmd = LIndexCommand()
         assert cmd.execute(ctx) is None
@@ -64,21 +70,21 @@ class TestLIndexCommand:
 
 class TestLInsertCommand:
     def test_linsert_before(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['linsert', 'mylist', 'BEFORE', 'b', 'x']
         cmd = LInsertCommand()
         assert cmd.execute(ctx) == 4
-        assert ctx.db.get('mylist') == ['a', 'x', 'b', 'c']
+        assert ctx.db.get('mylist') == deque(['a', 'x', 'b', 'c'])
 
     def test_linsert_after(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['linsert', 'mylist', 'AFTER', 'b', 'x']
         cmd = LInsertCommand()
         assert cmd.execute(ctx) == 4
-        assert ctx.db.get('mylist') == ['a', 'b', 'x', 'c']
+        assert ctx.db.get('mylist') == deque(['a', 'b', 'x', 'c'])
 
     def test_linsert_pivot_not_found(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['linsert', 'mylist', 'BEFORE', 'z', 'x']
         cmd = LInsertCommand()
         assert cmd.execute(ctx) == -1
@@ -91,13 +97,13 @@ class TestLInsertCommand:
 
 class TestLLenCommand:
     def test_llen_empty_list(self, ctx):
-        ctx.db.set('mylist', [])
+        ctx.db.set('mylist', deque([]))
         ctx.cmdtokens = ['llen', 'mylist']
         cmd = LLenCommand()
         assert cmd.execute(ctx) == 0
 
     def test_llen_populated_list(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['llen', 'mylist']
         cmd = LLenCommand()
         assert cmd.execute(ctx) == 3
@@ -117,21 +123,29 @@ class TestLLenCommand:
 
 class TestLPopCommand:
     def test_lpop_single_element(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lpop', 'mylist']
         cmd = LPopCommand()
         assert cmd.execute(ctx) == 'a'
-        assert ctx.db.get('mylist') == ['b', 'c']
+        assert ctx.db.get('mylist') == deque(['b', 'c'])
 
     def test_lpop_multiple_elements(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c', 'd'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c', 'd']))
         ctx.cmdtokens = ['lpop', 'mylist', '2']
         cmd = LPopCommand()
         assert cmd.execute(ctx) == ['a', 'b']
-        assert ctx.db.get('mylist') == ['c', 'd']
+        assert ctx.db.get('mylist') == deque(['c', 'd'])
+
+    def test_lpop_drains_large_list(self, ctx):
+        ctx.db.set('mylist', deque(str(i) for i in range(100000)))
+        cmd = LPopCommand()
+        ctx.cmdtokens = ['lpop', 'mylist']
+        for i in range(100000):
+            assert cmd.execute(ctx) == str(i)
+        assert not ctx.db.exists('mylist')
 
     def test_lpop_empty_list(self, ctx):
-        ctx.db.set('mylist', [])
+        ctx.db.set('mylist', deque([]))
         ctx.cmdtokens = ['lpop', 'mylist']
         cmd = LPopCommand()
         assert cmd.execute(ctx) is None
@@ -142,7 +156,7 @@ class TestLPopCommand:
         assert cmd.execute(ctx) is None
 
     def test_lpop_removes_empty_list(self, ctx):
-        ctx.db.set('mylist', ['a'])
+        ctx.db.set('mylist', deque(['a']))
         ctx.cmdtokens = ['lpop', 'mylist']
         cmd = LPopCommand()
         assert cmd.execute(ctx) == 'a'
@@ -154,20 +168,20 @@ class TestLPushCommand:
         ctx.cmdtokens = ['lpush', 'mylist', 'a', 'b']
         cmd = LPushCommand()
         assert cmd.execute(ctx) == 2
-        assert ctx.db.get('mylist') == ['b', 'a']
+        assert ctx.db.get('mylist') == deque(['b', 'a'])
 
     def test_lpush_to_existing_list(self, ctx):
-        ctx.db.set('mylist', ['c'])
+        ctx.db.set('mylist', deque(['c']))
         ctx.cmdtokens = ['lpush', 'mylist', 'a', 'b']
         cmd = LPushCommand()
         assert cmd.execute(ctx) == 3
-        assert ctx.db.get('mylist') == ['b', 'a', 'c']
+        assert ctx.db.get('mylist') == deque(['b', 'a', 'c'])
 
     def test_lpush_single_element(self, ctx):
         ctx.cmdtokens = ['lpush', 'mylist', 'a']
         cmd = LPushCommand()
         assert cmd.execute(ctx) == 1
-        assert ctx.db.get('mylist') == ['a']
+        assert ctx.db.get('mylist') == deque(['a'])
 
     def test_lpush_invalid_type(self, ctx):
         ctx.db.set('mystr', 'not_a_list')
@@ -179,11 +193,11 @@ class TestLPushCommand:
 
 class TestLPushXCommand:
     def test_lpushx_existing_list(self, ctx):
-        ctx.db.set('mylist', ['c'])
+        ctx.db.set('mylist', deque(['c']))
         ctx.cmdtokens = ['lpushx', 'mylist', 'a', 'b']
         cmd = LPushXCommand()
         assert cmd.execute(ctx) == 3
-        assert ctx.db.get('mylist') == ['b', 'a', 'c']
+        assert ctx.db.get('mylist') == deque(['b', 'a', 'c'])
 
     def test_lpushx_nonexistent_key(self, ctx):
         ctx.cmdtokens = ['lpushx', 'mylist', 'a', 'b']
@@ -201,31 +215,37 @@ class TestLPushXCommand:
 
 class TestLRangeCommand:
     def test_lrange_full_list(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c', 'd'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c', 'd']))
         ctx.cmdtokens = ['lrange', 'mylist', '0', '-1']
         cmd = LRangeCommand()
         assert cmd.execute(ctx) == ['a', 'b', 'c', 'd']
 
     def test_lrange_partial_list(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c', 'd'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c', 'd']))
         ctx.cmdtokens = ['lrange', 'mylist', '1', '2']
         cmd = LRangeCommand()
         assert cmd.execute(ctx) == ['b', 'c']
 
     def test_lrange_negative_indices(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c', 'd'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c', 'd']))
         ctx.cmdtokens = ['lrange', 'mylist', '-3', '-2']
         cmd = LRangeCommand()
         assert cmd.execute(ctx) == ['b', 'c']
 
+    def test_lrange_near_tail(self, ctx):
+        ctx.db.set('mylist', deque(str(i) for i in range(100)))
+        ctx.cmdtokens = ['lrange', 'mylist', '-3', '98']
+        cmd = LRangeCommand()
+        assert cmd.execute(ctx) == ['97', '98']
+
     def test_lrange_out_of_bounds(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lrange', 'mylist', '5', '10']
         cmd = LRangeCommand()
         assert cmd.execute(ctx) == []
 
     def test_lrange_empty_list(self, ctx):
-        ctx.db.set('mylist', [])
+        ctx.db.set('mylist', deque([]))
         ctx.cmdtokens = ['lrange', 'mylist', '0', '-1']
         cmd = LRangeCommand()
         assert cmd.execute(ctx) == []
@@ -238,35 +258,35 @@ class TestLRangeCommand:
 
 class TestLRemCommand:
     def test_lrem_positive_count(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'a', 'c', 'a', 'd'])
+        ctx.db.set('mylist', deque(['a', 'b', 'a', 'c', 'a', 'd']))
         ctx.cmdtokens = ['lrem', 'mylist', '2', 'a']
         cmd = LRemCommand()
         assert cmd.execute(ctx) == 2
-        assert ctx.db.get('mylist') == ['b', 'c', 'a', 'd']
+        assert ctx.db.get('mylist') == deque(['b', 'c', 'a', 'd'])
 
     def test_lrem_negative_count(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'a', 'c', 'a', 'd'])
+        ctx.db.set('mylist', deque(['a', 'b', 'a', 'c', 'a', 'd']))
         ctx.cmdtokens = ['lrem', 'mylist', '-2', 'a']
         cmd = LRemCommand()
         assert cmd.execute(ctx) == 2
-        assert ctx.db.get('mylist') == ['a', 'b', 'c', 'd']
+        assert ctx.db.get('mylist') == deque(['a', 'b', 'c', 'd'])
 
     def test_lrem_zero_count(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'a', 'c', 'a', 'd'])
+        ctx.db.set('mylist', deque(['a', 'b', 'a', 'c', 'a', 'd']))
         ctx.cmdtokens = ['lrem', 'mylist', '0', 'a']
         cmd = LRemCommand()
         assert cmd.execute(ctx) == 3
-        assert ctx.db.get('mylist') == ['b', 'c', 'd']
+        assert ctx.db.get('mylist') == deque(['b', 'c', 'd'])
 
     def test_lrem_element_not_found(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lrem', 'mylist', '1', 'x']
         cmd = LRemCommand()
         assert cmd.execute(ctx) == 0
-        assert ctx.db.get('mylist') == ['a', 'b', 'c']
+        assert ctx.db.get('mylist') == deque(['a', 'b', 'c'])
 
     def test_lrem_removes_empty_list(self, ctx):
-        ctx.db.set('mylist', ['a', 'a', 'a'])
+        ctx.db.set('mylist', deque(['a', 'a', 'a']))
         ctx.cmdtokens = ['lrem', 'mylist', '0', 'a']
         cmd = LRemCommand()
         assert cmd.execute(ctx) == 3
@@ -275,21 +295,21 @@ class TestLRemCommand:
 
 class TestLSetCommand:
     def test_lset_valid_index(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lset', 'mylist', '1', 'x']
         cmd = LSetCommand()
         assert cmd.execute(ctx) == "OK"
-        assert ctx.db.get('mylist') == ['a', 'x', 'c']
+        assert ctx.db.get('mylist') == deque(['a', 'x', 'c'])
 
     def test_lset_negative_index(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lset', 'mylist', '-1', 'x']
         cmd = LSetCommand()
         assert cmd.execute(ctx) == "OK"
-        assert ctx.db.get('mylist') == ['a', 'b', 'x']
+        assert ctx.db.get('mylist') == deque(['a', 'b', 'x'])
 
     def test_lset_out_of_range(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['lset', 'mylist', '5', 'x']
         cmd = LSetCommand()
         with pytest.raises(ValueError, match="index out of range"):
@@ -311,28 +331,28 @@ class TestLSetCommand:
 
 class TestLTrimCommand:
     def test_ltrim_keep_middle(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c', 'd', 'e'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c', 'd', 'e']))
         ctx.cmdtokens = ['ltrim', 'mylist', '1', '3']
         cmd = LTrimCommand()
         assert cmd.execute(ctx) == "OK"
-        assert ctx.db.get('mylist') == ['b', 'c', 'd']
+        assert ctx.db.get('mylist') == deque(['b', 'c', 'd'])
 
     def test_ltrim_negative_indices(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c', 'd', 'e'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c', 'd', 'e']))
         ctx.cmdtokens = ['ltrim', 'mylist', '0', '-2']
         cmd = LTrimCommand()
         assert cmd.execute(ctx) == "OK"
-        assert ctx.db.get('mylist') == ['a', 'b', 'c', 'd']
+        assert ctx.db.get('mylist') == deque(['a', 'b', 'c', 'd'])
 
     def test_ltrim_out_of_range(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['ltrim', 'mylist', '5', '10']
         cmd = LTrimCommand()
         assert cmd.execute(ctx) == "OK"
         assert not ctx.db.exists('mylist')
 
     def test_ltrim_empty_result(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['ltrim', 'mylist', '2', '1']
         cmd = LTrimCommand()
         assert cmd.execute(ctx) == "OK"
@@ -347,21 +367,21 @@ class TestLTrimCommand:
 
 class TestRPopCommand:
     def test_rpop_single_element(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c']))
         ctx.cmdtokens = ['rpop', 'mylist']
         cmd = RPopCommand()
         assert cmd.execute(ctx) == 'c'
-        assert ctx.db.get('mylist') == ['a', 'b']
+        assert ctx.db.get('mylist') == deque(['a', 'b'])
 
     def test_rpop_multiple_elements(self, ctx):
-        ctx.db.set('mylist', ['a', 'b', 'c', 'd'])
+        ctx.db.set('mylist', deque(['a', 'b', 'c', 'd']))
         ctx.cmdtokens = ['rpop', 'mylist', '2']
         cmd = RPopCommand()
         assert cmd.execute(ctx) == ['d', 'c']
-        assert ctx.db.get('mylist') == ['a', 'b']
+        assert ctx.db.get('mylist') == deque(['a', 'b'])
 
     def test_rpop_empty_list(self, ctx):
-        ctx.db.set('mylist', [])
+        ctx.db.set('mylist', deque([]))
         ctx.cmdtokens = ['rpop', 'mylist']
         cmd = RPopCommand()
         assert cmd.execute(ctx) is None
@@ -372,7 +392,7 @@ class TestRPopCommand:
         assert cmd.execute(ctx) is None
 
     def test_rpop_removes_empty_list(self, ctx):
-        ctx.db.set('mylist', ['a'])
+        ctx.db.set('mylist', deque(['a']))
         ctx.cmdtokens = ['rpop', 'mylist']
         cmd = RPopCommand()
         assert cmd.execute(ctx) == 'a'
@@ -391,20 +411,20 @@ class TestRPushCommand:
         ctx.cmdtokens = ['rpush', 'mylist', 'a', 'b']
         cmd = RPushCommand()
         assert cmd.execute(ctx) == 2
-        assert ctx.db.get('mylist') == ['a', 'b']
+        assert ctx.db.get('mylist') == deque(['a', 'b'])
 
     def test_rpush_to_existing_list(self, ctx):
-        ctx.db.set('mylist', ['a'])
+        ctx.db.set('mylist', deque(['a']))
         ctx.cmdtokens = ['rpush', 'mylist', 'b', 'c']
         cmd = RPushCommand()
         assert cmd.execute(ctx) == 3
-        assert ctx.db.get('mylist') == ['a', 'b', 'c']
+        assert ctx.db.get('mylist') == deque(['a', 'b', 'c'])
 
     def test_rpush_single_element(self, ctx):
         ctx.cmdtokens = ['rpush', 'mylist', 'a']
         cmd = RPushCommand()
         assert cmd.execute(ctx) == 1
-        assert ctx.db.get('mylist') == ['a']
+        assert ctx.db.get('mylist') == deque(['a'])
 
     def test_rpush_invalid_type(self, ctx):
         ctx.db.set('mystr', 'not_a_list')
@@ -416,11 +436,11 @@ class TestRPushCommand:
 
 class TestRPushXCommand:
     def test_rpushx_existing_list(self, ctx):
-        ctx.db.set('mylist', ['a'])
+        ctx.db.set('mylist', deque(['a']))
         ctx.cmdtokens = ['rpushx', 'mylist', 'b', 'c']
         cmd = RPushXCommand()
         assert cmd.execute(ctx) == 3
-        assert ctx.db.get('mylist') == ['a', 'b', 'c']
+        assert ctx.db.get('mylist') == deque(['a', 'b', 'c'])
 
     def test_rpushx_nonexistent_key(self, ctx):
         ctx.cmdtokens = ['rpushx', 'mylist', 'a', 'b']
@@ -438,38 +458,38 @@ class TestRPushXCommand:
 
 class TestSortCommand:
     def test_sort_numeric_asc(self, ctx):
-        ctx.db.set('mylist', ['3', '1', '2'])
+        ctx.db.set('mylist', deque(['3', '1', '2']))
         ctx.cmdtokens = ['sort', 'mylist']
         cmd = SortCommand()
         assert cmd.execute(ctx) == ['1', '2', '3']
 
     def test_sort_numeric_desc(self, ctx):
-        ctx.db.set('mylist', ['3', '1', '2'])
+        ctx.db.set('mylist', deque(['3', '1', '2']))
         ctx.cmdtokens = ['sort', 'mylist', 'DESC']
         cmd = SortCommand()
         assert cmd.execute(ctx) == ['3', '2', '1']
 
     def test_sort_alpha_asc(self, ctx):
-        ctx.db.set('mylist', ['banana', 'apple', 'cherry'])
+        ctx.db.set('mylist', deque(['banana', 'apple', 'cherry']))
         ctx.cmdtokens = ['sort', 'mylist', 'ALPHA']
         cmd = SortCommand()
         assert cmd.execute(ctx) == ['apple', 'banana', 'cherry']
 
     def test_sort_alpha_desc(self, ctx):
-        ctx.db.set('mylist', ['banana', 'apple', 'cherry'])
+        ctx.db.set('mylist', deque(['banana', 'apple', 'cherry']))
         ctx.cmdtokens = ['sort', 'mylist', 'ALPHA', 'DESC']
         cmd = SortCommand()
         assert cmd.execute(ctx) == ['cherry', 'banana', 'apple']
 
     def test_sort_with_store(self, ctx):
-        ctx.db.set('mylist', ['3', '1', '2'])
+        ctx.db.set('mylist', deque(['3', '1', '2']))
         ctx.cmdtokens = ['sort', 'mylist', 'STORE', 'newlist']
         cmd = SortCommand()
         assert cmd.execute(ctx) == 3
-        assert ctx.db.get('newlist') == ['1', '2', '3']
+        assert ctx.db.get('newlist') == deque(['1', '2', '3'])
 
     def test_sort_empty_list(self, ctx):
-        ctx.db.set('mylist', [])
+        ctx.db.set('mylist', deque([]))
         ctx.cmdtokens = ['sort', 'mylist']
         cmd = SortCommand()
         assert cmd.execute(ctx) == []
@@ -487,8 +507,75 @@ class TestSortCommand:
             cmd.execute(ctx)
 
     def test_sort_non_numeric_values(self, ctx):
-        ctx.db.set('mylist', ['abc', 'def', '123'])
+        ctx.db.set('mylist', deque(['abc', 'def', '123']))
         ctx.cmdtokens = ['sort', 'mylist']
         cmd = SortCommand()
         with pytest.raises(ValueError, match="one or more elements can't be converted to number"):
             cmd.execute(ctx)
+
+
+class TestBLPopCommand:
+    def test_blpop_first_non_empty_key(self, ctx):
+        ctx.db.set('list2', deque(['a', 'b']))
+        ctx.cmdtokens = ['blpop', 'list1', 'list2', '0']
+        cmd = BLPopCommand()
+        assert cmd.execute(ctx) == ['list2', 'a']
+        assert cmd.to_tokens() == ['lpop', 'list2']
+
+    def test_brpop(self, ctx):
+        ctx.db.set('list1', deque(['a']))
+        ctx.cmdtokens = ['brpop', 'list1', '0.5']
+        cmd = BRPopCommand()
+        assert cmd.execute(ctx) == ['list1', 'a']
+        assert cmd.to_tokens() == ['rpop', 'list1']
+        assert not ctx.db.exists('list1')
+
+    def test_blpop_no_data(self, ctx):
+        ctx.cmdtokens = ['blpop', 'list1', '0']
+        cmd = BLPopCommand()
+        assert cmd.execute(ctx) is None
+        with pytest.raises(ValueError):
+            cmd.to_tokens()
+
+    def test_blpop_wrong_type(self, ctx):
+        ctx.db.set('list1', 'value')
+        ctx.cmdtokens = ['blpop', 'list1', '0']
+        with pytest.raises(TypeError):
+            BLPopCommand().execute(ctx)
+
+
+class TestLMoveCommand:
+    def test_lmove(self, ctx):
+        ctx.db.set('src', deque(['a', 'b']))
+        ctx.db.set('dst', deque(['x']))
+        ctx.cmdtokens = ['lmove', 'src', 'dst', 'LEFT', 'left']
+        assert LMoveCommand().execute(ctx) == 'a'
+        assert ctx.db.get('src') == deque(['b'])
+        assert ctx.db.get('dst') == deque(['a', 'x'])
+
+    def test_lmove_same_key_rotates(self, ctx):
+        ctx.db.set('src', deque(['a', 'b', 'c']))
+        ctx.cmdtokens = ['lmove', 'src', 'src', 'LEFT', 'RIGHT']
+        assert LMoveCommand().execute(ctx) == 'a'
+        assert ctx.db.get('src') == deque(['b', 'c', 'a'])
+
+    def test_lmove_wrong_destination_type(self, ctx):
+        ctx.db.set('src', deque(['a']))
+        ctx.db.set('dst', 'value')
+        ctx.cmdtokens = ['lmove', 'src', 'dst', 'LEFT', 'RIGHT']
+        with pytest.raises(TypeError):
+            LMoveCommand().execute(ctx)
+        assert ctx.db.get('src') == deque(['a'])
+
+    def test_lmove_invalid_direction(self, ctx):
+        ctx.cmdtokens = ['lmove', 'src', 'dst', 'UP', 'RIGHT']
+        with pytest.raises(ValueError, match='direction must be LEFT or RIGHT'):
+            LMoveCommand().execute(ctx)
+
+    def test_blmove(self, ctx):
+        ctx.db.set('src', deque(['a', 'b']))
+        ctx.cmdtokens = ['blmove', 'src', 'dst', 'RIGHT', 'LEFT', '0']
+        cmd = BLMoveCommand()
+        assert cmd.execute(ctx) == 'b'
+        assert cmd.to_tokens() == ['lmove', 'src', 'dst', 'RIGHT', 'LEFT']
+        assert ctx.db.get('dst') == deque(['b'])
@@ -0,0 +1,57 @@
+import pytest
+
+from litedis.core.command.pattern import compile_pattern, match_pattern, pattern_prefix
+
+
+@pytest.mark.parametrize("pattern, string, expected", [
+    ("*", "", True),
+    ("*", "any\nthing", True),
+    ("key1", "key1", True),
+    ("key1", "key10", False),
+    ("user:*", "user:1", True),
+    ("user:*", "user", False),
+    ("user:**", "user:1:name", True),
+    ("*:name", "user:1:name", True),
+    ("*:name", "user:1:age", False),
+    ("*:1:*", "user:1:name", True),
+    ("*:1:*", "user:2:name", False),
+    ("h?llo", "hello", True),
+    ("h?llo", "heello", False),
+    ("h*llo", "heeello", True),
+    ("h[ae]llo", "hallo", True),
+    ("h[ae]llo", "hillo", False),
+    ("h[^e]llo", "hallo", True),
+    ("h[^e]llo", "hello", False),
+    ("h[a-b]llo", "hbllo", True),
+    ("h[b-a]llo", "hallo", True),
+    ("h[a-b]llo", "hcllo", False),
+    ("h[]llo", "hllo", False),
+    ("key\\*1", "key*1", True),
+    ("key\\*1", "key21", False),
+    ("key\\?", "key?", True),
+    ("[\\]]", "]", True),
+    ("key[", "key[", True),
+    ("a.b", "axb", False),
+    ("user:*:[0-9]", "user:x:5", True),
+    ("user:*:[0-9]", "usr:x:5", False),
+])
+def test_match_pattern(pattern, string, expected):
+    assert match_pattern(pattern, string) is expected
+
+
+def test_compile_pattern_is_cached():
+    compile_pattern.cache_clear()
+    matches = compile_pattern("user:*")
+    assert compile_pattern("user:*") is matches
+    assert compile_pattern.cache_info().hits == 1
+
+
+@pytest.mark.parametrize("pattern, prefix", [
+    ("user:*", "user:"),
+    ("user:1", "user:1"),
+    ("user\\*:*", "user*:"),
+    ("*user", ""),
+    ("us?r", "us"),
+])
+def test_pattern_prefix(pattern, prefix):
+    assert pattern_prefix(pattern) == prefix
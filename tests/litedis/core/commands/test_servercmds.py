@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from litedis.core.command.base import CommandContext
+from litedis.core.command.servercmds import BgRewriteAofCommand, InfoCommand, MemoryCommand
+from litedis.core.persistence.ldb import LitedisDB
+
+
+@pytest.fixture
+def dbmanager():
+    manager = MagicMock()
+    manager.get_aof_rewrite_stats.return_value = {"aof_rewrites": 1}
+    manager.get_memory_stats.return_value = {"used_memory": 100}
+    return manager
+
+
+def test_bgrewriteaof(dbmanager):
+    cmd = BgRewriteAofCommand()
+    ctx = CommandContext(LitedisDB("test"), ["bgrewriteaof"], dbmanager)
+    assert cmd.execute(ctx) == "Background append only file rewriting started"
+    dbmanager.rewrite_aof_in_background.assert_called_once()
+
+
+def test_bgrewriteaof_errors(dbmanager):
+    with pytest.raises(ValueError, match="takes no arguments"):
+        BgRewriteAofCommand().execute(CommandContext(LitedisDB("test"), ["bgrewriteaof", "x"], dbmanager))
+
+    with pytest.raises(ValueError, match="requires a db manager"):
+        BgRewriteAofCommand().execute(CommandContext(LitedisDB("test"), ["bgrewriteaof"]))
+
+
+def test_info(dbmanager):
+    db = LitedisDB("test")
+    assert InfoCommand().execute(CommandContext(db, ["info"], dbmanager)) == {"used_memory": 100, "aof_rewrites": 1}
+    assert InfoCommand().execute(CommandContext(db, ["info", "memory"], dbmanager)) == {"used_memory": 100}
+    assert InfoCommand().execute(CommandContext(db, ["info", "PERSISTENCE"], dbmanager)) == {"aof_rewrites": 1}
+    assert InfoCommand().execute(CommandContext(db, ["info", "unknown"], dbmanager)) == {}
+
+    with pytest.raises(ValueError, match="at most one section"):
+        InfoCommand().execute(CommandContext(db, ["info", "a", "b"], dbmanager))
+
+
+def test_memory_usage():
+    db = LitedisDB("test")
+    db.set("hash", {f"field{i}": "value" for i in range(100)})
+    ctx = CommandContext(db, ["memory", "usage", "hash"])
+    usage = MemoryCommand().execute(ctx)
+    assert usage > 100 * 2 * 50
+
+    ctx.cmdtokens = ["MEMORY", "USAGE", "hash", "SAMPLES", "0"]
+    assert abs(MemoryCommand().execute(ctx) - usage) < usage * 0.1
+
+    db.set_expiration("hash", 2 ** 60)
+    ctx.cmdtokens = ["memory", "usage", "hash"]
+    assert MemoryCommand().execute(ctx) > usage
+
+    ctx.cmdtokens = ["memory", "usage", "missing"]
+    assert MemoryCommand().execute(ctx) is None
+
+
+def test_memory_errors():
+    ctx = CommandContext(LitedisDB("test"), ["memory", "stats", "key"])
+    with pytest.raises(ValueError, match="unknown memory subcommand"):
+        MemoryCommand().execute(ctx)
+    ctx.cmdtokens = ["memory", "usage", "key", "SAMPLES", "-1"]
+    with pytest.raises(ValueError, match="samples must be non-negative"):
+        MemoryCommand().execute(ctx)
@@ -14,6 +14,7 @@ from litedis.core.command.setcmds import (
     SPopCommand,
     SRandMemberCommand,
     SRemCommand,
+    SScanCommand,
     SUnionCommand,
 )
 from litedis.core.persistence.ldb import LitedisDB
@@ -543,6 +544,53 @@ class TestSRemCommand:
             SRemCommand().execute(ctx)
 
 
+class TestSScanCommand:
+    def test_sscan_all_members(self, ctx):
+        members = {f'member{i}' for i in range(15)}
+        ctx.db.set('set1', set(members))
+        result = []
+        cursor = 0
+        while True:
+            ctx.cmdtokens = ['sscan', 'set1', str(cursor), 'COUNT', '4']
+            cursor, batch = SScanCommand().execute(ctx)
+            result.extend(batch)
+            if cursor == 0:
+                break
+        assert sorted(result) == sorted(members)
+
+    def test_sscan_match(self, ctx):
+        ctx.db.set('set1', {'a1', 'a2', 'b1'})
+        ctx.cmdtokens = ['sscan', 'set1', '0', 'MATCH', 'a*']
+        cursor, result = SScanCommand().execute(ctx)
+        assert cursor == 0
+        assert sorted(result) == ['a1', 'a2']
+
+    def test_sscan_removed_members_skipped(self, ctx):
+        ctx.db.set('set1', {'a', 'b', 'c', 'd'})
+        ctx.cmdtokens = ['sscan', 'set1', '0', 'COUNT', '2']
+        cursor, first = SScanCommand().execute(ctx)
+        value = ctx.db.get_set('set1', for_write=True)
+        rest = sorted(value - set(first))
+        value.discard(rest[0])
+        value.add('e')
+        seen = []
+        while cursor:
+            ctx.cmdtokens = ['sscan', 'set1', str(cursor), 'COUNT', '2']
+            cursor, batch = SScanCommand().execute(ctx)
+            seen.extend(batch)
+        assert rest[1] in seen
+        assert rest[0] not in seen
+
+    def test_sscan_nonexistent_key(self, ctx):
+        ctx.cmdtokens = ['sscan', 'nosuchkey', '0']
+        assert SScanCommand().execute(ctx) == [0, []]
+
+    def test_sscan_invalid_count(self, ctx):
+        ctx.cmdtokens = ['sscan', 'set1', '0', 'COUNT', '0']
+        with pytest.raises(ValueError, match='count must be a positive integer'):
+            SScanCommand().execute(ctx)
+
+
 class TestSUnionCommand:
     def test_sunion_two_sets(self, ctx):
         ctx.db.set('set1', {'a', 'b', 'c'})
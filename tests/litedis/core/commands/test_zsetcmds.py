@@ -3,6 +3,8 @@ import pytest
 from litedis.core.command.base import CommandContext
 from litedis.core.command.sortedset import SortedSet
 from litedis.core.command.zsetcmds import (
+    BZPopMaxCommand,
+    BZPopMinCommand,
     ZAddCommand,
     ZCardCommand,
     ZCountCommand,
@@ -624,6 +626,18 @@ class TestZRangeCommand:
         result = cmd.execute(ctx)
         assert result == ['member3', 'member2', 'member1']
 
+    def test_zrange_orders_by_score(self, ctx):
+        # Member order differs from score order, ties are ordered by member
+        ctx.cmdtokens = ['zadd', 'myset', '3.0', 'a', '1.0', 'c', '2.0', 'b', '1.0', 'd']
+        zadd = ZAddCommand()
+        zadd.execute(ctx)
+
+        ctx.cmdtokens = ['zrange', 'myset', '0', '-1']
+        assert ZRangeCommand().execute(ctx) == ['c', 'd', 'b', 'a']
+
+        ctx.cmdtokens = ['zrange', 'myset', '1', '-2', 'REV']
+        assert ZRangeCommand().execute(ctx) == ['b', 'd']
+
     def test_zrange_wrong_type(self, ctx):
         ctx.db.set('myset', "string")  # Wrong type
         ctx.cmdtokens = ['zrange', 'myset', '0', '-1']
@@ -672,6 +686,17 @@ class TestZRangeByScoreCommand:
         result = cmd.execute(ctx)
         assert result == ['member2']
 
+    def test_zrangebyscore_with_limit_beyond_range(self, ctx):
+        ctx.cmdtokens = ['zadd', 'myset', '3.0', 'a', '1.0', 'b', '2.0', 'c', '4.0', 'd']
+        zadd = ZAddCommand()
+        zadd.execute(ctx)
+
+        ctx.cmdtokens = ['zrangebyscore', 'myset', '2', '3', 'LIMIT', '1', '5']
+        assert ZRangeByScoreCommand().execute(ctx) == ['a']
+
+        ctx.cmdtokens = ['zrangebyscore', 'myset', '0', '5', 'LIMIT', '0', '0']
+        assert ZRangeByScoreCommand().execute(ctx) == []
+
     def test_zrangebyscore_wrong_type(self, ctx):
         ctx.db.set('myset', "string")  # Wrong type
         ctx.cmdtokens = ['zrangebyscore', 'myset', '0', '1']
@@ -769,6 +794,17 @@ class TestZRankCommand:
         result = cmd.execute(ctx)
         assert result == 1  # member2 is at index 1 (scores ordered ascending)
 
+    def test_zrank_orders_by_score(self, ctx):
+        ctx.cmdtokens = ['zadd', 'myset', '3.0', 'a', '1.0', 'b', '2.0', 'c']
+        zadd_cmd = ZAddCommand()
+        zadd_cmd.execute(ctx)
+
+        ctx.cmdtokens = ['zrank', 'myset', 'a']
+        assert ZRankCommand().execute(ctx) == 2
+
+        ctx.cmdtokens = ['zrevrank', 'myset', 'a']
+        assert ZRevRankCommand().execute(ctx) == 0
+
     def test_zrank_wrong_type(self, ctx):
         ctx.db.set('myset', "string")  # Wrong type
         ctx.cmdtokens = ['zrank', 'myset', 'member1']
@@ -1214,3 +1250,32 @@ class TestZMScoreCommand:
         cmd = ZMScoreCommand()
         result = cmd.execute(ctx)
         assert result == [None, None]
+
+
+class TestBZPopCommand:
+    def test_bzpopmin_first_non_empty_key(self, ctx):
+        ctx.db.set('zset2', SortedSet({'a': 1, 'b': 2}))
+        ctx.cmdtokens = ['bzpopmin', 'zset1', 'zset2', '0']
+        cmd = BZPopMinCommand()
+        assert cmd.execute(ctx) == ['zset2', 'a', 1]
+        assert cmd.to_tokens() == ['zpopmin', 'zset2']
+
+    def test_bzpopmax_removes_empty_key(self, ctx):
+        ctx.db.set('zset1', SortedSet({'a': 1}))
+        ctx.cmdtokens = ['bzpopmax', 'zset1', '1.5']
+        cmd = BZPopMaxCommand()
+        assert cmd.execute(ctx) == ['zset1', 'a', 1]
+        assert cmd.timeout == 1.5
+        assert not ctx.db.exists('zset1')
+
+    def test_bzpop_no_data(self, ctx):
+        ctx.cmdtokens = ['bzpopmin', 'zset1', '0']
+        assert BZPopMinCommand().execute(ctx) is None
+
+    def test_bzpop_invalid_timeout(self, ctx):
+        ctx.cmdtokens = ['bzpopmin', 'zset1', '-1']
+        with pytest.raises(ValueError, match='timeout is negative'):
+            BZPopMinCommand().execute(ctx)
+        ctx.cmdtokens = ['bzpopmin', 'zset1', 'a']
+        with pytest.raises(ValueError, match='timeout is not a float'):
+            BZPopMinCommand().execute(ctx)
@@ -4,6 +4,7 @@ from pathlib import Path
 import pytest
 
 from litedis.core.persistence import AOF
+from litedis.core.persistence.aof import AOF_SIGNATURE
 from litedis.typing import DBCommandPair
 
 
@@ -36,7 +37,7 @@ class TestAOF:
         # Test file creation and retrieval
         file = aof_file.get_or_create_file()
         assert not file.closed
-        assert file.mode == "a"
+        assert file.mode == "ab"
 
         # Test file is reused
         file2 = aof_file.get_or_create_file()
@@ -50,11 +51,13 @@ class TestAOF:
     def test_log_command(self, aof_file):
         cmd = DBCommandPair("test_db", ["SET", "key", "value"])
         aof_file.log_command(cmd)
+        aof_file.sync()
 
         # Verify file content
-        with open(aof_file._file_path, "r") as f:
+        with open(aof_file._file_path, "rb") as f:
             content = f.read()
-            assert content == f"'test_db',['SET', 'key', 'value']\n"
+            assert content.startswith(AOF_SIGNATURE)
+            assert content.endswith(AOF.encode_command(cmd))
 
     def test_load_commands(self, aof_file):
         commands = [
@@ -74,6 +77,165 @@ class TestAOF:
             assert loaded.dbname == original.dbname
             assert loaded.cmdtokens == original.cmdtokens
 
+    def test_encode_decode_command(self):
+        cmd = DBCommandPair("db", ["set", "key", "値\n'quoted'", "px", 100])
+        encoded = AOF.encode_command(cmd)
+        decoded = AOF.decode_command(encoded[4:])
+        assert decoded == DBCommandPair("db", ["set", "key", "値\n'quoted'", "px", "100"])
+
+    def test_load_commands_truncated_tail(self, aof_file):
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key1", "value1"]))
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key2", "value2"]))
+        aof_file.close_file()
+
+        size = os.path.getsize(aof_file._file_path)
+        os.truncate(aof_file._file_path, size - 3)
+
+        loaded_commands = list(aof_file.load_commands())
+        assert loaded_commands == [DBCommandPair("db1", ["SET", "key1", "value1"])]
+
+        # the partial frame is dropped so new records can be appended
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key3", "value3"]))
+        assert [cmd.cmdtokens[1] for cmd in aof_file.load_commands()] == ["key1", "key3"]
+
+    def test_load_legacy_commands(self, aof_file):
+        with open(aof_file._file_path, "w") as f:
+            f.write("'db1',['SET', 'key1', 'value1']\n")
+            f.write("'db2',['SET', 'key2', 'value2']\n")
+
+        loaded_commands = list(aof_file.load_commands())
+        assert loaded_commands == [
+            DBCommandPair("db1", ["SET", "key1", "value1"]),
+            DBCommandPair("db2", ["SET", "key2", "value2"]),
+        ]
+
+    def test_migrate_legacy_file_on_append(self, aof_file):
+        with open(aof_file._file_path, "w") as f:
+            f.write("'db1',['SET', 'key1', 'value1']\n")
+
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key2", "value2"]))
+        aof_file.sync()
+
+        with open(aof_file._file_path, "rb") as f:
+            assert f.read().startswith(AOF_SIGNATURE)
+        assert list(aof_file.load_commands()) == [
+            DBCommandPair("db1", ["SET", "key1", "value1"]),
+            DBCommandPair("db1", ["SET", "key2", "value2"]),
+        ]
+
+    def test_invalid_appendfsync(self, temp_dir):
+        with pytest.raises(ValueError, match="appendfsync must be one of"):
+            AOF(temp_dir, "test.aof", appendfsync="sometimes")
+
+    def test_appendfsync_always_writes_before_returning(self, temp_dir, monkeypatch):
+        fsyncs = []
+        original_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: fsyncs.append(fd) or original_fsync(fd))
+
+        aof = AOF(temp_dir, "test.aof", appendfsync="always")
+        aof.log_command(DBCommandPair("db1", ["SET", "key1", "value1"]))
+
+        # flushers of other AOFs may fsync at the same time
+        assert fsyncs.count(aof._file.fileno()) == 1
+        with open(aof._file_path, "rb") as f:
+            assert f.read().endswith(AOF.encode_command(DBCommandPair("db1", ["SET", "key1", "value1"])))
+
+    def test_appendfsync_always_concurrent_writers(self, temp_dir):
+        import threading
+
+        aof = AOF(temp_dir, "test.aof", appendfsync="always")
+
+        def write(n):
+            for i in range(50):
+                aof.log_command(DBCommandPair("db", ["SET", f"key{n}-{i}", "value"]))
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert aof._synced_seq == 400
+        assert len(list(aof.load_commands())) == 400
+
+    @pytest.mark.parametrize("appendfsync", ["everysec", "no"])
+    def test_appendfsync_writes_on_commit(self, temp_dir, appendfsync):
+        aof = AOF(temp_dir, "test.aof", appendfsync=appendfsync)
+        aof.log_command(DBCommandPair("db1", ["SET", "key1", "value1"]))
+
+        # written to the OS right away, only the fsync is left to the background
+        assert aof._synced_seq == 1
+        assert aof._dirty is True
+        assert (aof._flusher is not None) is (appendfsync == "everysec")
+        reader = AOF(temp_dir, "test.aof")
+        assert list(reader.load_commands()) == [DBCommandPair("db1", ["SET", "key1", "value1"])]
+
+    def test_appendfsync_everysec_background_fsync(self, temp_dir, monkeypatch):
+        aof = AOF(temp_dir, "test.aof", appendfsync="everysec")
+        aof.log_command(DBCommandPair("db1", ["SET", "key1", "value1"]))
+
+        import threading
+
+        fsynced = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            # the flushers of other files run in their own threads
+            if threading.current_thread() is threading.main_thread():
+                fsynced.append(fd)
+            real_fsync(fd)
+
+        monkeypatch.setattr(os, "fsync", fsync)
+        aof._fsync()
+        assert len(fsynced) == 1
+        assert aof._dirty is False
+        # nothing written since
+        aof._fsync()
+        assert len(fsynced) == 1
+
+    def test_records_survive_exit_without_close(self, temp_dir):
+        import subprocess
+        import sys
+
+        script = (
+            "from litedis import Litedis\n"
+            f"db = Litedis(data_path={str(temp_dir)!r})\n"
+            "for i in range(100):\n"
+            "    db.set(f'key{i}', 'value')\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True, timeout=60)
+
+        aof = AOF(temp_dir, "litedis.aof")
+        assert len(list(aof.load_commands())) == 100
+
+    def test_log_command_after_rewrite(self, aof_file):
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key1", "value1"]))
+        aof_file.sync()
+
+        aof_file.rewrite_commands([DBCommandPair("db1", ["SET", "key1", "value2"])])
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key2", "value2"]))
+
+        assert list(aof_file.load_commands()) == [
+            DBCommandPair("db1", ["SET", "key1", "value2"]),
+            DBCommandPair("db1", ["SET", "key2", "value2"]),
+        ]
+
+    def test_rewrite_keeps_commands_after_begin(self, aof_file):
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key1", "value1"]))
+        aof_file.begin_rewrite()
+        # appended while the dump is written, before and after a sync
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key2", "value2"]))
+        aof_file.sync()
+        aof_file.log_command(DBCommandPair("db1", ["SET", "key3", "value3"]))
+
+        aof_file.rewrite_commands([DBCommandPair("db1", ["SET", "key1", "value1"])])
+
+        assert list(aof_file.load_commands()) == [
+            DBCommandPair("db1", ["SET", "key1", "value1"]),
+            DBCommandPair("db1", ["SET", "key2", "value2"]),
+            DBCommandPair("db1", ["SET", "key3", "value3"]),
+        ]
+
     def test_load_commands_nonexistent_file(self, aof_file):
         commands = list(aof_file.load_commands())
         assert len(commands) == 0
@@ -1,9 +1,12 @@
 import time
+import tracemalloc
+from collections import deque
 
 import pytest
 
 from litedis.core.command.sortedset import SortedSet
 from litedis.core.persistence import LitedisDB
+from litedis.core.persistence.ldb import _SCAN_CURSORS_MAX, _SCAN_IDLE_SECONDS, _KeyRing, _estimate_value_size
 
 
 @pytest.fixture
@@ -19,13 +22,13 @@ def test_set_and_get(db):
 
 def test_set_type_checking(db):
     db.set("str_key", "string")
-    db.set("list_key", [1, 2, 3])
+    db.set("list_key", deque([1, 2, 3]))
     db.set("dict_key", {"a": 1})
     db.set("set_key", {1, 2, 3})
 
     # Test type mismatch
     with pytest.raises(TypeError):
-        db.set("str_key", [1, 2, 3])
+        db.set("str_key", deque([1, 2, 3]))
 
     # Test unsupported type
     with pytest.raises(TypeError):
@@ -45,7 +48,7 @@ def test_get_str(db):
     db.set("str_key", "string")
     assert db.get_str("str_key") == "string"
 
-    db.set("not str key", [])
+    db.set("not str key", deque([]))
     with pytest.raises(TypeError):
         db.get_str("not str key")
 
@@ -54,14 +57,14 @@ def test_get_dict(db):
     db.set("dict_key", {"a": 1, "b": 2})
     assert db.get_dict("dict_key") == {"a": 1, "b": 2}
 
-    db.set("not dict key", [])
+    db.set("not dict key", deque([]))
     with pytest.raises(TypeError):
         db.get_dict("not dict key")
 
 
 def test_get_list(db):
-    db.set("list_key", [1, 2, 3])
-    assert db.get_list("list_key") == [1, 2, 3]
+    db.set("list_key", deque([1, 2, 3]))
+    assert db.get_list("list_key") == deque([1, 2, 3])
 
     db.set("not list key", {})
     with pytest.raises(TypeError):
@@ -72,7 +75,7 @@ def test_get_set(db):
     db.set("set_key", {1, 2, 3})
     assert db.get_set("set_key") == {1, 2, 3}
 
-    db.set("not set key", [])
+    db.set("not set key", deque([]))
     with pytest.raises(TypeError):
         db.get_set("not set key")
 
@@ -81,7 +84,7 @@ def test_get_zset(db):
     db.set("zset_key", SortedSet({"member1": 1., "member2": 2.}))
     assert type(db.get_zset("zset_key")) == SortedSet
 
-    db.set("not zset key", [])
+    db.set("not zset key", deque([]))
     with pytest.raises(TypeError):
         db.get_zset("not zset key")
 
@@ -120,7 +123,7 @@ def test_delete(db):
 def test_keys(db):
     test_data = {
         "key1": "value1",
-        "key2": ["list", "value"],
+        "key2": deque(["list", "value"]),
         "key3": {"dict": "value"}
     }
 
@@ -168,7 +171,7 @@ def test_delete_expiration(db):
 def test_get_type(db):
     type_tests = {
         "string_key": ("string_value", "string"),
-        "list_key": (["list", "value"], "list"),
+        "list_key": (deque(["list", "value"]), "list"),
         "dict_key": ({"dict": "value"}, "hash"),
         "set_key": ({1, 2, 3}, "set"),
         "zset_key": (SortedSet({"member1": 1., "member2": 2.}), "zset"),
@@ -179,3 +182,300 @@ def test_get_type(db):
         assert db.get_type(key) == expected_type
 
     assert db.get_type("nonexistent") == "none"
+
+
+def test_freeze_copies_on_write(db):
+    db.set("str_key", "value")
+    db.set("list_key", deque(["a"]))
+    db.set("zset_key", SortedSet({"a": 1.}))
+
+    frozen = db.freeze()
+    # reads share the container with the frozen copy
+    assert db.get_list("list_key") is frozen.get("list_key")
+    db.get_list("list_key", for_write=True).append("b")
+    db.get_zset("zset_key", for_write=True).add(("b", 2.))
+    db.set("str_key", "new_value")
+    db.set("new_key", "value")
+
+    assert frozen.get("list_key") == deque(["a"])
+    assert frozen.get("zset_key").range(0, -1) == [("a", 1.)]
+    assert frozen.get("str_key") == "value"
+    assert not frozen.exists("new_key")
+    assert db.get("list_key") == deque(["a", "b"])
+
+    # a container is copied only once
+    assert db.get("list_key", for_write=True) is db.get("list_key", for_write=True)
+
+    db.unfreeze()
+    assert db.get("list_key") is db.get("list_key")
+
+
+def test_delete_expired_keys(db):
+    now = int(time.time() * 1000)
+    for i in range(10):
+        db.set(f"expired{i}", "value")
+        db.set_expiration(f"expired{i}", now - 1000)
+    for i in range(5):
+        db.set(f"alive{i}", "value")
+        db.set_expiration(f"alive{i}", now + 100000)
+    db.set("persistent", "value")
+
+    # a deleted key's slot is filled by a key not checked yet
+    assert db.delete_expired_keys(4) == (4, 2)
+    # continues where the last call stopped
+    assert db.delete_expired_keys(10) == (10, 7)
+    # at most as many keys as have an expiration
+    assert db.delete_expired_keys(10) == (6, 1)
+
+    assert not any(key.startswith("expired") for key in db._data)
+    assert not any(key.startswith("expired") for key in db._expirations)
+    assert len(db._expirations) == 5
+    assert db.exists("persistent")
+
+
+def test_key_ring_walks_every_key_once_per_pass():
+    import random
+
+    rng = random.Random(0)
+    ring = _KeyRing()
+    keys = set()
+    for i in range(200):
+        ring.add(f"key{i}")
+        keys.add(f"key{i}")
+
+    for _ in range(20):
+        # one pass, from the start to the end of the ring
+        walked = []
+        while ring._cursor < len(ring):
+            key = ring.next()
+            walked.append(key)
+            # remove walked and not yet walked keys in the middle of a pass
+            if rng.random() < 0.1:
+                ring.discard(key)
+                keys.discard(key)
+            if rng.random() < 0.1 and keys:
+                victim = rng.choice(sorted(keys))
+                ring.discard(victim)
+                keys.discard(victim)
+        ring._cursor = 0
+
+        assert len(walked) == len(set(walked))
+        assert keys <= set(walked)
+        assert sorted(ring._keys) == sorted(keys)
+        assert all(ring._keys[pos] == key for key, pos in ring._positions.items())
+
+
+def test_delete_expired_keys_picks_up_new_expirations(db):
+    assert db.delete_expired_keys(10) == (0, 0)
+
+    db.set("key1", "value")
+    db.set_expiration("key1", int(time.time() * 1000) - 1000)
+    assert db.delete_expired_keys(10) == (1, 1)
+    assert not db.exists("key1")
+
+
+def _scan_all(db, key, container, count, change=None, prefix=""):
+    cursor, seen = db.scan(key, container, 0, count, prefix)
+    if change is not None:
+        change()
+    while cursor:
+        cursor, batch = db.scan(key, container, cursor, count, prefix)
+        seen.extend(batch)
+    return seen
+
+
+@pytest.mark.parametrize("kind", ["hash", "set", "zset"])
+def test_scan_returns_members_present_for_the_whole_scan(db, kind):
+    members = [f"member{i}" for i in range(10)]
+    if kind == "hash":
+        db.set("key", {member: "x" for member in members})
+    elif kind == "set":
+        db.set("key", set(members))
+    else:
+        db.set("key", SortedSet({member: 1. for member in members}))
+
+    def change():
+        value = db.get("key", for_write=True)
+        removed = next(member for member in reversed(members) if member in value)
+        if kind == "set":
+            value.discard(removed)
+            value.update(f"new{i}" for i in range(100))
+        else:
+            value.pop(removed)
+            for i in range(100):
+                value[f"new{i}"] = 1.
+        members.remove(removed)
+
+    seen = _scan_all(db, "key", db.get("key"), 3, change)
+    assert set(members) <= set(seen)
+    assert not db._scans and not db._versions
+
+
+@pytest.mark.parametrize("key_index", [False, True])
+def test_scan_keyspace(db, key_index):
+    if key_index:
+        db.enable_key_index()
+    for i in range(20):
+        db.set(f"user:{i}", "x")
+        db.set(f"other:{i}", "x")
+
+    def change():
+        db.delete("user:19")
+        db.delete("user:0")
+        for i in range(50):
+            db.set(f"user:new{i}", "x")
+
+    seen = _scan_all(db, None, None, 4, change, prefix="user:")
+    assert all(key.startswith("user:") for key in seen)
+    assert {f"user:{i}" for i in range(1, 19)} <= set(seen)
+
+
+def test_scan_keeps_no_copy(db):
+    db.set("hash", {f"field{i}": "x" for i in range(1000)})
+    cursor, batch = db.scan("hash", db.get("hash"), 0, 10)
+    state = db._scans[cursor]
+    assert state.iterator is not None and not state.copied
+    assert state.last_batch == batch
+
+
+def test_scan_unknown_cursor_starts_over(db):
+    value = {"a": "1", "b": "2", "c": "3"}
+    cursor, batch = db.scan("hash", value, 0, 2)
+    assert batch == ["a", "b"]
+    # a cursor of another key or container, or an unknown one restarts the scan
+    assert db.scan("other", value, cursor, 2)[1] == ["a", "b"]
+    assert db.scan("hash", dict(value), cursor, 10) == (0, ["a", "b", "c"])
+    assert db.scan("hash", value, 12345, 10) == (0, ["a", "b", "c"])
+
+
+def test_scan_table_is_bounded(db):
+    value = {str(i): "x" for i in range(10)}
+    cursors = [db.scan("hash", value, 0, 1)[0] for _ in range(_SCAN_CURSORS_MAX + 1)]
+    assert len(db._scans) == _SCAN_CURSORS_MAX
+    assert db._version_refs["hash"] == _SCAN_CURSORS_MAX
+    # the least recently used scan is dropped and starts over
+    assert db.scan("hash", value, cursors[0], 1)[1] == ["0"]
+    assert db.scan("hash", value, cursors[-1], 1)[1] == ["1"]
+
+
+def test_scan_idle_scans_expire(db, monkeypatch):
+    value = {str(i): "x" for i in range(10)}
+    cursor, _ = db.scan("hash", value, 0, 1)
+    db._scans[cursor].used -= _SCAN_IDLE_SECONDS
+    assert db.scan("hash", value, cursor, 1)[1] == ["0"]
+    assert cursor not in db._scans
+
+
+@pytest.mark.parametrize("key_index", [False, True])
+def test_keys_with_prefix(db, key_index):
+    if key_index:
+        db.enable_key_index()
+    for key in ["tenant:1:a", "tenant:1:b", "tenant:10:a", "tenant:2:a", "other"]:
+        db.set(key, "value")
+    db.delete("tenant:1:b")
+
+    assert sorted(db.keys("tenant:1")) == ["tenant:10:a", "tenant:1:a"]
+    assert sorted(db.keys("tenant:1:")) == ["tenant:1:a"]
+    assert list(db.keys("missing")) == []
+    assert list(db.keys_range("tenant:1", "tenant:2")) == ["tenant:10:a", "tenant:1:a"]
+    assert list(db.keys_range("tenant:10:a", inclusive=(False, True), reverse=True)) == ["tenant:2:a", "tenant:1:a"]
+
+
+def test_key_index_follows_deletes_and_expirations(db):
+    db.set("key1", "value")
+    db.set("key2", "value")
+    db.enable_key_index()
+    db.set("key3", "value")
+    db.set("key3", "value2")
+    assert list(db._key_index) == ["key1", "key2", "key3"]
+
+    db.delete("key1")
+    db.set_expiration("key2", int(time.time() * 1000) - 1000)
+    db.set_expiration("key3", int(time.time() * 1000) - 1000)
+    assert not db.exists("key2")
+    assert db.delete_expired_keys(10) == (1, 1)
+    assert list(db._key_index) == []
+
+
+def test_memory_accounting(db):
+    db.set("key1", "value")
+    db.enable_memory_accounting()
+    base = db.used_memory
+    assert base > 0
+
+    db.set("list1", deque(["a" * 100] * 1000))
+    grown = db.used_memory
+    assert grown - base > 100 * 1000
+
+    db.set("list1", deque(["a" * 100]))
+    assert db.used_memory < grown
+    db.set_expiration("list1", 2 ** 60)
+    with_expiration = db.used_memory
+    db.delete_expiration("list1")
+    assert db.used_memory < with_expiration
+    db.set_expiration("list1", 2 ** 60)
+    db.delete("list1")
+    assert db.used_memory == base
+    db.set_expiration("key1", int(time.time() * 1000) - 1000)
+    assert not db.exists("key1")
+    assert db.used_memory == 0
+
+
+@pytest.mark.parametrize("build", [
+    lambda: "".join(["a"] * 1000),
+    lambda: deque(f"element{i}" for i in range(10000)),
+    lambda: {f"field{i}": f"value{i}" for i in range(10000)},
+    lambda: {f"member{i}" for i in range(10000)},
+    lambda: SortedSet({f"member{i}": float(i) for i in range(10000)}),
+])
+def test_estimate_value_size(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    assert abs(_estimate_value_size(value) - used) < used * 0.25
+
+
+def test_eviction_candidate_lru(db):
+    db.track_access("allkeys-lru")
+    for i in range(5):
+        db.set(f"key{i}", "value")
+    db._access["key3"] -= 10
+    assert db.eviction_candidate("allkeys-lru", 5)[1] == "key3"
+    # fewer samples than keys are picked at random
+    assert db.eviction_candidate("allkeys-lru", 2)[1] in {f"key{i}" for i in range(5)}
+    db.delete("key3")
+    assert db.eviction_candidate("allkeys-lru", 5)[1] != "key3"
+    assert sorted(db._key_ring._keys) == ["key0", "key1", "key2", "key4"]
+
+
+def test_eviction_candidate_lfu(db):
+    db.track_access("allkeys-lfu")
+    for i in range(3):
+        db.set(f"key{i}", "value")
+    for _ in range(100):
+        db.get("key0")
+        db.get("key2")
+    assert db.eviction_candidate("allkeys-lfu", 3)[1] == "key1"
+
+
+def test_eviction_candidate_volatile(db):
+    db.set("key1", "value")
+    assert db.eviction_candidate("volatile-ttl", 5) is None
+
+    now = int(time.time() * 1000)
+    db.set("key2", "value")
+    db.set("key3", "value")
+    db.set_expiration("key2", now + 20000)
+    db.set_expiration("key3", now + 10000)
+    assert db.eviction_candidate("volatile-ttl", 5)[1] == "key3"
+
+
+def test_estimate_memory(db):
+    db.set("key1", "value")
+    db.set("set1", {"a", "b", "c"})
+    estimated = db.estimate_memory()
+    assert estimated == db.memory_usage("key1") + db.memory_usage("set1")
+    db.enable_memory_accounting()
+    assert db.estimate_memory() == db.used_memory == estimated
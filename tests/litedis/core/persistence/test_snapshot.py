@@ -0,0 +1,106 @@
+import os
+import time
+from collections import deque
+
+import pytest
+
+from litedis.core.command.sortedset import SortedSet
+from litedis.core.persistence import LitedisDB, Snapshot
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    return tmp_path
+
+
+@pytest.fixture
+def dbs():
+    db1 = LitedisDB("db1")
+    db1.set("str_key", "string_value")
+    db1.set("hash_key", {"field1": "val1", "field2": "val2"})
+    db1.set("list_key", deque(["item1", "item2", "item1"]))
+    db1.set("set_key", {"member1", "member2"})
+    db1.set("zset_key", SortedSet({"member1": 1.5, "member2": -2.0}))
+
+    db2 = LitedisDB("db2")
+    db2.set("unicode_key", "値\n'quoted'")
+
+    return {"db1": db1, "db2": db2}
+
+
+class TestSnapshot:
+    def test_init(self, temp_dir):
+        snapshot = Snapshot(str(temp_dir))
+        assert snapshot.data_path == temp_dir
+        assert not snapshot.exists_file()
+        assert snapshot.read_generation() is None
+
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_save_and_load(self, temp_dir, dbs, compress):
+        snapshot = Snapshot(temp_dir, compress=compress)
+        snapshot.save(dbs, generation=3)
+
+        assert snapshot.exists_file()
+        assert snapshot.read_generation() == 3
+
+        generation, loaded = snapshot.load()
+        assert generation == 3
+        assert set(loaded) == {"db1", "db2"}
+
+        db1 = loaded["db1"]
+        assert db1.name == "db1"
+        assert db1.get("str_key") == "string_value"
+        assert db1.get("hash_key") == {"field1": "val1", "field2": "val2"}
+        assert db1.get("list_key") == deque(["item1", "item2", "item1"])
+        assert db1.get("set_key") == {"member1", "member2"}
+        zset = db1.get("zset_key")
+        assert isinstance(zset, SortedSet)
+        assert zset.range(0, -1) == [("member2", -2.0), ("member1", 1.5)]
+
+        assert loaded["db2"].get("unicode_key") == "値\n'quoted'"
+
+    def test_save_and_load_expirations(self, temp_dir):
+        db = LitedisDB("db")
+        now = int(time.time() * 1000)
+        db.set("alive", "value")
+        db.set_expiration("alive", now + 10000)
+        db.set("expired", "value")
+        db.set_expiration("expired", now - 1000)
+        db.set("persistent", "value")
+
+        snapshot = Snapshot(temp_dir)
+        snapshot.save({"db": db})
+        _, loaded = snapshot.load()
+
+        db = loaded["db"]
+        assert db.get_expiration("alive") == now + 10000
+        assert db.get_expiration("persistent") == -1
+        assert not db.exists("expired")
+        assert "expired" not in db._data
+
+    def test_save_unsupported_type(self, temp_dir):
+        db = LitedisDB("db")
+        db._data["invalid_key"] = 123
+
+        snapshot = Snapshot(temp_dir)
+        with pytest.raises(Exception, match="Failed to save"):
+            snapshot.save({"db": db})
+        assert not snapshot.exists_file()
+        assert os.listdir(temp_dir) == []
+
+    def test_load_invalid_file(self, temp_dir):
+        snapshot = Snapshot(temp_dir)
+        with open(temp_dir / "litedis.ldb", "wb") as f:
+            f.write(b"not a snapshot")
+
+        with pytest.raises(ValueError, match="is not a litedis snapshot"):
+            snapshot.load()
+
+    def test_remove_file(self, temp_dir, dbs):
+        snapshot = Snapshot(temp_dir)
+        snapshot.save(dbs)
+        snapshot.remove_file()
+        assert not snapshot.exists_file()
+
+        # removing a missing file is fine
+        snapshot.remove_file()
@@ -1,4 +1,5 @@
 import time
+from collections import deque
 
 import pytest
 
@@ -60,7 +61,7 @@ class TestDBCommandTokensConverter:
         assert cmdtokens == ['hset', 'hash_key', 'field1', 'val1', 'field2', 'val2']
 
     def test_convert_db_object_to_cmdtokens_list(self, mock_db):
-        mock_db.set("list_key", ["item1", "item2", "item3"])
+        mock_db.set("list_key", deque(["item1", "item2", "item3"]))
         cmdtokens = DBCommandConverter._convert_db_object_to_cmdtokens("list_key", mock_db)
         assert cmdtokens == ['rpush', 'list_key', 'item1', 'item2', 'item3']
 
@@ -86,7 +87,7 @@ class TestDBCommandTokensConverter:
         # Set up different types of data
         mock_db.set("str_key", "string_value")
         mock_db.set("hash_key", {"field1": "val1", "field2": "val2"})
-        mock_db.set("list_key", ["item1", "item2"])
+        mock_db.set("list_key", deque(["item1", "item2"]))
         mock_db.set("set_key", {"member1", "member2"})
 
         zset = SortedSet()
@@ -166,7 +167,7 @@ class TestDBCommandTokensConverter:
         assert db.get("hash_key") == {"field1": "val1", "field2": "val2"}
 
         # Verify list
-        assert db.get("list_key") == ["item1", "item2"]
+        assert db.get("list_key") == deque(["item1", "item2"])
 
         # Verify set
         assert db.get("set_key") == {"member1", "member2"}
@@ -1,14 +1,16 @@
 import time
-from collections import defaultdict
+from collections import deque
 from pathlib import Path
-from threading import Lock
+from threading import Lock, Thread
 from unittest.mock import patch
 
 import pytest
 
-from litedis.core.dbcommand import DBCommandPair
+from litedis.core.command.basiccmds import GetCommand, IncrbyCommand, SetCommand
+from litedis.core.command.zsetcmds import ZAddCommand
+from litedis.core.dbcommand import DBCommandConverter, DBCommandPair
 from litedis.core.dbmanager import DBManager
-from litedis.core.persistence import LitedisDB
+from litedis.core.persistence import AOF, LitedisDB, Snapshot
 
 
 @pytest.fixture
@@ -17,12 +19,16 @@ def temp_dir(tmp_path_factory):
     return tmp_path_factory.mktemp("litedis")
 
 
-@pytest.fixture(autouse=True)
-def reset_singleton():
+def reset_singleton_state():
     DBManager._dbs = {}
     DBManager._dbs_lock = Lock()
-    DBManager._db_locks = defaultdict(Lock)
+    DBManager._db_locks = {}
     DBManager._instances = {}
+
+
+@pytest.fixture(autouse=True)
+def reset_singleton():
+    reset_singleton_state()
     yield
 
 
@@ -50,11 +56,52 @@ class TestDBManager:
         assert manager._data_path.exists()
         assert manager._aof is not None
 
+    def test_init_with_appendfsync(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, appendfsync="always")
+        assert manager._aof.appendfsync == "always"
+
+        manager.process_command(DBCommandPair("test_db", ["set", "key1", "value1"]))
+        with open(manager._aof._file_path, "rb") as f:
+            assert f.read().endswith(AOF.encode_command(DBCommandPair("test_db", ["set", "key1", "value1"])))
+
     def test_init_without_persistence(self):
         manager = DBManager(persistence_on=False)
         assert not hasattr(manager, '_persistence_on')
         assert not hasattr(manager, '_aof')
 
+    def test_active_expire_cycle(self, temp_dir):
+        manager = DBManager(persistence_on=False, active_expire_hz=0)
+        db = manager.get_or_create_db("test_db")
+        now = int(time.time() * 1000)
+        for i in range(100):
+            db.set(f"key{i}", "value")
+            db.set_expiration(f"key{i}", now - 1000 if i % 2 else now + 100000)
+
+        manager._active_expire_cycle(1)
+
+        # the batches go on while half of the checked keys are expired
+        assert len(db._expirations) == 50
+        assert all(int(key[3:]) % 2 == 0 for key in db._data)
+
+    def test_active_expire_cycle_time_limit(self, temp_dir):
+        manager = DBManager(persistence_on=False, active_expire_hz=0)
+        db = manager.get_or_create_db("test_db")
+        for i in range(100):
+            db.set(f"key{i}", "value")
+            db.set_expiration(f"key{i}", 0)
+
+        manager._active_expire_cycle(0)
+        assert len(db._expirations) == 80
+
+    def test_active_expire_loop(self, temp_dir):
+        manager = DBManager(persistence_on=False, active_expire_hz=100)
+        db = manager.get_or_create_db("test_db")
+        db.set("key1", "value")
+        db.set_expiration("key1", int(time.time() * 1000) + 20)
+
+        time.sleep(0.1)
+        assert "key1" not in db._data
+
     def test_get_or_create_db(self, db_manager):
         # Test database creation and retrieval
         db1 = db_manager.get_or_create_db("test_db")
@@ -87,6 +134,273 @@ class TestDBManager:
         # Verify only one database instance was created
         assert len([db_manager.get_or_create_db('concurrent_db')]) == 1
 
+    def test_process_command_case_insensitive(self, db_manager):
+        db_manager.process_command(DBCommandPair("test_db", ["SET", "key1", "value1"]))
+        assert db_manager.process_command(DBCommandPair("test_db", ["Get", "key1"])) == "value1"
+
+    def test_process_command_wrong_arity(self, db_manager):
+        with pytest.raises(ValueError, match="wrong number of arguments"):
+            db_manager.process_command(DBCommandPair("test_db", ["get"]))
+        # nothing is logged for a rejected command
+        assert list(db_manager._aof.load_commands()) == []
+
+    def test_process_command_sharded(self, temp_dir):
+        manager = DBManager(persistence_on=False, db_shards=8)
+        manager.process_command(DBCommandPair("test_db", ["mset", "key1", "1", "key2", "2"]))
+        manager.process_command(DBCommandPair("test_db", ["rename", "key1", "key3"]))
+
+        db_lock = manager._db_locks["test_db"]
+        assert db_lock.shards == 8
+
+        # a command waits only for the shards of its own keys
+        key = next(f"key{i}" for i in range(4, 100)
+                   if db_lock.shard_of(f"key{i}") != db_lock.shard_of("key2"))
+        held = db_lock.acquire_keys(["key2"])
+        thread = Thread(target=manager.process_command,
+                        args=(DBCommandPair("test_db", ["set", key, "value"]),))
+        thread.start()
+        thread.join(1)
+        assert not thread.is_alive()
+        db_lock.release(held)
+
+        assert manager.process_command(DBCommandPair("test_db", ["mget", "key1", "key2", "key3", key])) == \
+               [None, "2", "1", "value"]
+
+    def test_process_command_sharded_concurrent(self, temp_dir):
+        manager = DBManager(persistence_on=False, db_shards=4)
+
+        def worker(n):
+            for _ in range(200):
+                manager.process_command(DBCommandPair("test_db", ["incrby", f"counter{n}", "1"]))
+                manager.process_command(DBCommandPair("test_db", ["incrby", "shared", "1"]))
+
+        threads = [Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        db = manager.get_or_create_db("test_db")
+        assert db.get("shared") == "800"
+        assert all(db.get(f"counter{n}") == "200" for n in range(4))
+
+    def test_process_parsed_command(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, appendfsync="always")
+        assert manager.process_parsed_command("test_db", SetCommand.from_args("key1", "1", px=100000)) == "OK"
+        assert manager.process_parsed_command("test_db", IncrbyCommand.from_args("key1", 2)) == "3"
+        assert manager.process_parsed_command("test_db", GetCommand.from_args("key1")) == "3"
+
+        # writes are logged in their canonical token form, reads are not logged
+        assert list(manager._aof.load_commands()) == [
+            DBCommandPair("test_db", ["set", "key1", "1", "PX", "100000"]),
+            DBCommandPair("test_db", ["incrby", "key1", "2"]),
+        ]
+
+    def test_process_parsed_command_sharded(self, temp_dir):
+        manager = DBManager(persistence_on=False, db_shards=4)
+        for n in range(10):
+            manager.process_parsed_command("test_db", IncrbyCommand.from_args(f"key{n}", n))
+        assert manager.process_command(DBCommandPair("test_db", ["mget", "key3", "key9"])) == ["3", "9"]
+
+    def test_key_index(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, appendfsync="always", key_index=True)
+        manager.process_command(DBCommandPair("test_db", ["mset", "user:2", "b", "user:1", "a", "other", "c"]))
+        assert manager.process_command(DBCommandPair("test_db", ["keys", "user:*"])) == ["user:1", "user:2"]
+
+        # the dbs loaded at startup are indexed too
+        reset_singleton_state()
+        manager = DBManager(persistence_on=True, data_path=temp_dir, key_index=True)
+        db = manager.get_or_create_db("test_db")
+        assert list(db.keys_range()) == ["other", "user:1", "user:2"]
+
+    def test_maxmemory_eviction(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, appendfsync="always",
+                            maxmemory=100 * 1024, maxmemory_policy="allkeys-lru")
+        value = "x" * 1000
+        manager.process_command(DBCommandPair("test_db", ["set", "hot", value]))
+        for i in range(200):
+            manager.process_command(DBCommandPair("test_db", ["set", f"key{i}", value]))
+            manager.process_command(DBCommandPair("test_db", ["get", "hot"]))
+
+        assert manager.used_memory() <= 100 * 1024 + 2000
+        assert manager.process_command(DBCommandPair("test_db", ["get", "hot"])) == value
+        # sampled keys approximate lru, the oldest keys go first
+        oldest = manager.process_command(DBCommandPair("test_db", ["exists", *[f"key{i}" for i in range(50)]]))
+        newest = manager.process_command(DBCommandPair("test_db", ["exists", *[f"key{i}" for i in range(150, 200)]]))
+        assert oldest < newest
+        # evicted keys are logged as deletions, so a replay gets the same keys
+        deletions = [cmd for cmd in manager._aof.load_commands() if cmd.cmdtokens[0] == "del"]
+        assert DBCommandPair("test_db", ["del", "hot"]) not in deletions
+        assert len(deletions) == manager._evicted_keys
+
+    def test_memory_stats(self):
+        manager = DBManager(persistence_on=False, memory_accounting=True)
+        manager.process_command(DBCommandPair("db1", ["set", "key1", "x" * 1000]))
+        manager.process_command(DBCommandPair("db2", ["rpush", "list1", "a", "b"]))
+
+        stats = manager.process_command(DBCommandPair("db1", ["info", "memory"]))
+        assert stats["used_memory_dbs"]["db1"] > 1000
+        assert stats["used_memory"] == sum(stats["used_memory_dbs"].values()) == manager.used_memory()
+        assert stats["maxmemory"] == 0
+        assert stats["maxmemory_policy"] == "noeviction"
+        assert stats["evicted_keys"] == 0
+
+    def test_memory_accounting_follows_writes(self):
+        manager = DBManager(persistence_on=False, memory_accounting=True)
+        big = "x" * 10000
+        commands = [
+            ["hset", "hash", "f1", "a", "f2", "b"], ["hset", "hash", "f1", big], ["hsetnx", "hash", "f3", big],
+            ["hincrby", "hash", "n", "5"], ["hincrbyfloat", "hash", "n", "1000000.5"], ["hdel", "hash", "f2"],
+            ["sadd", "set", "a", big], ["sadd", "set2", "b"], ["smove", "set", "set2", big], ["srem", "set", "zz"],
+            ["spop", "set2"], ["sadd", "set2", "c", "d", "e"], ["spop", "set2", "2"],
+            ["rpush", "list", "a", big, "b", "c", "d"], ["lpush", "list", big], ["lset", "list", "1", "x"],
+            ["linsert", "list", "before", "x", big], ["lpop", "list"], ["rpop", "list", "2"],
+            ["lmove", "list", "list2", "left", "right"], ["ltrim", "list", "0", "0"], ["blpop", "list2", "1"],
+            ["rpush", "list3", "a", "a", "b"], ["lrem", "list3", "1", "a"],
+            ["zadd", "zset", "1", "a", "2", big, "3", "c", "4", "d", "5", "e"], ["zincrby", "zset", "1", "f"],
+            ["zpopmin", "zset"], ["zpopmax", "zset"], ["zrem", "zset", "c"], ["zremrangebyscore", "zset", "4", "4"],
+            ["zmpop", "1", "zset", "min"], ["zadd", "zset", "9", "g"], ["copy", "zset", "zset2"],
+            ["rename", "zset2", "zset3"], ["bzpopmin", "zset3", "1"],
+        ]
+        for cmd in commands:
+            manager.process_command(DBCommandPair("db", cmd))
+
+        db = manager.get_or_create_db("db")
+        assert set(db.keys()) == {"hash", "set", "set2", "list", "list3", "zset", "zset3"}
+        for key in db.keys():
+            assert db._sizes[key] == db._estimate_key_size(key, db.get(key)), key
+        assert db.used_memory == sum(db._sizes.values())
+
+    def test_memory_accounting_in_place_growth(self):
+        fields = [token for i in range(1000) for token in (f"f{i}", "v")]
+        value = "x" * 10 * 1024
+        manager = DBManager(persistence_on=False, memory_accounting=True)
+        manager.process_command(DBCommandPair("db", ["hset", "hash", *fields]))
+        for i in range(999):
+            manager.process_command(DBCommandPair("db", ["hset", "hash", f"f{i}", value]))
+        assert manager.used_memory() > 999 * len(value)
+
+        # the grown hash is evicted once it passes maxmemory
+        reset_singleton_state()
+        manager = DBManager(persistence_on=False, maxmemory=5 * 1024 * 1024, maxmemory_policy="allkeys-lru")
+        manager.process_command(DBCommandPair("db", ["hset", "hash", *fields]))
+        for i in range(999):
+            manager.process_command(DBCommandPair("db", ["hset", "hash", f"f{i}", value]))
+        assert manager._evicted_keys >= 1
+        assert manager.used_memory() <= 5 * 1024 * 1024
+
+    def test_memory_stats_without_accounting(self):
+        manager = DBManager(persistence_on=False, memory_accounting=False)
+        manager.process_command(DBCommandPair("db1", ["set", "key1", "x" * 1000]))
+        manager.process_command(DBCommandPair("db2", ["set", "key1", "value"]))
+
+        # the walk of every key is left out of the default sections
+        assert "used_memory" not in manager.process_command(DBCommandPair("db1", ["info"]))
+        stats = manager.process_command(DBCommandPair("db1", ["info", "memory"]))
+        assert stats["used_memory_dbs"]["db1"] > 1000
+        assert stats["used_memory_dbs"]["db2"] > 0
+
+        # inside a pipeline, which holds the locks of its db
+        results = manager.process_commands("db1", [["info", "memory"], ["get", "key1"]])
+        assert results[0]["used_memory"] == stats["used_memory"]
+
+    def test_maxmemory_noeviction(self, temp_dir):
+        manager = DBManager(persistence_on=False, maxmemory=10 * 1024)
+        value = "x" * 1000
+        with pytest.raises(ValueError, match="OOM"):
+            for i in range(20):
+                manager.process_command(DBCommandPair("test_db", ["set", f"key{i}", value]))
+        # commands that free memory still run
+        assert manager.process_command(DBCommandPair("test_db", ["del", "key0", "key1"])) == 2
+
+        with pytest.raises(ValueError, match="maxmemory_policy must be one of"):
+            reset_singleton_state()
+            DBManager(persistence_on=False, maxmemory=1, maxmemory_policy="allkeys-random")
+
+    def test_blocking_pop_wakes_on_push(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, appendfsync="always")
+        results = []
+        thread = Thread(target=lambda: results.append(
+            manager.process_command(DBCommandPair("test_db", ["blpop", "list1", "list2", "5"]))))
+        thread.start()
+        while ("test_db", "list2") not in manager._waiters:
+            time.sleep(0.01)
+
+        manager.process_command(DBCommandPair("test_db", ["rpush", "list2", "a"]))
+        thread.join(5)
+        assert results == [["list2", "a"]]
+        assert manager._waiters == {}
+
+        # the AOF records the pop the command ended up doing
+        assert list(manager._aof.load_commands())[-1] == DBCommandPair("test_db", ["lpop", "list2"])
+
+    def test_blocking_pop_timeout(self, db_manager):
+        start = time.monotonic()
+        assert db_manager.process_command(DBCommandPair("test_db", ["bzpopmin", "zset1", "0.1"])) is None
+        assert time.monotonic() - start >= 0.1
+        assert db_manager._waiters == {}
+
+    def test_blocking_pop_fifo(self, temp_dir):
+        manager = DBManager(persistence_on=False)
+        results = []
+
+        def pop(n):
+            results.append((n, manager.process_command(DBCommandPair("test_db", ["brpop", "queue", "5"]))))
+
+        threads = []
+        for n in range(3):
+            threads.append(Thread(target=pop, args=(n,)))
+            threads[-1].start()
+            while len(manager._waiters.get(("test_db", "queue"), ())) <= n:
+                time.sleep(0.01)
+
+        manager.process_command(DBCommandPair("test_db", ["lpush", "queue", "a", "b", "c"]))
+        for thread in threads:
+            thread.join(5)
+        # the oldest waiter is served first
+        assert sorted(results) == [(0, ["queue", "a"]), (1, ["queue", "b"]), (2, ["queue", "c"])]
+
+    def test_blocking_move_sharded(self, temp_dir):
+        manager = DBManager(persistence_on=False, db_shards=4)
+        results = []
+        thread = Thread(target=lambda: results.append(
+            manager.process_command(DBCommandPair("test_db", ["blmove", "src", "dst", "LEFT", "RIGHT", "5"]))))
+        thread.start()
+        while ("test_db", "src") not in manager._waiters:
+            time.sleep(0.01)
+
+        manager.process_parsed_command("test_db", ZAddCommand.from_args("zset1", {"a": 1}))
+        manager.process_command(DBCommandPair("test_db", ["rpush", "src", "a", "b"]))
+        thread.join(5)
+        assert results == ["a"]
+        assert manager.process_command(DBCommandPair("test_db", ["lrange", "dst", "0", "-1"])) == ["a"]
+
+    def test_blocking_move_waits_on_source_only(self, temp_dir):
+        manager = DBManager(persistence_on=False)
+        results = []
+        mover = Thread(target=lambda: results.append(("blmove", manager.process_command(
+            DBCommandPair("test_db", ["blmove", "src", "dst", "LEFT", "RIGHT", "5"])))))
+        mover.start()
+        while ("test_db", "src") not in manager._waiters:
+            time.sleep(0.01)
+        assert ("test_db", "dst") not in manager._waiters
+
+        popper = Thread(target=lambda: results.append(("blpop", manager.process_command(
+            DBCommandPair("test_db", ["blpop", "dst", "5"])))))
+        popper.start()
+        while ("test_db", "dst") not in manager._waiters:
+            time.sleep(0.01)
+
+        # the pop on dst is served, not held behind the move
+        manager.process_command(DBCommandPair("test_db", ["rpush", "dst", "a"]))
+        popper.join(5)
+        assert results == [("blpop", ["dst", "a"])]
+
+        manager.process_command(DBCommandPair("test_db", ["rpush", "src", "b"]))
+        mover.join(5)
+        assert results[1] == ("blmove", "b")
+        assert manager._waiters == {}
+
     def test_process_command_read(self, db_manager):
         # Test processing read command
         db = db_manager.get_or_create_db("test_db")
@@ -143,17 +457,155 @@ class TestDBManager:
         assert db.get("key1") == "value1"
         assert db.get("key2") == "value2"
 
+    def test_frozen_dbs_keep_point_in_time(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir)
+        setup = [
+            ["rpush", "list", "a", "b"], ["rpush", "list2", "x"], ["hset", "hash", "f", "1"],
+            ["sadd", "set", "a", "b"], ["sadd", "set2", "x"], ["zadd", "zset", "1", "a", "2", "b"],
+        ]
+        for cmd in setup:
+            manager.process_command(DBCommandPair("db", cmd))
+        live_dbs, dbs = manager._freeze_dbs()
+        frozen = dbs["db"]
+        snapshot = lambda db: {key: DBCommandConverter._convert_db_object_to_cmdtokens(key, db) for key in db.keys()}
+        expected = snapshot(frozen)
+
+        # reads share the containers with the frozen copy
+        assert manager.process_command(DBCommandPair("db", ["zscore", "zset", "a"])) == 1.
+        assert live_dbs[0].get("zset") is frozen.get("zset")
+
+        writes = [
+            ["lpush", "list", "c"], ["lset", "list", "0", "d"], ["lmove", "list", "list2", "left", "right"],
+            ["hset", "hash", "g", "2"], ["hincrby", "hash", "f", "1"], ["hdel", "hash", "f"],
+            ["smove", "set", "set2", "a"], ["srem", "set", "b"],
+            ["zadd", "zset", "3", "c"], ["zincrby", "zset", "1", "a"], ["zpopmin", "zset"],
+            ["rename", "list2", "list3"], ["rpush", "list3", "y"],
+        ]
+        for cmd in writes:
+            manager.process_command(DBCommandPair("db", cmd))
+
+        assert snapshot(frozen) == expected
+        for db in live_dbs:
+            db.unfreeze()
+
     def test_rewrite_aof_commands(self, temp_dir):
         manager = DBManager(persistence_on=True, data_path=temp_dir)
         assert manager._rewrite_aof_commands() is True
 
+    def test_rewrite_aof_loop_survives_failures(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir)
+        attempts = []
+
+        def fail():
+            attempts.append(1)
+            raise OSError("disk full")
+
+        with patch("litedis.core.dbmanager._AOF_REWRITE_CHECK_INTERVAL", 0.01), \
+                patch.object(manager, "_need_rewrite_aof", return_value=True), \
+                patch.object(manager, "_rewrite_aof_commands", side_effect=fail):
+            manager._rewrite_aof_loop()
+            deadline = time.monotonic() + 5
+            while len(attempts) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        assert len(attempts) >= 3
+
+    def test_need_rewrite_aof(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, aof_rewrite_cycle=0,
+                            aof_rewrite_percentage=100, aof_rewrite_min_size=200)
+        base_size = manager._aof.size()
+        assert manager._aof_base_size == base_size
+        assert not manager._need_rewrite_aof()
+
+        cmd = DBCommandPair("test_db", ["set", "key1", "value1"])
+        while manager._aof.size() < max(200, base_size * 2):
+            assert not manager._need_rewrite_aof()
+            manager.process_command(cmd)
+        assert manager._need_rewrite_aof()
+
+        manager._rewrite_aof_commands()
+        assert manager._aof_base_size == manager._aof.size()
+        assert not manager._need_rewrite_aof()
+
+    def test_need_rewrite_aof_after_cycle(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, aof_rewrite_cycle=10,
+                            aof_rewrite_percentage=0)
+        manager._last_rewrite_time -= 10
+        # nothing changed since the last rewrite
+        assert not manager._need_rewrite_aof()
+
+        manager.process_command(DBCommandPair("test_db", ["set", "key1", "value1"]))
+        assert manager._need_rewrite_aof()
+
+    def test_rewrite_stats(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, aof_rewrite_cycle=0)
+        manager.process_command(DBCommandPair("test_db", ["set", "key1", "value1"]))
+        manager.process_command(DBCommandPair("test_db", ["set", "key2", "value2"]))
+        stats = manager.get_aof_rewrite_stats()
+        assert stats["aof_rewrites"] == 0
+        assert stats["aof_last_rewrite_keys"] == -1
+
+        manager._rewrite_aof_commands()
+        stats = manager.get_aof_rewrite_stats()
+        assert stats["aof_rewrites"] == 1
+        assert stats["aof_rewrite_in_progress"] == 0
+        assert stats["aof_last_rewrite_status"] == "ok"
+        assert stats["aof_last_rewrite_keys"] == 2
+        assert stats["aof_last_rewrite_bytes"] == manager._aof.size()
+        assert stats["aof_last_rewrite_time_ms"] >= 0
+        assert stats["aof_base_size"] == stats["aof_current_size"]
+
+    def test_rewrite_aof_in_background(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, aof_rewrite_cycle=0)
+        manager.process_command(DBCommandPair("test_db", ["set", "key1", "value1"]))
+        manager.process_command(DBCommandPair("test_db", ["set", "key1", "value2"]))
+
+        with manager._rewrite_lock:
+            with pytest.raises(ValueError, match="already in progress"):
+                manager.process_command(DBCommandPair("test_db", ["bgrewriteaof"]))
+
+        result = manager.process_command(DBCommandPair("test_db", ["bgrewriteaof"]))
+        assert result == "Background append only file rewriting started"
+        for _ in range(100):
+            if manager.process_command(DBCommandPair("test_db", ["info", "persistence"]))["aof_rewrites"]:
+                break
+            time.sleep(0.01)
+
+        assert list(manager._aof.load_commands()) == [
+            DBCommandPair("test_db", ["set", "key1", "value2"])
+        ]
+
+    def test_rewrite_does_not_block_commands(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, aof_rewrite_cycle=0)
+        manager.process_command(DBCommandPair("test_db", ["rpush", "list1", "a"]))
+
+        original_rewrite = manager._aof.rewrite_commands
+
+        def rewrite_commands(commands, generation=None):
+            commands = list(commands)
+            # writes while the dump is taken are neither blocked nor part of it
+            manager.process_command(DBCommandPair("test_db", ["rpush", "list1", "b"]))
+            manager.process_command(DBCommandPair("other_db", ["set", "key1", "value1"]))
+            assert commands == [DBCommandPair("test_db", ["rpush", "list1", "a"])]
+            original_rewrite(commands, generation)
+
+        with patch.object(manager._aof, "rewrite_commands", side_effect=rewrite_commands):
+            assert manager._rewrite_aof_commands() is True
+
+        assert list(manager._aof.load_commands()) == [
+            DBCommandPair("test_db", ["rpush", "list1", "a"]),
+            DBCommandPair("test_db", ["rpush", "list1", "b"]),
+            DBCommandPair("other_db", ["set", "key1", "value1"]),
+        ]
+        assert manager.get_or_create_db("test_db").get("list1") == deque(["a", "b"])
+
     def test_rewrite_aof_loop(self, temp_dir):
 
         # Mock `time.sleep` to avoid actual delay
         original_sleep = time.sleep
         # sleep for 0.1 seconds at most
         with patch('time.sleep', side_effect=lambda x: original_sleep(min(0.1, x))):
-            manager = DBManager(persistence_on=True, data_path=temp_dir)
+            manager = DBManager(persistence_on=True, data_path=temp_dir, aof_rewrite_min_size=0)
 
             cmds = [
                 DBCommandPair(dbname='test_db', cmdtokens=['set', 'key1', 'value1']),
@@ -169,3 +621,58 @@ class TestDBManager:
             assert list(manager._aof.load_commands()) == [
                 DBCommandPair(dbname='test_db', cmdtokens=['set', 'key1', 'value'])
             ]
+
+    def test_rewrite_with_snapshot(self, temp_dir):
+        manager = DBManager(persistence_on=True, data_path=temp_dir, snapshot_on=True)
+        manager.process_command(DBCommandPair("test_db", ["set", "key1", "value1"]))
+        manager.process_command(DBCommandPair("test_db", ["rpush", "list1", "a", "b"]))
+
+        assert manager._rewrite_aof_commands() is True
+        assert manager._snapshot.read_generation() == manager._aof.generation
+        assert list(manager._aof.load_commands()) == []
+
+        # commands after the snapshot are kept in the AOF
+        manager.process_command(DBCommandPair("test_db", ["set", "key2", "value2"]))
+        manager._aof.close_file()
+
+        DBManager._dbs = {}
+        DBManager._instances = {}
+        new_manager = DBManager(persistence_on=True, data_path=temp_dir, snapshot_on=True, aof_rewrite_cycle=0)
+        db = new_manager.get_or_create_db("test_db")
+        assert db.get("key1") == "value1"
+        assert db.get("list1") == deque(["a", "b"])
+        assert db.get("key2") == "value2"
+
+    def test_load_snapshot_newer_than_aof(self, temp_dir):
+        # a rewrite that stopped after saving the snapshot but before resetting the AOF
+        aof = AOF(temp_dir)
+        aof.log_command(DBCommandPair("test_db", ["incrby", "counter", "1"]))
+        aof.close_file()
+
+        db = LitedisDB("test_db")
+        db.set("counter", "1")
+        Snapshot(temp_dir).save({"test_db": db}, generation=aof.generation + 1)
+
+        manager = DBManager(persistence_on=True, data_path=temp_dir, aof_rewrite_cycle=0)
+        assert manager.get_or_create_db("test_db").get("counter") == "1"
+        assert manager._aof.generation == manager._snapshot.read_generation()
+        assert list(manager._aof.load_commands()) == []
+
+    def test_ignore_snapshot_older_than_aof(self, temp_dir):
+        db = LitedisDB("test_db")
+        db.set("key1", "stale")
+        Snapshot(temp_dir).save({"test_db": db}, generation=0)
+
+        aof = AOF(temp_dir)
+        aof.rewrite_commands([DBCommandPair("test_db", ["set", "key1", "value1"])], generation=1)
+
+        manager = DBManager(persistence_on=True, data_path=temp_dir, aof_rewrite_cycle=0)
+        assert manager.get_or_create_db("test_db").get("key1") == "value1"
+
+    def test_rewrite_without_snapshot_removes_snapshot(self, temp_dir):
+        Snapshot(temp_dir).save({}, generation=0)
+
+        manager = DBManager(persistence_on=True, data_path=temp_dir)
+        assert manager._rewrite_aof_commands() is True
+        assert manager._aof.generation == 1
+        assert not manager._snapshot.exists_file()
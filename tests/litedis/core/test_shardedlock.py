@@ -0,0 +1,57 @@
+from threading import Thread
+
+import pytest
+
+from litedis.core.shardedlock import ShardedLock
+
+
+def test_invalid_shards():
+    with pytest.raises(ValueError, match="shards must be positive"):
+        ShardedLock(0)
+
+
+def test_single_shard_locks_whole_db():
+    lock = ShardedLock()
+    locks = lock.acquire_keys(["key1"])
+    assert len(locks) == 1
+    assert not locks[0].acquire(blocking=False)
+    lock.release(locks)
+
+
+def test_acquire_keys_in_shard_order():
+    lock = ShardedLock(16)
+    keys = [f"key{i}" for i in range(10)]
+    locks = lock.acquire_keys(keys)
+
+    shards = sorted({lock.shard_of(key) for key in keys})
+    assert locks == [lock._locks[index] for index in shards]
+    assert all(l.locked() for l in locks)
+
+    lock.release(locks)
+    assert not any(l.locked() for l in lock._locks)
+
+
+def test_acquire_all_shards():
+    lock = ShardedLock(4)
+    assert len(lock.acquire_keys(None)) == 4
+    lock.release(lock._locks)
+
+    with lock:
+        assert all(l.locked() for l in lock._locks)
+    assert not any(l.locked() for l in lock._locks)
+
+
+def test_unrelated_keys_do_not_contend():
+    lock = ShardedLock(8)
+    key1 = "key1"
+    key2 = next(f"key{i}" for i in range(2, 100) if lock.shard_of(f"key{i}") != lock.shard_of(key1))
+
+    held = lock.acquire_keys([key1])
+    acquired = []
+    thread = Thread(target=lambda: acquired.append(lock.acquire_keys([key2])))
+    thread.start()
+    thread.join(1)
+    assert acquired
+
+    lock.release(acquired[0])
+    lock.release(held)
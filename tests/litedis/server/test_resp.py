@@ -0,0 +1,73 @@
+import pytest
+
+from litedis.server.resp import OK, RespParser, RespProtocolError, encode_error, encode_reply
+
+
+def test_parse_array_of_bulk_strings():
+    parser = RespParser()
+    assert parser.feed(b"*3\r\n$3\r\nset\r\n$3\r\nkey\r\n$5\r\nva\r\nl\r\n") == [["set", "key", "va\r\nl"]]
+
+
+def test_parse_pipeline_in_one_feed():
+    parser = RespParser()
+    data = b"*2\r\n$3\r\nget\r\n$1\r\na\r\n" * 3 + b"PING\r\n"
+    assert parser.feed(data) == [["get", "a"]] * 3 + [["PING"]]
+
+
+def test_parse_request_split_across_feeds():
+    parser = RespParser()
+    data = b"*2\r\n$3\r\nget\r\n$10\r\n0123456789\r\n"
+    requests = []
+    for i in range(len(data)):
+        requests.extend(parser.feed(data[i:i + 1]))
+    assert requests == [["get", "0123456789"]]
+
+
+def test_parse_inline_and_empty_requests():
+    parser = RespParser()
+    assert parser.feed(b"\r\n*0\r\nset  a   b\r\n") == [["set", "a", "b"]]
+
+
+def test_parse_utf8():
+    parser = RespParser()
+    value = "值".encode("utf-8")
+    assert parser.feed(b"*1\r\n$%d\r\n%s\r\n" % (len(value), value)) == [["值"]]
+
+
+@pytest.mark.parametrize("data", [
+    b"*x\r\n",
+    b"*1\r\n:1\r\n",
+    b"*1\r\n$-5\r\n",
+    b"*1\r\n$2\r\n\xff\xfe\r\n",
+    b"a" * (64 * 1024 + 1),
+])
+def test_parse_invalid_requests(data):
+    with pytest.raises(RespProtocolError):
+        RespParser().feed(data)
+
+
+@pytest.mark.parametrize("value, protocol, expected", [
+    (OK, 2, b"+OK\r\n"),
+    ("OK", 2, b"$2\r\nOK\r\n"),
+    ("值", 2, b"$3\r\n\xe5\x80\xbc\r\n"),
+    (None, 2, b"$-1\r\n"),
+    (None, 3, b"_\r\n"),
+    (3, 2, b":3\r\n"),
+    (True, 3, b"#t\r\n"),
+    (1.5, 2, b"$3\r\n1.5\r\n"),
+    (2.0, 3, b",2\r\n"),
+    (float("inf"), 3, b",inf\r\n"),
+    (["a", 1, None], 2, b"*3\r\n$1\r\na\r\n:1\r\n$-1\r\n"),
+    ({"f": "v"}, 2, b"*2\r\n$1\r\nf\r\n$1\r\nv\r\n"),
+    ({"f": "v"}, 3, b"%1\r\n$1\r\nf\r\n$1\r\nv\r\n"),
+    ({"m"}, 3, b"~1\r\n$1\r\nm\r\n"),
+    ({"m"}, 2, b"*1\r\n$1\r\nm\r\n"),
+])
+def test_encode_reply(value, protocol, expected):
+    assert encode_reply(value, protocol) == expected
+
+
+def test_encode_error():
+    assert encode_error(ValueError("value is not an integer")) == b"-ERR value is not an integer\r\n"
+    assert encode_error(ValueError("NOPROTO unsupported\nversion")) == b"-NOPROTO unsupported version\r\n"
+    assert encode_reply(TypeError("wrong type"), 3) == b"-ERR wrong type\r\n"
@@ -0,0 +1,173 @@
+import asyncio
+import socket
+import time
+from threading import Lock
+
+import pytest
+
+from litedis.core.dbmanager import DBManager
+from litedis.server import LitedisServer
+from litedis.server.server import _parse_args
+
+
+@pytest.fixture(autouse=True)
+def reset_dbmanager():
+    DBManager._dbs = {}
+    DBManager._dbs_lock = Lock()
+    DBManager._db_locks = {}
+    DBManager._instances = {}
+    yield
+
+
+@pytest.fixture
+def dbmanager():
+    return DBManager(persistence_on=False)
+
+
+def run_server(server, client):
+    """Run the server, call client(reader, writer) on a connection to it"""
+    async def main():
+        await server.start()
+        try:
+            if server.unixsocket:
+                reader, writer = await asyncio.open_unix_connection(server.unixsocket)
+            else:
+                reader, writer = await asyncio.open_connection(server.host, server.port)
+            try:
+                return await client(reader, writer)
+            finally:
+                writer.close()
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+async def request(reader, writer, data: bytes, size: int) -> bytes:
+    writer.write(data)
+    reply = b""
+    while len(reply) < size:
+        chunk = await asyncio.wait_for(reader.read(65536), 5)
+        if not chunk:
+            break
+        reply += chunk
+    return reply
+
+
+def command(*args) -> bytes:
+    encoded = [arg.encode() for arg in args]
+    return b"*%d\r\n" % len(encoded) + b"".join(b"$%d\r\n%s\r\n" % (len(arg), arg) for arg in encoded)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_server_requires_an_address(dbmanager):
+    with pytest.raises(ValueError):
+        LitedisServer(dbmanager, port=0)
+
+
+def test_tcp_pipeline(dbmanager):
+    server = LitedisServer(dbmanager, port=free_port())
+    expected = b"+OK\r\n:3\r\n$1\r\n3\r\n:2\r\n*2\r\n$1\r\nb\r\n$1\r\na\r\n+PONG\r\n"
+
+    async def client(reader, writer):
+        data = (command("set", "key", "1") + command("incrby", "key", "2") + command("get", "key")
+                + command("lpush", "list", "a", "b") + command("lrange", "list", "0", "-1") + b"PING\r\n")
+        return await request(reader, writer, data, len(expected))
+
+    assert run_server(server, client) == expected
+    assert dbmanager.process_command(("db", ["get", "key"])) == "3"
+
+
+def test_unix_socket_errors_and_select(dbmanager, tmp_path):
+    server = LitedisServer(dbmanager, port=0, unixsocket=str(tmp_path / "litedis.sock"), unixsocketperm=0o700)
+    expected = (b"-ERR unknown command name: nosuch\r\n+OK\r\n"
+                b"-ERR increment must be an integer\r\n"
+                b"+OK\r\n+OK\r\n$2\r\nv1\r\n")
+
+    async def client(reader, writer):
+        data = (command("nosuch") + command("set", "k", "v") + command("incrby", "k", "x")
+                + command("select", "other") + command("set", "k", "v1") + command("get", "k"))
+        return await request(reader, writer, data, len(expected))
+
+    assert run_server(server, client) == expected
+    assert not (tmp_path / "litedis.sock").exists()
+    assert dbmanager.process_command(("db", ["get", "k"])) == "v"
+    assert dbmanager.process_command(("other", ["get", "k"])) == "v1"
+
+
+def test_hello_switches_to_resp3(dbmanager, tmp_path):
+    server = LitedisServer(dbmanager, port=0, unixsocket=str(tmp_path / "litedis.sock"))
+    expected = b"%1\r\n$1\r\nf\r\n$1\r\nv\r\n,1.5\r\n_\r\n"
+
+    async def client(reader, writer):
+        await request(reader, writer, command("hset", "h", "f", "v") + command("zadd", "z", "1.5", "m"), 8)
+        reply = await request(reader, writer, command("hello", "3"), 1)
+        while not reply.endswith(b"modules\r\n*0\r\n"):
+            reply += await reader.read(65536)
+        assert reply.startswith(b"%7\r\n")
+        return await request(reader, writer, command("hgetall", "h") + command("zscore", "z", "m")
+                             + command("get", "missing"), len(expected))
+
+    assert run_server(server, client) == expected
+
+
+def test_hello_rejects_unknown_protocol(dbmanager, tmp_path):
+    server = LitedisServer(dbmanager, port=0, unixsocket=str(tmp_path / "litedis.sock"))
+
+    async def client(reader, writer):
+        return await request(reader, writer, command("hello", "4"), 36)
+
+    assert run_server(server, client) == b"-NOPROTO unsupported protocol version\r\n"
+
+
+def test_protocol_error_closes_connection(dbmanager, tmp_path):
+    server = LitedisServer(dbmanager, port=0, unixsocket=str(tmp_path / "litedis.sock"))
+
+    async def client(reader, writer):
+        return await request(reader, writer, b"*1\r\n:1\r\n", 1000)
+
+    assert run_server(server, client) == b"-ERR Protocol error: expected '$', got ':'\r\n"
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_blocking_command_does_not_stall_other_clients(dbmanager, tmp_path, workers):
+    server = LitedisServer(dbmanager, port=0, unixsocket=str(tmp_path / "litedis.sock"), workers=workers)
+    expected = b"*2\r\n$5\r\nqueue\r\n$4\r\nitem\r\n"
+
+    async def client(reader, writer):
+        writer.write(command("blpop", "queue", "5"))
+        await writer.drain()
+        await asyncio.sleep(0.1)
+        other_reader, other_writer = await asyncio.open_unix_connection(server.unixsocket)
+        start = time.monotonic()
+        assert await request(other_reader, other_writer, command("rpush", "queue", "item"), 4) == b":1\r\n"
+        other_writer.close()
+        reply = await request(reader, writer, b"", len(expected))
+        assert time.monotonic() - start < 2
+        return reply
+
+    assert run_server(server, client) == expected
+
+
+def test_quit_closes_after_reply(dbmanager, tmp_path):
+    server = LitedisServer(dbmanager, port=0, unixsocket=str(tmp_path / "litedis.sock"))
+
+    async def client(reader, writer):
+        return await request(reader, writer, command("quit") + command("set", "k", "v"), 1000)
+
+    assert run_server(server, client) == b"+OK\r\n"
+    assert dbmanager.process_command(("db", ["get", "k"])) is None
+
+
+def test_parse_args():
+    args = _parse_args(["--port", "0", "--unixsocket", "/tmp/l.sock", "--unixsocketperm", "770",
+                        "--workers", "4", "--no-persistence"])
+    assert args.port == 0
+    assert args.unixsocketperm == 0o770
+    assert args.workers == 4
+    assert args.no_persistence is True